@@ -1,12 +1,15 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response
 from flask_cors import CORS
 import torch, torch.nn as nn
 from torchvision import models, transforms
 from PIL import Image
 from io import BytesIO
 from pathlib import Path
+from functools import wraps
 import json, os
 
+import tracing
+
 # ---- Configuración ----
 APP_VERSION = os.getenv("MODEL_VERSION", "resnet18_v1_2025-10-31")
 
@@ -16,6 +19,8 @@ MODEL_PATH = Path(os.getenv("MODEL_PATH", BASE_DIR / "models" / "weights.pth"))
 MAPPING_FILE = Path(os.getenv("MAPPING_FILE", BASE_DIR / "models" / "class_mapping.json"))
 
 IMAGE_SIZE = int(os.getenv("IMAGE_SIZE", "224"))
+TOP_K = int(os.getenv("TOP_K", "3"))
+MAX_BATCH = int(os.getenv("MAX_BATCH", "32"))
 
 app = Flask(__name__)
 CORS(app)
@@ -72,6 +77,29 @@ _tf = transforms.Compose([
 ])
 
 
+# ---- Tracing (ver tracing.py) ----
+def traced(view):
+    """Span del request, hijo del de Django si vino `traceparent`."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        name = f"{request.method} {request.path}"
+        with tracing.server_span(request.headers.get("traceparent"), name) as span:
+            response = make_response(view(*args, **kwargs))
+            span.tag("http.status_code", response.status_code)
+            if span.trace_id:
+                response.headers["X-Request-ID"] = span.trace_id
+            return response
+
+    return wrapper
+
+
+def _sync():
+    # en GPU el forward es asíncrono: esperar para que el span mida el cómputo
+    if _device.type == "cuda":
+        torch.cuda.synchronize()
+
+
 # ---- Endpoints ----
 @app.get("/health")
 def health():
@@ -79,7 +107,29 @@ def health():
     return {"ok": ok, "version": APP_VERSION}
 
 
+def _top_k(probs):
+    """Top-k por fila del batch; el primero es la predicción principal."""
+    k = max(1, min(TOP_K, probs.shape[1]))
+    confs, idxs = probs.topk(k, dim=1)
+    return [
+        [
+            {"label": _idx_to_class[int(i)], "confidence": float(c) * 100.0}
+            for c, i in zip(row_c, row_i)
+        ]
+        for row_c, row_i in zip(confs.tolist(), idxs.tolist())
+    ]
+
+
+def _result(top_k):
+    return {
+        "label": top_k[0]["label"],
+        "confidence": top_k[0]["confidence"],
+        "top_k": top_k,
+    }
+
+
 @app.post("/predict")
+@traced
 @torch.inference_mode()
 def predict():
     load_model()
@@ -90,17 +140,56 @@ def predict():
     if "image" not in request.files:
         return jsonify({"detail": "send multipart/form-data with 'image'"}), 400
 
-    img = Image.open(BytesIO(request.files["image"].read())).convert("RGB")
-    x = _tf(img).unsqueeze(0).to(_device)
-    probs = torch.softmax(_model(x), dim=1)
-    conf, cls = probs.max(dim=1)
-    label = _idx_to_class[int(cls.item())]
-
-    return jsonify({
-        "label": label,
-        "confidence": float(conf.item() * 100.0),
-        "version": APP_VERSION
-    })
+    with tracing.span("decode"):
+        img = Image.open(BytesIO(request.files["image"].read())).convert("RGB")
+    with tracing.span("preprocess"):
+        x = _tf(img).unsqueeze(0).to(_device)
+    with tracing.span("inference"):
+        probs = torch.softmax(_model(x), dim=1)
+        _sync()
+
+    with tracing.span("postprocess"):
+        return jsonify({**_result(_top_k(probs)[0]), "version": APP_VERSION})
+
+
+@app.post("/predict_batch")
+@traced
+@torch.inference_mode()
+def predict_batch():
+    """Varias imágenes ('images') en un solo forward; resultados en el mismo orden."""
+    load_model()
+
+    if _model is None or _idx_to_class is None:
+        return jsonify({"detail": "model not loaded"}), 500
+
+    uploads = request.files.getlist("images")
+    if not uploads:
+        return jsonify({"detail": "send multipart/form-data with 'images'"}), 400
+    if len(uploads) > MAX_BATCH:
+        return jsonify({"detail": f"max {MAX_BATCH} images per batch"}), 413
+
+    results = [None] * len(uploads)
+    tensors, positions = [], []
+    with tracing.span("decode", images=len(uploads)):
+        for pos, up in enumerate(uploads):
+            try:
+                img = Image.open(BytesIO(up.read())).convert("RGB")
+            except Exception as e:
+                results[pos] = {"error": f"invalid image: {e}"}
+                continue
+            tensors.append(_tf(img))
+            positions.append(pos)
+
+    if tensors:
+        with tracing.span("inference", images=len(tensors)):
+            x = torch.stack(tensors).to(_device)
+            probs = torch.softmax(_model(x), dim=1)
+            _sync()
+        with tracing.span("postprocess"):
+            for pos, top_k in zip(positions, _top_k(probs)):
+                results[pos] = _result(top_k)
+
+    return jsonify({"results": results, "version": APP_VERSION})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+"""
+Stand-in del servicio de IA para pruebas de carga: mismos endpoints y
+formato de respuesta que app.py (/health, /predict, /predict_batch), sin
+torch ni pesos. La etiqueta sale de un hash de la imagen (determinística)
+y la latencia del modelo se simula con sleep.
+
+    python ai_service/stub.py
+    STUB_LATENCY_MS=80 STUB_WORKERS=2 python ai_service/stub.py
+
+Variables:
+    PORT                puerto (5001, igual que el servicio real)
+    STUB_LATENCY_MS     tiempo fijo por request (40)
+    STUB_PER_IMAGE_MS   tiempo extra por imagen del batch (5)
+    STUB_WORKERS        forwards simultáneos, como una GPU/CPU limitada (4)
+    STUB_ERROR_RATE     fracción de requests que responden 500 (0)
+    TRACE_FILE          spans Zipkin como app.py (ver tracing.py)
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import tracing
+
+BASE_DIR = Path(__file__).resolve().parent
+MAPPING_FILE = Path(os.getenv("MAPPING_FILE", BASE_DIR / "models" / "class_mapping.json"))
+APP_VERSION = os.getenv("MODEL_VERSION", "stub_v1")
+PORT = int(os.getenv("PORT", "5001"))
+TOP_K = int(os.getenv("TOP_K", "3"))
+MAX_BATCH = int(os.getenv("MAX_BATCH", "32"))
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "40"))
+PER_IMAGE_MS = float(os.getenv("STUB_PER_IMAGE_MS", "5"))
+WORKERS = int(os.getenv("STUB_WORKERS", "4"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+
+try:
+    with open(MAPPING_FILE, "r", encoding="utf-8") as f:
+        _class_to_idx = json.load(f)
+    LABELS = sorted(_class_to_idx, key=_class_to_idx.get)
+except OSError:
+    LABELS = [f"clase_{i}" for i in range(10)]
+
+_model_slots = threading.BoundedSemaphore(WORKERS)
+
+
+def _top_k(data: bytes):
+    digest = hashlib.sha1(data).digest()
+    k = max(1, min(TOP_K, len(LABELS)))
+    first = digest[0] % len(LABELS)
+    # como un softmax: decrecientes y sumando <= 100
+    confs, rest = [], 100.0
+    for b in digest[1 : k + 1]:
+        share = (b % 50) / 100.0 if confs else 0.4 + (b % 60) / 100.0
+        c = round(rest * share, 2)
+        confs.append(c)
+        rest -= c
+    confs.sort(reverse=True)
+    return [
+        {"label": LABELS[(first + i) % len(LABELS)], "confidence": c}
+        for i, c in enumerate(confs)
+    ]
+
+
+def _result(data: bytes):
+    top_k = _top_k(data)
+    return {"label": top_k[0]["label"], "confidence": top_k[0]["confidence"], "top_k": top_k}
+
+
+def _forward(n_images: int):
+    with _model_slots:
+        time.sleep((LATENCY_MS + PER_IMAGE_MS * n_images) / 1000.0)
+
+
+def _parse_files(content_type: str, body: bytes):
+    """[(campo, bytes)] de un multipart/form-data."""
+    msg = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+    )
+    if not msg.is_multipart():
+        return []
+    return [
+        (part.get_param("name", header="content-disposition"), part.get_payload(decode=True))
+        for part in msg.iter_parts()
+        if part.get_filename() is not None
+    ]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers y body van en writes separados
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            return self._send(200, {"ok": True, "version": APP_VERSION})
+        self._send(404, {"detail": "not found"})
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        with tracing.server_span(self.headers.get("traceparent"), f"POST {path}"):
+            self._post(path)
+
+    def _post(self, path):
+        with tracing.span("decode"):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            files = _parse_files(self.headers.get("Content-Type", ""), body)
+
+        if ERROR_RATE and random.random() < ERROR_RATE:
+            return self._send(500, {"detail": "stub: error simulado"})
+
+        if path == "/predict":
+            images = [data for name, data in files if name == "image"]
+            if not images:
+                return self._send(400, {"detail": "send multipart/form-data with 'image'"})
+            with tracing.span("inference"):
+                _forward(1)
+            return self._send(200, {**_result(images[0]), "version": APP_VERSION})
+
+        if path == "/predict_batch":
+            images = [data for name, data in files if name == "images"]
+            if not images:
+                return self._send(400, {"detail": "send multipart/form-data with 'images'"})
+            if len(images) > MAX_BATCH:
+                return self._send(413, {"detail": f"max {MAX_BATCH} images per batch"})
+            with tracing.span("inference", images=len(images)):
+                _forward(len(images))
+            return self._send(
+                200,
+                {"results": [_result(data) for data in images], "version": APP_VERSION},
+            )
+
+        self._send(404, {"detail": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("0.0.0.0", PORT), Handler)
+    print(
+        f"[OK] Stub IA en :{PORT} ({len(LABELS)} clases, {LATENCY_MS}ms + "
+        f"{PER_IMAGE_MS}ms/imagen, {WORKERS} workers)"
+    )
+    server.serve_forever()
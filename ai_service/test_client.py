@@ -1,18 +1,232 @@
-import requests, sys, os
+"""
+Cliente de prueba y benchmark del servicio de IA.
 
-URL = "http://localhost:5001/predict"
+    python test_client.py <imagen>                       # un request, imprime la respuesta
+    python test_client.py <dir> --concurrency 1,4,16 --requests 200
+    python test_client.py <dir> --endpoint predict_batch --batch 8 --concurrency 1,2,4
+    python test_client.py <dir> --duration 30 --json resultados.json
 
-if len(sys.argv) < 2:
-    print("Uso: python test_client.py <ruta_imagen>")
-    sys.exit(1)
+En modo benchmark cada cliente (hilo con su propia conexión) manda
+requests uno tras otro, tomando imágenes del directorio en ronda. Por
+cada nivel de concurrencia se mide throughput (requests e imágenes por
+segundo), latencia p50/p95/p99 y tasa de errores.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
 
-img_path = sys.argv[1]
-if not os.path.exists(img_path):
-    print("No existe:", img_path)
-    sys.exit(1)
+import requests
 
-with open(img_path, "rb") as f:
-    files = {"image": (os.path.basename(img_path), f, "image/jpeg")}
-    r = requests.post(URL, files=files, timeout=30)
+URL = os.getenv("AI_URL", "http://localhost:5001")
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
 
-print(r.status_code, r.text)
+
+def single(url, img_path):
+    with open(img_path, "rb") as f:
+        files = {"image": (os.path.basename(img_path), f, "image/jpeg")}
+        r = requests.post(f"{url}/predict", files=files, timeout=30)
+    print(r.status_code, r.text)
+
+
+def load_images(path: Path, limit: int):
+    paths = [path] if path.is_file() else sorted(
+        p for p in path.rglob("*") if p.suffix.lower() in IMAGE_EXTS
+    )
+    if limit:
+        paths = paths[:limit]
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    idx = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class Run:
+    """Un nivel de concurrencia: N clientes cerrados (mandan, esperan, repiten)."""
+
+    def __init__(self, url, endpoint, images, batch, timeout):
+        self.url = f"{url}/{endpoint}"
+        self.field = "images" if endpoint == "predict_batch" else "image"
+        self.images = images
+        self.batch = batch if endpoint == "predict_batch" else 1
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.next_image = 0
+        self.issued = 0
+        self.samples = []  # (ok, latency_ms, n_images, error)
+
+    def _take(self):
+        with self.lock:
+            out = []
+            for _ in range(self.batch):
+                out.append(self.images[self.next_image % len(self.images)])
+                self.next_image += 1
+            return out
+
+    def _claim(self, total, deadline):
+        with self.lock:
+            if total and self.issued >= total:
+                return False
+            if deadline and time.perf_counter() >= deadline:
+                return False
+            self.issued += 1
+            return True
+
+    def _client(self, total, deadline, record):
+        session = requests.Session()
+        while self._claim(total, deadline):
+            files = [(self.field, (name, data, "image/jpeg")) for name, data in self._take()]
+            t0 = time.perf_counter()
+            error = None
+            try:
+                r = session.post(self.url, files=files, timeout=self.timeout)
+                if r.status_code != 200:
+                    error = f"http_{r.status_code}"
+                elif self.field == "images":
+                    failed = sum(1 for res in r.json().get("results", []) if "error" in res)
+                    if failed:
+                        error = "item_error"
+            except requests.RequestException as e:
+                error = type(e).__name__
+            latency = (time.perf_counter() - t0) * 1000.0
+            if record:
+                with self.lock:
+                    self.samples.append((error is None, latency, len(files), error))
+
+    def run(self, concurrency, total=0, duration=0.0, record=True):
+        deadline = time.perf_counter() + duration if duration else None
+        threads = [
+            threading.Thread(target=self._client, args=(total, deadline, record))
+            for _ in range(concurrency)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - t0
+
+
+def summarize(concurrency, samples, elapsed):
+    ok = [s for s in samples if s[0]]
+    latencies = sorted(s[1] for s in samples)
+    errors = {}
+    for s in samples:
+        if s[3]:
+            errors[s[3]] = errors.get(s[3], 0) + 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0,
+        "error_kinds": errors,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(ok) / elapsed, 2) if elapsed else 0,
+        "images_per_s": round(sum(s[2] for s in ok) / elapsed, 2) if elapsed else 0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+def benchmark(args):
+    images = load_images(Path(args.path), args.max_images)
+    if not images:
+        print("No hay imágenes en:", args.path)
+        sys.exit(1)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    try:
+        health = requests.get(f"{args.url}/health", timeout=10).json()
+    except (requests.RequestException, ValueError) as e:
+        print("No responde /health:", e)
+        sys.exit(1)
+
+    batch = args.batch if args.endpoint == "predict_batch" else 1
+    print(
+        f"{args.url}/{args.endpoint} · {len(images)} imágenes · batch {batch}"
+        f" · modelo {health.get('version')} · ok={health.get('ok')}"
+    )
+    print(f"{'conc':>5}{'req':>7}{'err%':>7}{'req/s':>9}{'img/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+
+    results = []
+    for level in levels:
+        run = Run(args.url, args.endpoint, images, args.batch, args.timeout)
+        if args.warmup:
+            run.run(level, total=args.warmup, record=False)
+            run.issued = 0
+        elapsed = run.run(level, total=0 if args.duration else args.requests, duration=args.duration)
+        r = summarize(level, run.samples, elapsed)
+        results.append(r)
+        lat = r["latency_ms"]
+        print(
+            f"{level:>5}{r['requests']:>7}{r['error_rate'] * 100:>7.1f}{r['requests_per_s']:>9}"
+            f"{r['images_per_s']:>9}{_ms(lat['p50'])}{_ms(lat['p95'])}{_ms(lat['p99'])}{_ms(lat['max'])}"
+        )
+
+    if args.json:
+        out = {
+            "url": args.url,
+            "endpoint": args.endpoint,
+            "batch": batch,
+            "images": len(images),
+            "model_version": health.get("version"),
+            "label": args.label,
+            "host": {
+                "machine": platform.machine(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+            },
+            "results": results,
+        }
+        Path(args.json).write_text(json.dumps(out, indent=2))
+        print("Resultados en", args.json)
+
+
+def _ms(value):
+    return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="Imagen o directorio de imágenes.")
+    parser.add_argument("--url", default=URL, help="Base del servicio (sin /predict).")
+    parser.add_argument("--endpoint", choices=["predict", "predict_batch"], default="predict")
+    parser.add_argument("--batch", type=int, default=8, help="Imágenes por request en predict_batch.")
+    parser.add_argument("--concurrency", help="Niveles a barrer, ej. 1,2,4,8,16.")
+    parser.add_argument("--requests", type=int, default=100, help="Requests por nivel.")
+    parser.add_argument("--duration", type=float, default=0.0, help="Segundos por nivel (en vez de --requests).")
+    parser.add_argument("--warmup", type=int, default=5, help="Requests descartados antes de medir.")
+    parser.add_argument("--max-images", type=int, default=0, help="Usar como mucho N imágenes del directorio.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--label", default="", help="Etiqueta libre para el JSON (backend, threads...).")
+    parser.add_argument("--json", help="Guardar resultados en este archivo.")
+    args = parser.parse_args()
+    args.url = args.url.rstrip("/").removesuffix("/predict")
+
+    if not os.path.exists(args.path):
+        print("No existe:", args.path)
+        sys.exit(1)
+
+    if args.concurrency is None and os.path.isfile(args.path) and args.endpoint == "predict":
+        single(args.url, args.path)
+        return
+    args.concurrency = args.concurrency or "1"
+    benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Spans del servicio de IA, compatibles con los de Django (app/tracing.py):
+continúa el trace del header W3C `traceparent` y escribe un span por
+línea en formato Zipkin v2 JSON. Solo stdlib, lo usan app.py y stub.py.
+
+Variables:
+    TRACE_FILE      archivo de salida (sin definir: tracing apagado)
+    TRACE_SERVICE   nombre del servicio en los spans (beetleapp-ai)
+"""
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+SERVICE = os.getenv("TRACE_SERVICE", "beetleapp-ai")
+ENABLED = bool(TRACE_FILE)
+
+_traceparent_re = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current = ContextVar("trace_span", default=None)
+_write_lock = threading.Lock()
+
+
+class _Span:
+    def __init__(self, name, trace_id, parent_id, kind=None, spans=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.tags = {}
+        self.timestamp = time.time_ns() // 1000
+        self._start = time.perf_counter_ns()
+        self.local_root = spans is None
+        self.spans = spans if spans is not None else []
+
+    def tag(self, key, value):
+        self.tags[key] = str(value)
+
+    def finish(self):
+        data = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration": max(1, (time.perf_counter_ns() - self._start) // 1000),
+            "localEndpoint": {"serviceName": SERVICE},
+        }
+        if self.parent_id:
+            data["parentId"] = self.parent_id
+        if self.kind:
+            data["kind"] = self.kind
+        if self.tags:
+            data["tags"] = self.tags
+        self.spans.append(data)
+        if self.local_root:
+            lines = "".join(json.dumps(s, separators=(",", ":")) + "\n" for s in self.spans)
+            with _write_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+class _NoopSpan:
+    trace_id = None
+
+    def tag(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def _activate(span):
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.tag("error", type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        span.finish()
+
+
+def server_span(traceparent, name):
+    """Span raíz del request; hijo del span de Django si vino `traceparent`."""
+    if not ENABLED:
+        return _noop()
+    match = _traceparent_re.match((traceparent or "").strip().lower())
+    if match:
+        span = _Span(name, match.group(1), match.group(2), "SERVER")
+    else:
+        span = _Span(name, os.urandom(16).hex(), None, "SERVER")
+    return _activate(span)
+
+
+def span(name, **tags):
+    """Span hijo del actual (sin request en curso no registra nada)."""
+    parent = _current.get()
+    if parent is None:
+        return _noop()
+    s = _Span(name, parent.trace_id, parent.span_id, spans=parent.spans)
+    for key, value in tags.items():
+        s.tag(key, value)
+    return _activate(s)
+
+
+@contextmanager
+def _noop():
+    yield _NOOP
@@ -1,16 +1,171 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
 from .models import Observation, Inference, ModelVersion, Species
 
+
+def estimated_count(model, using="default"):
+    """Filas estimadas por las estadísticas del motor (None si no hay)."""
+    table = model._meta.db_table
+    connection = connections[using]
+    if connection.vendor == "mysql":
+        sql = (
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+        )
+    elif connection.vendor == "sqlite":
+        # lo llena ANALYZE; la primera cifra de `stat` (de cualquier índice)
+        # es la cantidad de filas de la tabla
+        sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except Exception:
+        return None
+    if not row or row[0] is None:
+        return None
+    value = int(str(row[0]).split()[0])
+    return value if value >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Sin filtros, el total de la lista sale de las estadísticas de la tabla en
+    vez de un COUNT(*) completo (a partir de ADMIN_ESTIMATED_COUNT_MIN filas);
+    con filtros o búsqueda se cuenta de verdad.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not qs.query.where:
+            estimate = estimated_count(qs.model, qs.db)
+            if estimate is not None and estimate >= getattr(
+                settings, "ADMIN_ESTIMATED_COUNT_MIN", 100000
+            ):
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filtro por FK con el select de autocompletado del admin: busca con
+    `search_fields` del admin relacionado en vez de listar todos los valores.
+    """
+
+    template = "admin/app/autocomplete_filter.html"
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f"{self.field_name}__id__exact"
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field(self.field_name)
+        # el form field le da al widget las choices (solo consulta el elegido)
+        form_field = field.formfield(
+            widget=AutocompleteSelect(field, model_admin.admin_site), required=False
+        )
+        self.rendered = form_field.widget.render(
+            self.parameter_name,
+            self.value(),
+            attrs={"data-autocomplete-filter": self.parameter_name},
+        )
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Filtro por valor exacto tipeado (usa el índice de la columna)."""
+
+    template = "admin/app/input_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        # el resto de los filtros se conserva al enviar el formulario
+        self.other_params = [
+            (k, v)
+            for k, values in request.GET.lists()
+            if k not in (self.parameter_name, "p")
+            for v in values
+        ]
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value().strip()})
+        return queryset
+
+
+class UserFilter(AutocompleteFilter):
+    title = "usuario"
+    field_name = "user"
+
+
+class SpeciesFilter(AutocompleteFilter):
+    title = "especie"
+    field_name = "species"
+
+
+class PredictedLabelFilter(InputFilter):
+    title = "etiqueta predicha"
+    parameter_name = "predicted_label"
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist para tablas de millones de filas."""
+
+    paginator = EstimatedCountPaginator
+    # evita el segundo COUNT(*) sin filtros ("n de N en total")
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        for spec in self.list_filter:
+            if isinstance(spec, type) and issubclass(spec, AutocompleteFilter):
+                field = self.model._meta.get_field(spec.field_name)
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
 @admin.register(Observation)
-class ObservationAdmin(admin.ModelAdmin):
+class ObservationAdmin(LargeTableAdmin):
     list_display = ('user', 'date', 'latitude', 'longitude', 'created_at')
-    list_filter = ('date', 'user')
+    list_select_related = ('user',)
+    list_filter = (UserFilter,)
+    date_hierarchy = 'date'
+    raw_id_fields = ('user',)
     search_fields = ('place_text',)
 
 @admin.register(Inference)
-class InferenceAdmin(admin.ModelAdmin):
+class InferenceAdmin(LargeTableAdmin):
     list_display = ('observation', 'predicted_label', 'confidence', 'is_correct', 'model_version', 'created_at')
-    list_filter = ('predicted_label', 'is_correct', 'model_version')
+    # __str__ de la observación incluye al usuario
+    list_select_related = ('observation__user', 'model_version')
+    list_filter = (PredictedLabelFilter, SpeciesFilter, 'is_correct', 'model_version')
+    date_hierarchy = 'created_at'
+    raw_id_fields = ('observation',)
+    autocomplete_fields = ('species', 'model_version')
     search_fields = ('predicted_label',)
 
 @admin.register(ModelVersion)
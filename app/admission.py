@@ -0,0 +1,207 @@
+"""
+Control de admisión para /api/predict_preview/ (público, va directo al
+servicio de IA).
+
+- Token bucket por IP y por usuario (throttles de DRF): 429 + Retry-After.
+  El estado vive en el cache de Django, compartido si el backend lo es.
+- Presupuesto de concurrencia hacia el servicio de IA, por proceso: como
+  mucho AI_PREVIEW_MAX_CONCURRENCY requests en vuelo y una cola corta de
+  AI_PREVIEW_MAX_QUEUE que espera hasta AI_PREVIEW_QUEUE_TIMEOUT. Si la
+  cola está llena o se vence la espera: 503 + Retry-After.
+
+Las métricas se consultan en /api/stats/admission/ (staff).
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from .profiling import percentile
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _percentiles(sorted_values):
+    out = {}
+    for pct in (50, 95, 99):
+        value = percentile(sorted_values, pct)
+        out[f"p{pct}"] = round(value, 1) if value is not None else None
+    return out
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit=None, max_queue=None, timeout=None, window=500):
+        self.limit = limit or getattr(settings, "AI_PREVIEW_MAX_CONCURRENCY", 4)
+        self.max_queue = (
+            max_queue
+            if max_queue is not None
+            else getattr(settings, "AI_PREVIEW_MAX_QUEUE", 8)
+        )
+        self.timeout = (
+            timeout
+            if timeout is not None
+            else getattr(settings, "AI_PREVIEW_QUEUE_TIMEOUT", 5.0)
+        )
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._max_waiting = 0
+        self._counts = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+        self._wait_ms = deque(maxlen=window)
+        self._service_ms = deque(maxlen=window)
+
+    def _retry_after(self) -> int:
+        # lo que tardaría en vaciarse la cola actual al ritmo reciente
+        recent = list(self._service_ms)[-50:]
+        avg_s = (sum(recent) / len(recent) / 1000.0) if recent else 1.0
+        return max(1, math.ceil(avg_s * (self._waiting + 1) / self.limit))
+
+    def _acquire(self):
+        start = time.monotonic()
+        with self._cond:
+            if self._in_flight >= self.limit:
+                if self._waiting >= self.max_queue:
+                    self._counts["rejected_queue_full"] += 1
+                    raise Overloaded("queue_full", self._retry_after())
+                self._waiting += 1
+                self._max_waiting = max(self._max_waiting, self._waiting)
+                try:
+                    ok = self._cond.wait_for(
+                        lambda: self._in_flight < self.limit, timeout=self.timeout
+                    )
+                finally:
+                    self._waiting -= 1
+                if not ok:
+                    self._counts["rejected_timeout"] += 1
+                    raise Overloaded("timeout", self._retry_after())
+            self._in_flight += 1
+            self._counts["admitted"] += 1
+            self._wait_ms.append((time.monotonic() - start) * 1000.0)
+
+    def _release(self, service_ms: float):
+        with self._cond:
+            self._in_flight -= 1
+            self._service_ms.append(service_ms)
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """Ocupa un lugar del presupuesto; levanta Overloaded si no hay."""
+        self._acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release((time.monotonic() - start) * 1000.0)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            wait = sorted(self._wait_ms)
+            service = sorted(self._service_ms)
+            return {
+                "limit": self.limit,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "max_waiting": self._max_waiting,
+                **self._counts,
+                "wait_ms": _percentiles(wait),
+                "service_ms": _percentiles(service),
+            }
+
+
+_throttle_lock = threading.Lock()
+_throttle_counts = {}
+# un lock por bucket (repartidos por hash de la clave): requests de IPs o
+# usuarios distintos no se esperan entre sí mientras hablan con el cache
+_bucket_locks = [threading.Lock() for _ in range(64)]
+
+
+def _bucket_lock(key: str) -> threading.Lock:
+    return _bucket_locks[hash(key) % len(_bucket_locks)]
+
+
+def _count_throttle(scope: str, event: str):
+    with _throttle_lock:
+        counts = _throttle_counts.setdefault(scope, {"allowed": 0, "rejected": 0})
+        counts[event] += 1
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket: `burst` tokens como máximo, se reponen a `rate_per_min`.
+    Las subclases definen `scope` y `get_cache_key`.
+    """
+
+    scope = None
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def get_rate(self):
+        buckets = getattr(settings, "AI_PREVIEW_BUCKETS", {})
+        conf = buckets.get(self.scope) or {}
+        return float(conf.get("rate_per_min", 30)) / 60.0, float(conf.get("burst", 10))
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        rate, burst = self.get_rate()
+        if rate <= 0:
+            return True
+
+        now = time.time()
+        ttl = math.ceil(burst / rate) + 1
+        # leer-calcular-escribir: serializado por bucket dentro del proceso;
+        # entre procesos puede colarse algún request de más, aceptable para
+        # un limitador
+        with _bucket_lock(key):
+            tokens, last = cache.get(key) or (burst, now)
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            cache.set(key, (tokens, now), timeout=ttl)
+
+        self._wait = None if allowed else (1.0 - tokens) / rate
+        _count_throttle(self.scope, "allowed" if allowed else "rejected")
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class PreviewIPThrottle(TokenBucketThrottle):
+    scope = "ip"
+
+    def get_cache_key(self, request, view):
+        return f"admission:{self.scope}:{self.get_ident(request)}"
+
+
+class PreviewUserThrottle(TokenBucketThrottle):
+    scope = "user"
+
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return f"admission:{self.scope}:{request.user.pk}"
+
+
+preview_limiter = ConcurrencyLimiter()
+
+
+def stats() -> dict:
+    with _throttle_lock:
+        throttles = {k: dict(v) for k, v in _throttle_counts.items()}
+    return {"concurrency": preview_limiter.snapshot(), "rate_limits": throttles}
@@ -0,0 +1,98 @@
+"""Cliente HTTP del servicio de IA (Flask, ai_service/app.py)."""
+from typing import List, Optional, Tuple
+
+import requests
+
+from django.conf import settings
+
+from . import tracing
+
+DEFAULT_PREDICT_URL = "http://127.0.0.1:5001/predict"
+
+
+class AIServiceError(Exception):
+    """El servicio de IA no respondió o respondió con error."""
+
+
+def predict_url() -> str:
+    return getattr(settings, "AI_PREDICT_URL", DEFAULT_PREDICT_URL)
+
+
+def _sibling_url(endpoint: str) -> str:
+    base = predict_url().rstrip("/")
+    if base.endswith("/predict"):
+        base = base[: -len("/predict")]
+    return f"{base}/{endpoint}"
+
+
+def predict_batch_url() -> str:
+    return getattr(settings, "AI_PREDICT_BATCH_URL", None) or _sibling_url(
+        "predict_batch"
+    )
+
+
+def health_url() -> str:
+    return _sibling_url("health")
+
+
+def service_version(timeout: float = 5) -> Optional[str]:
+    """Versión del modelo que está sirviendo el servicio (o None)."""
+    try:
+        r = requests.get(health_url(), timeout=timeout)
+        r.raise_for_status()
+        return r.json().get("version")
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def _read_photo(obs) -> Optional[bytes]:
+    if not obs.photo:
+        return None
+    try:
+        with obs.photo.open("rb") as f:
+            return f.read()
+    except (OSError, ValueError):
+        return None
+
+
+def predict_batch(observations, timeout: float = 120) -> Tuple[str, List[dict]]:
+    """
+    Clasifica las fotos de `observations` en un solo request a /predict_batch.
+
+    Devuelve (version, resultados) con un resultado por observación, en el
+    mismo orden. Las observaciones sin foto legible quedan como
+    {"error": ...} sin llegar al servicio.
+    """
+    results: List[Optional[dict]] = [None] * len(observations)
+    files, positions = [], []
+    for pos, obs in enumerate(observations):
+        content = _read_photo(obs)
+        if content is None:
+            results[pos] = {"error": "La observación no tiene foto."}
+            continue
+        name = obs.photo.name.split("/")[-1]
+        files.append(("images", (name, content, "image/jpeg")))
+        positions.append(pos)
+
+    if not files:
+        return "", results
+
+    url = predict_batch_url()
+    with tracing.span("ai.predict_batch", "CLIENT", **{"http.url": url}) as s:
+        s.tag("images", len(files))
+        try:
+            r = requests.post(url, files=files, timeout=timeout, headers=tracing.inject())
+        except requests.RequestException as e:
+            raise AIServiceError(str(e)) from e
+        s.tag("http.status_code", r.status_code)
+    if r.status_code != 200:
+        raise AIServiceError(f"HTTP {r.status_code}: {r.text[:200]}")
+
+    data = r.json()
+    remote = data.get("results") or []
+    if len(remote) != len(positions):
+        raise AIServiceError("Cantidad de resultados inesperada.")
+
+    for pos, item in zip(positions, remote):
+        results[pos] = item or {"error": "Sin resultado."}
+    return data.get("version", "unknown"), results
@@ -0,0 +1,160 @@
+"""
+Agregaciones de reportes calculadas en la base (TRUNC/FLOOR + GROUP BY):
+el tamaño de la respuesta depende de la granularidad, la cantidad de
+etiquetas o de celdas, no de cuántas observaciones tenga el usuario.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast, Floor, TruncDay, TruncMonth, TruncWeek, TruncYear
+
+GRANULARITIES = {
+    "day": TruncDay,
+    "week": TruncWeek,  # lunes de la semana (ISO)
+    "month": TruncMonth,
+    "year": TruncYear,
+}
+
+
+class InvalidParam(ValueError):
+    """Parámetro de reporte inválido (la vista responde 400 con el mensaje)."""
+
+
+def parse_granularity(value) -> str:
+    value = (value or "day").lower()
+    if value not in GRANULARITIES:
+        raise InvalidParam(f"'granularity' debe ser uno de: {', '.join(GRANULARITIES)}.")
+    return value
+
+
+def _bucket(granularity: str):
+    # `date` es DateField: el truncado no depende de la zona horaria
+    return GRANULARITIES[granularity]("date")
+
+
+def counts_by_bucket(qs, granularity: str):
+    """[{"date", "count"}] por período, `date` = inicio del período."""
+    rows = (
+        qs.annotate(bucket=_bucket(granularity))
+        .values("bucket")
+        .annotate(count=Count("id"))
+        .order_by("bucket")
+    )
+    return [{"date": row["bucket"].isoformat(), "count": row["count"]} for row in rows]
+
+
+def label_series(qs, granularity: str, labels=None, top: int = 5):
+    """
+    Serie por etiqueta (Inference.effective_label) en una sola query
+    agrupada por (período, etiqueta). Con `labels` se limita a esas; si no,
+    a las `top` con más observaciones del rango, y el resto va sumado en
+    "other". Observaciones sin inferencia no cuentan.
+    """
+    qs = qs.filter(inference__effective_label__gt="")
+    if labels:
+        qs = qs.filter(inference__effective_label__in=labels)
+    rows = (
+        qs.annotate(bucket=_bucket(granularity), label=F("inference__effective_label"))
+        .values("bucket", "label")
+        .annotate(count=Count("id"))
+        .order_by("bucket")
+    )
+
+    buckets, per_label, totals = [], {}, {}
+    for row in rows:
+        bucket = row["bucket"].isoformat()
+        if not buckets or buckets[-1] != bucket:
+            buckets.append(bucket)
+        per_label.setdefault(row["label"], {})[bucket] = row["count"]
+        totals[row["label"]] = totals.get(row["label"], 0) + row["count"]
+
+    ranked = sorted(totals, key=lambda label: (-totals[label], label))
+    shown = ranked if labels else ranked[:top]
+    series = [
+        {
+            "label": label,
+            "total": totals[label],
+            "counts": [per_label[label].get(b, 0) for b in buckets],
+        }
+        for label in shown
+    ]
+
+    rest = ranked[len(shown):]
+    other = None
+    if rest:
+        other = {
+            "labels": len(rest),
+            "total": sum(totals[label] for label in rest),
+            "counts": [sum(per_label[label].get(b, 0) for label in rest) for b in buckets],
+        }
+    return {"buckets": buckets, "series": series, "other": other}
+
+
+def parse_cell(value) -> Decimal:
+    if value in (None, ""):
+        return Decimal(str(getattr(settings, "REPORT_GRID_DEFAULT_CELL", "0.1")))
+    try:
+        cell = Decimal(value)
+    except InvalidOperation:
+        raise InvalidParam("'cell' inválido.")
+    # NaN/Infinity parsean bien pero no se pueden comparar
+    if not cell.is_finite():
+        raise InvalidParam("'cell' inválido.")
+    if not Decimal("0.001") <= cell <= Decimal("10"):
+        raise InvalidParam("'cell' debe estar entre 0.001 y 10 grados.")
+    return cell
+
+
+def parse_bbox(value):
+    """'minLon,minLat,maxLon,maxLat' -> tupla de Decimal (o None)."""
+    if not value:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = coords = [Decimal(v) for v in value.split(",")]
+    except (ValueError, InvalidOperation):
+        raise InvalidParam("'bbox' debe ser minLon,minLat,maxLon,maxLat.")
+    if not all(c.is_finite() for c in coords):
+        raise InvalidParam("'bbox' debe ser minLon,minLat,maxLon,maxLat.")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise InvalidParam("'bbox' invertido.")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def grid_counts(qs, cell: Decimal, bbox=None, limit: int = None):
+    """
+    Conteo por celda de `cell` grados (FLOOR(coord / cell) en la base).
+    Devuelve las `limit` celdas con más observaciones, con el centro de
+    cada celda, listo para un heatmap.
+    """
+    limit = limit or getattr(settings, "REPORT_GRID_MAX_CELLS", 2000)
+    if bbox:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        qs = qs.filter(
+            longitude__gte=min_lon,
+            longitude__lte=max_lon,
+            latitude__gte=min_lat,
+            latitude__lte=max_lat,
+        )
+
+    size = float(cell)
+    rows = list(
+        qs.annotate(
+            gy=Floor(Cast("latitude", FloatField()) / size),
+            gx=Floor(Cast("longitude", FloatField()) / size),
+        )
+        .values("gy", "gx")
+        .annotate(count=Count("id"))
+        .order_by("-count", "gy", "gx")[: limit + 1]
+    )
+
+    decimals = max(0, -cell.normalize().as_tuple().exponent) + 1
+    cells = [
+        {
+            "lat": round((int(row["gy"]) + 0.5) * size, decimals),
+            "lon": round((int(row["gx"]) + 0.5) * size, decimals),
+            "count": row["count"],
+        }
+        for row in rows[:limit]
+    ]
+    return {"cell": float(cell), "cells": cells, "truncated": len(rows) > limit}
@@ -1,6 +1,8 @@
 from typing import Any, Dict
+from datetime import timedelta
 from io import BytesIO
 import os
+import time
 import csv
 import json
 import requests
@@ -10,17 +12,17 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.core.mail import send_mail
-from django.db.models import Q, Value, CharField, QuerySet, Count
-from django.db.models.functions import Lower, Coalesce
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Q, F, Value, CharField, QuerySet, Count
+from django.db.models.functions import Lower, Coalesce, Greatest
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils.dateparse import parse_date
-from django.utils.encoding import force_bytes
-from django.utils.http import urlsafe_base64_encode
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
 from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
 
 from rest_framework import viewsets, permissions
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
@@ -29,11 +31,26 @@ from rest_framework.response import Response
 
 from .serializers import (
     ObservationSerializer,
+    ObservationRowReader,
     RegisterSerializer,
     PasswordResetRequestSerializer,
     PasswordResetConfirmSerializer,
 )
-from .models import Observation, Inference, ModelVersion
+from .models import Observation, Inference, Tombstone
+from .classification import parse_top_k, save_batch_results
+from .refcache import get_model_version
+from . import admission
+from .admission import Overloaded, PreviewIPThrottle, PreviewUserThrottle, preview_limiter
+from . import ai_client
+from . import analytics
+from . import exports
+from . import pdf
+from . import tracing
+from .versioning import conditional_on_data_version
+from .db_router import use_replica
+from .response_cache import cached_response
+from . import response_cache
+from .profiling import request_stats
 
 User = get_user_model()
 
@@ -106,32 +123,99 @@ class MeView(APIView):
         return Response({"id": u.id, "username": u.username, "email": u.email})
 
 
+def _inference_payload(inf):
+    return {
+        "id": inf.id,
+        "predicted_label": inf.predicted_label,
+        "confidence": float(inf.confidence),
+        "top_k": inf.top_k,
+        "is_correct": inf.is_correct,
+        "created_at": inf.created_at.isoformat(),
+    }
+
+
+def _post_to_ai(url, files):
+    """POST al servicio de IA en un span que le propaga el trace."""
+    with tracing.span("ai.predict", "CLIENT", **{"http.url": url}) as s:
+        r = requests.post(url, files=files, timeout=30, headers=tracing.inject())
+        s.tag("http.status_code", r.status_code)
+        return r
+
+
 class ClassifyObservationView(APIView):
+    """
+    Single-flight por observación, sin tener la fila bloqueada mientras se
+    espera al servicio de IA:
+
+    1. Transacción corta con SELECT ... FOR UPDATE: si ya hay inferencia se
+       devuelve; si no, se marca `classify_started_at` (el "claim").
+    2. Fuera de la transacción, el que tomó el claim llama a la IA y crea la
+       Inference (el mail con el PDF sale en on_commit, ver signals).
+    3. Un classify concurrente que encuentra el claim vigente espera hasta
+       CLASSIFY_WAIT_SECONDS a que aparezca la inferencia y la devuelve; si
+       no llega, 409 con Retry-After. El claim vence a los
+       CLASSIFY_CLAIM_SECONDS (proceso caído a mitad de camino).
+
+    La constraint 1 a 1 de Inference sigue cubriendo cualquier carrera que
+    quede (p. ej. un claim vencido con el primero todavía en curso).
+    """
+
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, observation_id: int):
-        obs = get_object_or_404(Observation, pk=observation_id, user=request.user)
+        now = timezone.now()
+        claim_ttl = timedelta(seconds=getattr(settings, "CLASSIFY_CLAIM_SECONDS", 60))
+
+        with transaction.atomic(), tracing.span("classify.claim"):
+            obs = get_object_or_404(
+                Observation.objects.select_for_update(),
+                pk=observation_id,
+                user=request.user,
+            )
+            # leer recién con el lock tomado (no el cache de la relación)
+            inf = Inference.objects.filter(observation=obs).first()
+            if inf:
+                return Response(_inference_payload(inf))
+            if not obs.photo:
+                return Response({"detail": "La observación no tiene foto."}, status=400)
 
-        if getattr(obs, "inference", None):
-            inf = obs.inference
-            return Response(
-                {
-                    "id": inf.id,
-                    "predicted_label": inf.predicted_label,
-                    "confidence": float(inf.confidence),
-                    "is_correct": inf.is_correct,
-                    "created_at": inf.created_at.isoformat(),
-                }
+            in_flight = obs.classify_started_at and now - obs.classify_started_at < claim_ttl
+            if not in_flight:
+                # update(): no toca updated_at (no es un cambio para el sync)
+                Observation.objects.filter(pk=obs.pk).update(classify_started_at=now)
+
+        if in_flight:
+            return self._wait_for_inference(obs)
+
+        try:
+            return self._classify(obs)
+        finally:
+            Observation.objects.filter(pk=obs.pk, classify_started_at=now).update(
+                classify_started_at=None
             )
 
-        if not obs.photo:
-            return Response({"detail": "La observación no tiene foto."}, status=400)
+    def _wait_for_inference(self, obs):
+        deadline = time.monotonic() + getattr(settings, "CLASSIFY_WAIT_SECONDS", 35)
+        with tracing.span("classify.wait"):
+            while True:
+                inf = Inference.objects.filter(observation=obs).first()
+                if inf:
+                    return Response(_inference_payload(inf))
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.2)
+        response = Response(
+            {"detail": "La observación se está clasificando."}, status=409
+        )
+        response["Retry-After"] = "5"
+        return response
 
+    def _classify(self, obs):
         with obs.photo.open("rb") as f:
             files = {"image": (obs.photo.name.split("/")[-1], f, "image/jpeg")}
             url = getattr(settings, "AI_PREDICT_URL", "http://localhost:5001/predict")
             try:
-                r = requests.post(url, files=files, timeout=30)
+                r = _post_to_ai(url, files)
             except requests.RequestException as e:
                 return Response(
                     {
@@ -147,27 +231,122 @@ class ClassifyObservationView(APIView):
             )
 
         data = r.json()
-        mv, _ = ModelVersion.objects.get_or_create(
-            name=data.get("version", "unknown")
-        )
+        mv = get_model_version(data.get("version", "unknown"))
 
-        inf = Inference.objects.create(
-            observation=obs,
-            predicted_label=data["label"],
-            confidence=float(data["confidence"]),
-            model_version=mv,
+        try:
+            with tracing.span("classify.save"), transaction.atomic():
+                inf = Inference.objects.create(
+                    observation=obs,
+                    predicted_label=data["label"],
+                    confidence=float(data["confidence"]),
+                    top_k=parse_top_k(data.get("top_k")),
+                    model_version=mv,
+                )
+        except IntegrityError:
+            inf = Inference.objects.get(observation=obs)
+            return Response(_inference_payload(inf))
+
+        return Response(_inference_payload(inf), status=201)
+
+
+class BulkClassifyObservationsView(APIView):
+    """
+    Clasifica varias observaciones del usuario en batches a /predict_batch.
+
+    Body: {"ids": [1, 2, ...]} o {"unclassified": true}. Las que ya tienen
+    inferencia se devuelven como "skipped", igual que el classify individual.
+    Con "unclassified" se procesan hasta `max_items` por pedido: la respuesta
+    trae "has_more" y "remaining" (las que siguen sin inferencia).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    max_items = 500
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        unclassified = str(request.data.get("unclassified", "")).lower() in (
+            "1",
+            "true",
         )
 
-        return Response(
-            {
-                "id": inf.id,
-                "predicted_label": inf.predicted_label,
-                "confidence": float(inf.confidence),
-                "is_correct": inf.is_correct,
-                "created_at": inf.created_at.isoformat(),
-            },
-            status=201,
+        qs = Observation.objects.filter(user=request.user).select_related(
+            "inference"
         )
+        if ids is not None:
+            if not isinstance(ids, list):
+                return Response({"detail": "'ids' debe ser una lista."}, status=400)
+            try:
+                ids = [int(i) for i in ids]
+            except (TypeError, ValueError):
+                return Response({"detail": "'ids' inválidos."}, status=400)
+            if len(ids) > self.max_items:
+                return Response(
+                    {"detail": f"Máximo {self.max_items} observaciones por pedido."},
+                    status=400,
+                )
+            qs = qs.filter(id__in=ids)
+        elif unclassified:
+            qs = qs.filter(inference__isnull=True)
+        else:
+            return Response(
+                {"detail": "Enviá 'ids' o 'unclassified': true."}, status=400
+            )
+
+        observations = list(qs.order_by("id")[: self.max_items + 1])
+        has_more = len(observations) > self.max_items
+        observations = observations[: self.max_items]
+        found = {o.id for o in observations}
+        results = [
+            {"observation_id": i, "status": "not_found"}
+            for i in (ids or [])
+            if i not in found
+        ]
+
+        pending = []
+        for obs in observations:
+            if getattr(obs, "inference", None):
+                results.append(
+                    {
+                        "observation_id": obs.id,
+                        "status": "skipped",
+                        "inference_id": obs.inference.id,
+                    }
+                )
+            else:
+                pending.append(obs)
+
+        batch_size = max(1, getattr(settings, "AI_BATCH_SIZE", 16))
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            try:
+                version, preds = ai_client.predict_batch(batch)
+            except ai_client.AIServiceError as e:
+                results.extend(
+                    {
+                        "observation_id": obs.id,
+                        "status": "error",
+                        "detail": "No se pudo contactar al servicio de IA.",
+                        "error": str(e),
+                    }
+                    for obs in pending[start:]
+                )
+                break
+
+            results.extend(
+                save_batch_results(batch, preds, get_model_version(version))
+            )
+
+        counts = {}
+        for item in results:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+        payload = {"counts": counts, "results": results}
+        if unclassified and ids is None:
+            payload["has_more"] = has_more
+            payload["remaining"] = Observation.objects.filter(
+                user=request.user, inference__isnull=True
+            ).count()
+        return Response(payload)
 
 
 class ValidateInferenceView(APIView):
@@ -196,8 +375,11 @@ class ValidateInferenceView(APIView):
 
 
 class PredictPreviewView(APIView):
+    """Público: limitado por IP/usuario y por concurrencia (app.admission)."""
+
     permission_classes = [permissions.AllowAny]
     parser_classes = [MultiPartParser, FormParser]
+    throttle_classes = [PreviewIPThrottle, PreviewUserThrottle]
 
     def post(self, request):
         if "image" not in request.FILES:
@@ -208,7 +390,18 @@ class PredictPreviewView(APIView):
         url = getattr(settings, "AI_PREDICT_URL", "http://127.0.0.1:5001/predict")
 
         try:
-            r = requests.post(url, files=files, timeout=30)
+            with preview_limiter.slot():
+                r = _post_to_ai(url, files)
+        except Overloaded as e:
+            response = Response(
+                {
+                    "detail": "El servicio de IA está saturado, reintentá en unos segundos.",
+                    "reason": e.reason,
+                },
+                status=503,
+            )
+            response["Retry-After"] = str(e.retry_after)
+            return response
         except requests.RequestException as e:
             return Response(
                 {
@@ -259,6 +452,23 @@ def _as_jpeg(uploaded):
     )
 
 
+def _create_preview_inference(obs, data):
+    """Persiste el preview de IA enviado junto con el alta (predicted_*)."""
+    pl = data.get("predicted_label")
+    pc = data.get("predicted_confidence")
+    pv = data.get("predicted_version")
+    top_k = data.get("predicted_top_k")
+    if pl and pc not in (None, "", "null"):
+        mv = get_model_version(pv)
+        Inference.objects.create(
+            observation=obs,
+            predicted_label=str(pl),
+            confidence=float(pc),
+            top_k=parse_top_k(top_k),
+            model_version=mv,
+        )
+
+
 class ObservationViewSet(viewsets.ModelViewSet):
     serializer_class = ObservationSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -307,6 +517,24 @@ class ObservationViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    @use_replica
+    @conditional_on_data_version
+    @cached_response(
+        "observation_list", params=("search", "ordering", "page", "fields")
+    )
+    def list(self, request, *args, **kwargs):
+        # lectura liviana: .values() + dicts planos, con ?fields= opcional
+        reader = ObservationRowReader(
+            request,
+            ObservationRowReader.parse_fields(request.query_params.get("fields")),
+        )
+        values = reader.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(values)
+        if page is not None:
+            return self.get_paginated_response(reader.rows(page))
+        return Response(reader.rows(values))
+
     def get_permissions(self):
         perms = super().get_permissions()
         if self.action in ["retrieve", "update", "partial_update", "destroy"]:
@@ -327,18 +555,7 @@ class ObservationViewSet(viewsets.ModelViewSet):
 
         photo_arg = _as_jpeg(uploaded) if _needs_convert(uploaded) else uploaded
         obs = serializer.save(user=self.request.user, photo=photo_arg)
-
-        pl = self.request.data.get("predicted_label")
-        pc = self.request.data.get("predicted_confidence")
-        pv = self.request.data.get("predicted_version")
-        if pl and pc not in (None, "", "null"):
-            mv, _ = ModelVersion.objects.get_or_create(name=pv or "unknown")
-            Inference.objects.create(
-                observation=obs,
-                predicted_label=str(pl),
-                confidence=float(pc),
-                model_version=mv,
-            )
+        _create_preview_inference(obs, self.request.data)
 
     def perform_update(self, serializer):
         uploaded = self.request.FILES.get("photo")
@@ -349,71 +566,297 @@ class ObservationViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 
-class ObservationSummaryView(APIView):
+class SyncUploadView(APIView):
+    """
+    Alta en lote para el sync offline del mobile.
+
+    multipart: "items" = JSON [{"client_key", "date", "latitude", "longitude",
+    "place_text", "photo": <nombre del campo del archivo>, "predicted_*"}]
+    más los archivos. Reenviar un client_key ya recibido no duplica: devuelve
+    la observación existente con status "exists".
+    """
+
     permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    max_items = 100
 
-    def get(self, request):
-        user = request.user
+    def post(self, request):
+        items = request.data.get("items")
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                return Response({"detail": "'items' no es JSON válido."}, status=400)
+        if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+            return Response({"detail": "'items' debe ser una lista."}, status=400)
+        if len(items) > self.max_items:
+            return Response(
+                {"detail": f"Máximo {self.max_items} observaciones por pedido."},
+                status=400,
+            )
 
-        date_from_str = request.query_params.get("from")
-        date_to_str = request.query_params.get("to")
+        keys = [str(item.get("client_key") or "").strip() for item in items]
+        existing = dict(
+            Observation.objects.filter(
+                user=request.user, client_key__in=[k for k in keys if k]
+            ).values_list("client_key", "id")
+        )
 
-        date_from = parse_date(date_from_str) if date_from_str else None
-        date_to = parse_date(date_to_str) if date_to_str else None
+        results = []
+        for item, key in zip(items, keys):
+            if not key or len(key) > 64:
+                results.append(
+                    {"client_key": key, "status": "error", "errors": {"client_key": "Inválido."}}
+                )
+                continue
+            if key in existing:
+                results.append({"client_key": key, "status": "exists", "id": existing[key]})
+                continue
+
+            uploaded = request.FILES.get(str(item.get("photo") or ""))
+            if not uploaded:
+                results.append(
+                    {
+                        "client_key": key,
+                        "status": "error",
+                        "errors": {"photo": "La foto es obligatoria."},
+                    }
+                )
+                continue
 
-        qs = Observation.objects.filter(user=user).select_related("inference")
+            data = {
+                f: item[f]
+                for f in ("date", "latitude", "longitude", "place_text")
+                if item.get(f) is not None
+            }
+            data["photo"] = uploaded
+            ser = ObservationSerializer(data=data, context={"request": request})
+            if not ser.is_valid():
+                results.append({"client_key": key, "status": "error", "errors": ser.errors})
+                continue
 
-        if date_from:
-            qs = qs.filter(date__gte=date_from)
-        if date_to:
-            qs = qs.filter(date__lte=date_to)
+            photo_arg = _as_jpeg(uploaded) if _needs_convert(uploaded) else uploaded
+            try:
+                with transaction.atomic():
+                    obs = ser.save(user=request.user, client_key=key, photo=photo_arg)
+                    _create_preview_inference(obs, item)
+            except IntegrityError:
+                # mismo client_key en un request concurrente
+                obs = Observation.objects.get(user=request.user, client_key=key)
+                results.append({"client_key": key, "status": "exists", "id": obs.id})
+                continue
 
-        total_observations = qs.count()
+            existing[key] = obs.id
+            results.append({"client_key": key, "status": "created", "id": obs.id})
 
-        qs_inf = qs.filter(inference__isnull=False).select_related(
-            "inference__species"
-        )
+        return Response({"results": results})
+
+
+def _encode_cursor(ts, last_id: int) -> str:
+    return urlsafe_base64_encode(force_bytes(f"{ts.isoformat()}|{last_id}"))
+
+
+def _decode_cursor(cursor: str):
+    try:
+        ts_str, id_str = force_str(urlsafe_base64_decode(cursor)).split("|")
+        ts = parse_datetime(ts_str)
+        if ts is None:
+            raise ValueError
+        return ts, int(id_str)
+    except (ValueError, TypeError):
+        return None
+
+
+class SyncChangesView(APIView):
+    """
+    Delta-sync: observaciones (con su inferencia) cambiadas desde `cursor`
+    y borrados (tombstones). Sin cursor devuelve todo, sin borrados.
+
+    Respuesta: {"observations", "deleted": {"observations", "inferences"},
+    "cursor", "has_more"}. Los ids en deleted.inferences son de observación.
+
+    El cursor final queda SYNC_CURSOR_MARGIN_SECONDS antes del inicio del
+    request: una fila cuya transacción confirma tarde lleva un updated_at
+    anterior a "ahora" y sin el margen no llegaría nunca. Lo que cae en el
+    margen se reenvía en el próximo sync (el cliente aplica por id).
+    Por lo mismo un borrado puede llegar en más de un sync: el cliente
+    tiene que deduplicar los ids de deleted (borrar algo ya borrado no
+    es un error).
+
+    Los tombstones se podan a los SYNC_TOMBSTONE_RETENTION_DAYS días
+    (prune_tombstones). Un cursor más viejo que eso ya no puede ver todos
+    los borrados: responde 410 y el cliente resincroniza sin cursor.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 200
+    max_limit = 1000
+
+    def get(self, request):
+        now = timezone.now()
+        user = request.user
 
-        qs_inf = (
-            qs_inf.annotate(
-                label=Coalesce(
-                    "inference__species__name",
-                    "inference__predicted_label",
-                    output_field=CharField(),
+        try:
+            limit = int(request.query_params.get("limit") or self.default_limit)
+        except ValueError:
+            return Response({"detail": "'limit' inválido."}, status=400)
+        limit = max(1, min(limit, self.max_limit))
+
+        cursor = request.query_params.get("cursor")
+        since = _decode_cursor(cursor) if cursor else None
+        if cursor and since is None:
+            return Response({"detail": "Cursor inválido."}, status=400)
+        cutoff = Tombstone.retention_cutoff(now)
+        if since and cutoff and since[0] < cutoff:
+            return Response(
+                {"detail": "Cursor vencido: resincronizar sin cursor."}, status=410
+            )
+
+        qs = (
+            Observation.objects.filter(user=user)
+            .select_related("inference")
+            .annotate(
+                changed_at=Greatest(
+                    "updated_at", Coalesce("inference__updated_at", "updated_at")
                 )
             )
-            .exclude(label__isnull=True)
-            .exclude(label__exact="")
         )
+        if since:
+            ts, last_id = since
+            qs = qs.filter(
+                Q(changed_at__gt=ts) | Q(changed_at=ts, id__gt=last_id)
+            )
+        rows = list(qs.order_by("changed_at", "id")[: limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        deleted = {"observations": [], "inferences": []}
+        if since:
+            tombstones = Tombstone.objects.filter(
+                user=user, deleted_at__gt=since[0]
+            ).values_list("kind", "object_id")
+            for kind, object_id in tombstones:
+                key = (
+                    "observations"
+                    if kind == Tombstone.KIND_OBSERVATION
+                    else "inferences"
+                )
+                deleted[key].append(object_id)
 
-        distinct_species_count = qs_inf.values("label").distinct().count()
+        if has_more:
+            next_cursor = _encode_cursor(rows[-1].changed_at, rows[-1].id)
+        else:
+            margin = timedelta(seconds=getattr(settings, "SYNC_CURSOR_MARGIN_SECONDS", 60))
+            next_cursor = _encode_cursor(now - margin, 0)
 
-        species_counts_qs = (
-            qs_inf.values("label")
-            .annotate(count=Count("id"))
-            .order_by("-count", "label")
+        data = ObservationSerializer(
+            rows, many=True, context={"request": request}
+        ).data
+        return Response(
+            {
+                "observations": data,
+                "deleted": deleted,
+                "cursor": next_cursor,
+                "has_more": has_more,
+            }
         )
 
-        species_counts = [
-            {"label": row["label"], "count": row["count"]}
-            for row in species_counts_qs
-        ]
 
-        dates_qs = (
-            qs.values("date").annotate(count=Count("id")).order_by("date")
-        )
+class CacheStatsView(APIView):
+    """Hit rate del cache de respuestas, por vista (solo staff)."""
 
-        observations_by_date = [
-            {"date": row["date"].isoformat(), "count": row["count"]}
-            for row in dates_qs
-        ]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+class AdmissionStatsView(APIView):
+    """Admisión de predict_preview: en vuelo, cola y rechazos (solo staff)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(admission.stats())
+
+
+class RequestStatsView(APIView):
+    """
+    Percentiles por vista de tiempo total, queries y tiempo en la DB del
+    proceso que atiende el request (solo staff). DELETE reinicia las métricas.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(request_stats.snapshot())
+
+    def delete(self, request):
+        request_stats.reset()
+        return Response(status=204)
+
+
+def _species_counts(qs):
+    """[{"label", "count"}] agrupando por Inference.effective_label (indexado)."""
+    return list(
+        qs.filter(inference__effective_label__gt="")
+        .values(label=F("inference__effective_label"))
+        .annotate(count=Count("id"))
+        .order_by("-count", "label")
+    )
+
+
+def _filtered_by_range(request):
+    """(observaciones del usuario filtradas por ?from / ?to, date_from, date_to)."""
+    date_from_str = request.query_params.get("from")
+    date_to_str = request.query_params.get("to")
+
+    date_from = parse_date(date_from_str) if date_from_str else None
+    date_to = parse_date(date_to_str) if date_to_str else None
+
+    qs = Observation.objects.filter(user=request.user)
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+    return qs, date_from, date_to
+
+
+def _range_filters(date_from, date_to) -> dict:
+    return {
+        "from": date_from.isoformat() if date_from else None,
+        "to": date_to.isoformat() if date_to else None,
+    }
+
+
+class ObservationSummaryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @use_replica
+    @conditional_on_data_version
+    @cached_response("observation_summary", params=("from", "to", "granularity"))
+    def get(self, request):
+        try:
+            granularity = analytics.parse_granularity(
+                request.query_params.get("granularity")
+            )
+        except analytics.InvalidParam as e:
+            return Response({"detail": str(e)}, status=400)
+
+        qs, date_from, date_to = _filtered_by_range(request)
+
+        total_observations = qs.count()
+
+        species_counts = _species_counts(qs)
+        distinct_species_count = len(species_counts)
+
+        # `date` de cada fila = inicio del período (día, semana, mes o año)
+        observations_by_date = analytics.counts_by_bucket(qs, granularity)
 
         return Response(
             {
-                "filters": {
-                    "from": date_from.isoformat() if date_from else None,
-                    "to": date_to.isoformat() if date_to else None,
-                },
+                "filters": _range_filters(date_from, date_to),
+                "granularity": granularity,
                 "total_observations": total_observations,
                 "distinct_species_count": distinct_species_count,
                 "species_counts": species_counts,
@@ -422,253 +865,224 @@ class ObservationSummaryView(APIView):
         )
 
 
-class ObservationExportCsvView(APIView):
+class ObservationTimeseriesView(APIView):
+    """
+    Serie temporal por especie: ?granularity=day|week|month|year, y
+    ?label=X (repetible) o ?top=N (las N con más observaciones).
+    """
+
     permission_classes = [permissions.IsAuthenticated]
 
+    @use_replica
+    @conditional_on_data_version
+    @cached_response(
+        "observation_timeseries", params=("from", "to", "granularity", "label", "top")
+    )
     def get(self, request):
-        user = request.user
+        max_labels = getattr(settings, "REPORT_SERIES_MAX_LABELS", 20)
+        labels = request.query_params.getlist("label")
+        try:
+            granularity = analytics.parse_granularity(
+                request.query_params.get("granularity") or "month"
+            )
+            top = int(request.query_params.get("top") or 5)
+        except (analytics.InvalidParam, ValueError) as e:
+            detail = str(e) if isinstance(e, analytics.InvalidParam) else "'top' inválido."
+            return Response({"detail": detail}, status=400)
+        if not 1 <= top <= max_labels or len(labels) > max_labels:
+            return Response(
+                {"detail": f"Como máximo {max_labels} especies por serie."}, status=400
+            )
 
-        date_from_str = request.query_params.get("from")
-        date_to_str = request.query_params.get("to")
+        qs, date_from, date_to = _filtered_by_range(request)
+        data = analytics.label_series(qs, granularity, labels=labels, top=top)
+        return Response(
+            {"filters": _range_filters(date_from, date_to), "granularity": granularity, **data}
+        )
 
-        date_from = parse_date(date_from_str) if date_from_str else None
-        date_to = parse_date(date_to_str) if date_to_str else None
 
-        qs = Observation.objects.filter(user=user).select_related(
-            "inference__species", "inference__model_version"
-        )
+class ObservationGridView(APIView):
+    """
+    Conteo por celda de una grilla de ?cell grados (heatmap), opcionalmente
+    dentro de ?bbox=minLon,minLat,maxLon,maxLat y para una ?label.
+    """
 
-        if date_from:
-            qs = qs.filter(date__gte=date_from)
-        if date_to:
-            qs = qs.filter(date__lte=date_to)
+    permission_classes = [permissions.IsAuthenticated]
 
-        response = HttpResponse(content_type="text/csv")
-        filename = "observations_export.csv"
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    @use_replica
+    @conditional_on_data_version
+    @cached_response("observation_grid", params=("from", "to", "cell", "bbox", "label"))
+    def get(self, request):
+        try:
+            cell = analytics.parse_cell(request.query_params.get("cell"))
+            bbox = analytics.parse_bbox(request.query_params.get("bbox"))
+        except analytics.InvalidParam as e:
+            return Response({"detail": str(e)}, status=400)
 
-        writer = csv.writer(response)
-        writer.writerow(
-            [
-                "id",
-                "date",
-                "latitude",
-                "longitude",
-                "place_text",
-                "species_label",
-                "confidence",
-                "model_version",
-                "created_at",
-            ]
+        qs, date_from, date_to = _filtered_by_range(request)
+        label = request.query_params.get("label")
+        if label:
+            qs = qs.filter(inference__effective_label=label)
+
+        return Response(
+            {"filters": _range_filters(date_from, date_to), **analytics.grid_counts(qs, cell, bbox)}
         )
 
-        for obs in qs:
-            inf = getattr(obs, "inference", None)
-            if inf:
-                species_label = (
-                    inf.species.name if inf.species else inf.predicted_label
-                )
-                confidence = inf.confidence
-                model_version = (
-                    inf.model_version.name if inf.model_version else ""
-                )
-            else:
-                species_label = ""
-                confidence = ""
-                model_version = ""
-
-            writer.writerow(
-                [
-                    obs.id,
-                    obs.date.isoformat(),
-                    str(obs.latitude),
-                    str(obs.longitude),
-                    obs.place_text,
-                    species_label,
-                    confidence,
-                    model_version,
-                    obs.created_at.isoformat() if obs.created_at else "",
-                ]
+
+class ObservationExportCsvView(APIView):
+    """
+    Export de observaciones del usuario. `output` elige el formato: csv
+    (default), parquet, arrow o geojson (ver app.exports).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @use_replica
+    @conditional_on_data_version
+    def get(self, request):
+        output = request.query_params.get("output", "csv").lower()
+        if not exports.available(output):
+            return Response(
+                {"detail": f"Formato '{output}' no disponible."}, status=400
             )
 
+        qs, _, _ = _filtered_by_range(request)
+
+        # solo las columnas del export, sin instanciar modelos
+        rows = qs.values_list(*exports.EXPORT_FIELDS)
+        # el stream se consume después de salir del handler (y del
+        # @use_replica): fijar el alias ahora
+        rows = rows.using(rows.db).iterator(chunk_size=2000)
+
+        if output == "csv":
+            content = _csv_lines(rows)
+        elif output == "geojson":
+            content = exports.geojson_chunks(rows)
+        else:
+            content = exports.columnar_chunks(rows, output)
+
+        content_type, extension, _ = exports.FORMATS[output]
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"observations_export.{extension}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
         return response
 
 
-class ObservationExportPdfView(APIView):
+class ObservationExportZipView(APIView):
+    """ZIP con las fotos del rango y observations.csv (ver exports.zip_chunks)."""
+
     permission_classes = [permissions.IsAuthenticated]
 
+    @use_replica
+    @conditional_on_data_version
     def get(self, request):
-        user = request.user
+        qs, _, _ = _filtered_by_range(request)
 
-        date_from_str = request.query_params.get("from")
-        date_to_str = request.query_params.get("to")
+        # se consume después del handler: fijar el alias de lectura
+        qs = qs.using(qs.db)
+        response = StreamingHttpResponse(
+            exports.zip_chunks(qs), content_type="application/zip"
+        )
+        filename = "observations_export.zip"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
-        date_from = parse_date(date_from_str) if date_from_str else None
-        date_to = parse_date(date_to_str) if date_to_str else None
 
-        qs = Observation.objects.filter(user=user).select_related(
-            "inference__species", "inference__model_version"
-        )
-        if date_from:
-            qs = qs.filter(date__gte=date_from)
-        if date_to:
-            qs = qs.filter(date__lte=date_to)
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de escribirla."""
 
-        total_observations = qs.count()
+    def write(self, value):
+        return value
 
-        qs_inf = (
-            qs.filter(inference__isnull=False)
-            .annotate(
-                label=Coalesce(
-                    "inference__species__name",
-                    "inference__predicted_label",
-                    output_field=CharField(),
-                )
-            )
-            .exclude(label__isnull=True)
-            .exclude(label__exact="")
-        )
 
-        distinct_species_count = qs_inf.values("label").distinct().count()
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(
+        [
+            "id",
+            "date",
+            "latitude",
+            "longitude",
+            "place_text",
+            "species_label",
+            "confidence",
+            "model_version",
+            "created_at",
+        ]
+    )
 
-        species_counts_qs = (
-            qs_inf.values("label")
-            .annotate(count=Count("id"))
-            .order_by("-count", "label")
-        )
-        species_counts = list(species_counts_qs)
+    for (
+        obs_id,
+        date,
+        latitude,
+        longitude,
+        place_text,
+        inf_id,
+        species_label,
+        confidence,
+        model_version,
+        created_at,
+    ) in rows:
+        if inf_id is not None:
+            model_version = model_version or ""
+        else:
+            species_label = ""
+            confidence = ""
+            model_version = ""
 
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = (
-            'attachment; filename="observations_report.pdf"'
+        yield writer.writerow(
+            [
+                obs_id,
+                date.isoformat(),
+                str(latitude),
+                str(longitude),
+                place_text,
+                species_label,
+                confidence,
+                model_version,
+                created_at.isoformat() if created_at else "",
+            ]
         )
 
-        p = canvas.Canvas(response, pagesize=A4)
-        width, height = A4
-        y = height - 50
-
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(50, y, "Informe de observaciones — BeetleApp")
-        y -= 30
-
-        p.setFont("Helvetica", 10)
-        rango_txt = "Todo el historial"
-        if date_from or date_to:
-            d1 = date_from.isoformat() if date_from else "inicio"
-            d2 = date_to.isoformat() if date_to else "hoy"
-            rango_txt = f"Rango: {d1} a {d2}"
-        p.drawString(50, y, rango_txt)
-        y -= 20
-
-        p.drawString(50, y, f"Usuario: {user.username}")
-        y -= 30
-
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y, "Resumen general")
-        y -= 20
-
-        p.setFont("Helvetica", 10)
-        p.drawString(
-            60, y, f"Total de observaciones: {total_observations}"
-        )
-        y -= 15
-        p.drawString(
-            60,
-            y,
-            f"Especies distintas observadas: {distinct_species_count}",
-        )
-        y -= 30
 
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y, "Especies (conteo)")
-        y -= 18
+class ObservationExportPdfView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
-        p.setFont("Helvetica", 10)
-        if not species_counts:
-            p.drawString(60, y, "No hay especies en este rango.")
-            y -= 15
-        else:
-            p.drawString(60, y, "Especie")
-            p.drawString(320, y, "Observaciones")
-            y -= 15
-            p.line(60, y, width - 60, y)
-            y -= 10
-
-            for row in species_counts:
-                label = row["label"]
-                count = row["count"]
-                if y < 80:
-                    p.showPage()
-                    y = height - 50
-                    p.setFont("Helvetica", 10)
-
-                p.drawString(60, y, str(label))
-                p.drawRightString(width - 60, y, str(count))
-                y -= 14
-
-        y -= 30
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y, "Detalle de observaciones")
-        y -= 18
-
-        p.setFont("Helvetica", 10)
-
-        obs_list = qs.order_by("date", "id")
-
-        if not obs_list:
-            p.drawString(60, y, "No hay observaciones en este rango.")
-            y -= 15
-        else:
-            for obs in obs_list:
-                if y < 80:
-                    p.showPage()
-                    y = height - 50
-                    p.setFont("Helvetica-Bold", 12)
-                    p.drawString(
-                        50, y, "Detalle de observaciones (cont.)"
-                    )
-                    y -= 18
-                    p.setFont("Helvetica", 10)
-
-                p.drawString(50, y, f"Fecha: {obs.date.isoformat()}")
-                y -= 12
-                p.drawString(50, y, f"Lugar: {obs.place_text or '-'}")
-                y -= 12
-                p.drawString(
-                    50,
-                    y,
-                    f"Coordenadas: ({obs.latitude}, {obs.longitude})",
-                )
-                y -= 12
+    @use_replica
+    @conditional_on_data_version
+    def get(self, request):
+        user = request.user
 
-                inf = getattr(obs, "inference", None)
-                if inf:
-                    species_label = (
-                        inf.species.name
-                        if inf.species
-                        else inf.predicted_label
-                    )
-                    p.drawString(
-                        50,
-                        y,
-                        f"Especie: {species_label}  ·  Confianza: {inf.confidence:.1f}",
-                    )
-                    y -= 12
-                    if inf.model_version:
-                        p.drawString(
-                            50, y, f"Modelo: {inf.model_version.name}"
-                        )
-                        y -= 12
-                else:
-                    p.drawString(
-                        50,
-                        y,
-                        "Inferencia: (sin inferencia asociada aún)",
-                    )
-                    y -= 12
+        qs, date_from, date_to = _filtered_by_range(request)
 
-                y -= 8
+        total_observations = qs.count()
+        species_counts = _species_counts(qs)
+
+        rows = qs.order_by("date", "id").values_list(
+            "date",
+            "place_text",
+            "latitude",
+            "longitude",
+            "inference__id",
+            "inference__effective_label",
+            "inference__confidence",
+            "inference__model_version__name",
+        )
 
-        p.showPage()
-        p.save()
-        return response
+        out = pdf.spooled_file()
+        pdf.render_report(
+            out,
+            user.username,
+            date_from,
+            date_to,
+            total_observations,
+            species_counts,
+            rows.iterator(chunk_size=2000),
+        )
+        out.seek(0)
+        return FileResponse(
+            out,
+            as_attachment=True,
+            filename="observations_report.pdf",
+            content_type="application/pdf",
+        )
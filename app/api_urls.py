@@ -5,14 +5,21 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .api import ObservationViewSet
 from .api import (
     RegisterView, PasswordResetRequestView, PasswordResetConfirmView, MeView,
-    ClassifyObservationView, ValidateInferenceView, PredictPreviewView,
+    ClassifyObservationView, BulkClassifyObservationsView,
+    ValidateInferenceView, PredictPreviewView,
     ObservationSummaryView, ObservationExportCsvView, ObservationExportPdfView,
+    ObservationExportZipView, ObservationTimeseriesView, ObservationGridView,
+    SyncUploadView, SyncChangesView, CacheStatsView, RequestStatsView,
+    AdmissionStatsView,
 )
 
 router = DefaultRouter()
 router.register("observations", ObservationViewSet, basename="observation")
 
 urlpatterns = [
+    # antes del router: si no, "classify" matchea como pk del detalle
+    path("observations/classify/", BulkClassifyObservationsView.as_view(), name="bulk_classify_observations"),
+
     path("", include(router.urls)),
 
     # Auth
@@ -28,9 +35,21 @@ urlpatterns = [
     path("inferences/<int:inference_id>/validate/", ValidateInferenceView.as_view(), name="validate_inference"),
     path("predict_preview/", PredictPreviewView.as_view(), name="predict_preview"),
 
+    # Sync offline (mobile)
+    path("sync/upload/", SyncUploadView.as_view(), name="sync_upload"),
+    path("sync/changes/", SyncChangesView.as_view(), name="sync_changes"),
+
     #Reportes
     path("reports/observations/summary/",ObservationSummaryView.as_view(),name="observations_summary",),
+    path("reports/observations/timeseries/", ObservationTimeseriesView.as_view(), name="observations_timeseries"),
+    path("reports/observations/grid/", ObservationGridView.as_view(), name="observations_grid"),
     path("reports/observations/export/",ObservationExportCsvView.as_view(),name="observations_export_csv",),
     path("reports/observations/export_pdf/",ObservationExportPdfView.as_view(),name="observations_export_pdf",
     ),
+    path("reports/observations/export_zip/", ObservationExportZipView.as_view(), name="observations_export_zip"),
+
+    # Métricas (staff)
+    path("stats/cache/", CacheStatsView.as_view(), name="stats_cache"),
+    path("stats/requests/", RequestStatsView.as_view(), name="stats_requests"),
+    path("stats/admission/", AdmissionStatsView.as_view(), name="stats_admission"),
 ]
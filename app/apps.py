@@ -6,4 +6,4 @@ class AppConfig(AppConfig):
     name = 'app'
 
     def ready(self):
-        from . import signals
\ No newline at end of file
+        from . import checks, signals
\ No newline at end of file
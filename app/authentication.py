@@ -0,0 +1,124 @@
+"""
+Autenticación JWT sin SELECT del usuario en cada request.
+
+La firma y la expiración las verifica simplejwt como siempre; el usuario
+del claim `user_id` se arma desde una copia en el cache de Django
+(AUTH_USER_CACHE_SECONDS, 0 = sin cache) y solo va a la base si no está.
+La copia guarda solo CACHED_FIELDS (lo que usan la autenticación, los
+permisos y MeView), nunca el hash de la contraseña: request.user es un User
+con el resto de los campos diferidos, que Django lee de la base si alguien
+los pide. Con CHECK_REVOKE_TOKEN se guarda además el md5 del hash, que es
+lo mismo que ya viaja en el claim del token.
+
+Los signals de post_save / post_delete del User (cambio de contraseña,
+desactivación, edición en el admin) borran la copia. Un `.update()` sobre
+el queryset no dispara signals: ese caso se corrige al vencer el TTL.
+
+El borrado solo llega a todos los workers si el cache se comparte entre
+procesos. Con LocMemCache en AUTH_USER_CACHE_ALIAS la copia no se usa (un
+worker seguiría aceptando a un usuario desactivado en otro hasta el TTL),
+salvo AUTH_USER_CACHE_ALLOW_LOCAL=True para un único proceso; ver
+app.checks.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .checks import is_process_local
+
+
+def cache_alias() -> str:
+    return getattr(settings, "AUTH_USER_CACHE_ALIAS", "default")
+
+
+def cache_enabled() -> bool:
+    """Hay TTL y el cache es compartido (o se aceptó uno por proceso)."""
+    if not getattr(settings, "AUTH_USER_CACHE_SECONDS", 60):
+        return False
+    return not is_process_local(cache_alias()) or getattr(
+        settings, "AUTH_USER_CACHE_ALLOW_LOCAL", False
+    )
+
+
+def _cache():
+    return caches[cache_alias()]
+
+
+def _ttl() -> int:
+    return getattr(settings, "AUTH_USER_CACHE_SECONDS", 60)
+
+
+def _key(user_id) -> str:
+    return f"authuser:{user_id}"
+
+
+CACHED_FIELDS = ("id", "username", "email", "is_active", "is_staff", "is_superuser")
+
+
+def _fields(model):
+    return [f.attname for f in model._meta.concrete_fields if f.name in CACHED_FIELDS]
+
+
+def cached_user(user_id):
+    """(User, md5 del hash de la contraseña o None) desde el cache sin query, o None."""
+    entry = _cache().get(_key(user_id))
+    if not isinstance(entry, tuple) or len(entry) != 2:
+        return None
+    values, password_md5 = entry
+    User = get_user_model()
+    names = _fields(User)
+    if len(values) != len(names):
+        # copia guardada con otra versión del modelo o de CACHED_FIELDS
+        return None
+    return User.from_db(DEFAULT_DB_ALIAS, names, values), password_md5
+
+
+def remember(user):
+    password_md5 = (
+        get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+    )
+    values = [getattr(user, n) for n in _fields(type(user))]
+    _cache().set(_key(user.pk), (values, password_md5), _ttl())
+
+
+def invalidate(user_id):
+    _cache().delete(_key(user_id))
+    # un request concurrente pudo volver a guardar la fila sin confirmar
+    transaction.on_commit(lambda: _cache().delete(_key(user_id)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if not cache_enabled() or api_settings.USER_ID_FIELD != "id":
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        cached = cached_user(user_id)
+        if cached is None:
+            user = super().get_user(validated_token)
+            remember(user)
+            return user
+        user, password_md5 = cached
+
+        # mismas verificaciones que simplejwt hace sobre la fila
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if password_md5 is None:
+                # copia guardada con el chequeo apagado
+                password_md5 = get_md5_hash_password(user.password)
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_md5:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+        return user
@@ -0,0 +1,61 @@
+"""
+System checks de la app (se registran en AppConfig.ready).
+
+Parte del estado que la app guarda en el cache de Django tiene que ser el
+mismo para todos los workers: el usuario autenticado (app.authentication)
+y el pin a default después de escribir (app.db_router). LocMemCache vive
+dentro de cada proceso, así que con varios workers de gunicorn lo que
+escribe o invalida uno no lo ven los demás.
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import db_router
+
+
+def is_process_local(alias: str = "default") -> bool:
+    """True si el cache `alias` no se comparte entre procesos."""
+    return isinstance(caches[alias], LocMemCache)
+
+
+@checks.register(checks.Tags.caches)
+def auth_user_cache_check(app_configs, **kwargs):
+    from . import authentication
+
+    if not getattr(settings, "AUTH_USER_CACHE_SECONDS", 60):
+        return []
+    if authentication.cache_enabled():
+        return []
+    return [
+        checks.Warning(
+            "El cache del usuario autenticado está apagado: "
+            f"'{authentication.cache_alias()}' es LocMemCache (uno por proceso).",
+            hint=(
+                "Usá un cache compartido (Redis, Memcached) en AUTH_USER_CACHE_ALIAS, "
+                "o AUTH_USER_CACHE_ALLOW_LOCAL=True si corre un único proceso."
+            ),
+            id="app.W001",
+        )
+    ]
+
+
+@checks.register(checks.Tags.caches)
+def replica_pin_cache_check(app_configs, **kwargs):
+    if not db_router.replica_enabled():
+        return []
+    if not is_process_local() and not isinstance(caches["default"], DummyCache):
+        return []
+    return [
+        checks.Error(
+            "Con réplica configurada el cache 'default' tiene que ser compartido "
+            "entre procesos: ahí vive el pin de read-your-writes.",
+            hint=(
+                "CACHE_BACKEND con Redis o Memcached (o FileBasedCache en un solo host), "
+                "o REPLICA_ENABLED=0."
+            ),
+            id="app.E001",
+        )
+    ]
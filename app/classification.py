@@ -0,0 +1,227 @@
+"""Persistencia de resultados del servicio de IA sobre Inference."""
+import json
+from typing import Dict, Iterable, List
+
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Inference, ModelVersion, Observation, Species
+from . import refcache, versioning
+
+
+def parse_top_k(raw) -> list:
+    """Normaliza el top-k del servicio de IA (lista o JSON en multipart)."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return []
+    if not isinstance(raw, list):
+        return []
+
+    out = []
+    for item in raw:
+        try:
+            out.append(
+                {
+                    "label": str(item["label"]),
+                    "confidence": round(float(item["confidence"]), 2),
+                }
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return out
+
+
+def resolve_species(labels: Iterable[str]) -> Dict[str, str]:
+    """
+    {etiqueta en minúsculas: nombre de Species} para las etiquetas que
+    coinciden (sin distinguir mayúsculas) con una especie. Sale de
+    app.refcache: sin queries mientras la tabla no cambie.
+    """
+    wanted = {label.lower() for label in labels if label}
+    if not wanted:
+        return {}
+    names = refcache.species.names_by_lower()
+    return {label: names[label] for label in wanted if label in names}
+
+
+def effective_label(species_name, predicted_label: str, resolved: Dict[str, str]) -> str:
+    """Especie validada si la hay; si no, la predicción canonizada a Species."""
+    if species_name is not None:
+        return species_name
+    label = predicted_label or ""
+    return resolved.get(label.lower(), label)
+
+
+def apply_effective_labels(inferences) -> None:
+    """
+    Calcula `effective_label` en memoria para un batch de inferencias (para
+    bulk_create/bulk_update, que no pasan por el pre_save).
+    """
+    inferences = list(inferences)
+    resolved = resolve_species(
+        i.predicted_label for i in inferences if not i.species_id
+    )
+    for inf in inferences:
+        species_name = None
+        if inf.species_id:
+            sp = refcache.species.get_by_pk(inf.species_id) or inf.species
+            species_name = sp.name
+        inf.effective_label = effective_label(species_name, inf.predicted_label, resolved)
+
+
+def effective_label_expression():
+    """La misma regla que `effective_label`, como expresión SQL para UPDATE."""
+    return Coalesce(
+        Subquery(Species.objects.filter(pk=OuterRef("species_id")).values("name")[:1]),
+        Subquery(
+            Species.objects.filter(name__iexact=OuterRef("predicted_label")).values(
+                "name"
+            )[:1]
+        ),
+        F("predicted_label"),
+    )
+
+
+def refresh_effective_labels(queryset) -> int:
+    """
+    Recalcula `effective_label` de un queryset de Inference con un UPDATE
+    (p. ej. cuando se renombra o borra una especie). Incrementa la versión
+    de datos de los usuarios afectados.
+    """
+    user_ids = list(
+        Observation.objects.filter(inference__in=queryset)
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    if not user_ids:
+        return 0
+    updated = queryset.update(effective_label=effective_label_expression())
+    versioning.bump(user_ids)
+    return updated
+
+
+def _claim_unclassified(observation_ids):
+    """
+    Bloquea las observaciones (SELECT ... FOR UPDATE SKIP LOCKED, sin esperar
+    a las que tiene otro classify en curso) y devuelve (ids libres, {id de
+    observación: id de la inferencia que ya tiene}). Las bloqueadas por otro
+    request no aparecen en ninguno de los dos. Llamar dentro de una transacción.
+    """
+    locked = set(
+        Observation.objects.select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        )
+        .filter(id__in=observation_ids)
+        .values_list("id", flat=True)
+    )
+    taken = dict(
+        Inference.objects.filter(observation_id__in=observation_ids).values_list(
+            "observation_id", "id"
+        )
+    )
+    return locked - set(taken), taken
+
+
+def save_batch_results(
+    observations, results: List[dict], model_version: ModelVersion
+) -> List[dict]:
+    """
+    Guarda un batch de resultados con bulk_create/bulk_update.
+
+    Las observaciones deben venir con `select_related("inference")`. Si la
+    etiqueta cambia, la validación previa (`is_correct`) deja de aplicar y
+    se resetea. Como bulk_create no emite post_save, no se envían mails y la
+    versión de datos de los usuarios se incrementa acá.
+
+    Las que no tenían inferencia se vuelven a verificar bajo lock antes de
+    crearla (ver `_claim_unclassified`): si otro classify la creó o la está
+    creando mientras se esperaba al servicio de IA, quedan como "skipped".
+
+    Devuelve un resumen por observación: {"observation_id", "status", ...}.
+    """
+    to_create, to_update, summary = [], [], []
+    user_ids = set()
+    now = timezone.now()
+
+    for obs, res in zip(observations, results):
+        if not res or "error" in res:
+            summary.append(
+                {
+                    "observation_id": obs.id,
+                    "status": "error",
+                    "detail": (res or {}).get("error", "Sin resultado."),
+                }
+            )
+            continue
+
+        user_ids.add(obs.user_id)
+        label = str(res["label"])
+        confidence = float(res["confidence"])
+        top_k = parse_top_k(res.get("top_k"))
+
+        inf = getattr(obs, "inference", None)
+        if inf is None:
+            inf = Inference(
+                observation=obs,
+                predicted_label=label,
+                confidence=confidence,
+                top_k=top_k,
+                model_version=model_version,
+            )
+            to_create.append(inf)
+            status = "created"
+        else:
+            if inf.predicted_label != label:
+                inf.is_correct = None
+            inf.predicted_label = label
+            inf.confidence = confidence
+            inf.top_k = top_k
+            inf.model_version = model_version
+            inf.updated_at = now  # bulk_update no aplica auto_now
+            to_update.append(inf)
+            status = "updated"
+
+        summary.append(
+            {
+                "observation_id": obs.id,
+                "status": status,
+                "predicted_label": label,
+                "confidence": confidence,
+            }
+        )
+
+    apply_effective_labels(to_create + to_update)
+
+    with transaction.atomic():
+        if to_create:
+            free, taken = _claim_unclassified([inf.observation_id for inf in to_create])
+            for pos, item in enumerate(summary):
+                if item["status"] == "created" and item["observation_id"] not in free:
+                    # inference_id None: la está creando otro classify en curso
+                    summary[pos] = {
+                        "observation_id": item["observation_id"],
+                        "status": "skipped",
+                        "inference_id": taken.get(item["observation_id"]),
+                    }
+            to_create = [inf for inf in to_create if inf.observation_id in free]
+            Inference.objects.bulk_create(to_create)
+        if to_update:
+            Inference.objects.bulk_update(
+                to_update,
+                [
+                    "predicted_label",
+                    "confidence",
+                    "top_k",
+                    "model_version",
+                    "is_correct",
+                    "effective_label",
+                    "updated_at",
+                ],
+            )
+        versioning.bump(user_ids)
+
+    return summary
@@ -0,0 +1,86 @@
+"""
+Ruteo de lecturas a la réplica (alias "replica", opcional).
+
+Solo leen de la réplica los handlers marcados con `@use_replica`
+(reportes, exports, listado). Todo lo demás, y todas las escrituras, van
+a default. Para leer lo propio recién escrito: `versioning.bump()` marca al
+usuario en el cache y durante REPLICA_STICKY_SECONDS sus lecturas siguen
+yendo a default, aunque la vista esté marcada. La marca la tiene que ver
+cualquier worker, así que con réplica el cache tiene que ser compartido
+(check app.E001); la versión de datos se lee siempre de default.
+
+Para probar en local con dos SQLite (FileBasedCache es compartido entre
+los procesos de un mismo host):
+
+    cp db.sqlite3 replica.sqlite3
+    export CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+    export CACHE_LOCATION=/tmp/beetleapp-cache
+    DB_ENGINE=sqlite SQLITE_REPLICA_PATH=replica.sqlite3 python manage.py runserver
+    DB_ENGINE=sqlite SQLITE_REPLICA_PATH=/tmp/replica.sqlite3 python manage.py test app
+"""
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = "replica"
+_read_alias: ContextVar[Optional[str]] = ContextVar("read_alias", default=None)
+
+
+def replica_enabled() -> bool:
+    return REPLICA in settings.DATABASES and getattr(settings, "REPLICA_ENABLED", True)
+
+
+def _pin_key(user_id) -> str:
+    return f"replica:pin:{user_id}"
+
+
+def pin_to_primary(user_ids):
+    """Las próximas lecturas de estos usuarios van a default por un rato."""
+    if not replica_enabled():
+        return
+    ttl = getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+    if ttl <= 0:
+        return
+    cache.set_many({_pin_key(uid): 1 for uid in user_ids if uid is not None}, timeout=ttl)
+
+
+def read_alias_for(user) -> Optional[str]:
+    """Alias de lectura para este usuario (None = default)."""
+    if not replica_enabled():
+        return None
+    if user is not None and user.is_authenticated and cache.get(_pin_key(user.pk)):
+        return None
+    return REPLICA
+
+
+def use_replica(method):
+    """Decorador para handlers de DRF: sus lecturas van a la réplica."""
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        token = _read_alias.set(read_alias_for(request.user))
+        try:
+            return method(self, request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # misma data en los dos alias
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # la réplica se llena por replicación, no por migraciones
+        return db != REPLICA
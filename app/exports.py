@@ -0,0 +1,302 @@
+"""
+Formatos de export de observaciones además del CSV
+(`reports/observations/export/?output=...`):
+
+- parquet: Parquet, un row group por lote de BATCH_ROWS filas.
+- arrow:   Arrow IPC stream (un record batch por lote).
+- geojson: FeatureCollection (RFC 7946), feature por feature.
+
+Y `zip_chunks` para reports/observations/export_zip/: las fotos tal cual
+están en el storage más observations.csv, armado al vuelo.
+
+Todos consumen el mismo iterador de filas (`EXPORT_FIELDS`) y emiten bytes
+a medida que completan un lote: la memoria depende de BATCH_ROWS, no del
+tamaño de la cuenta. Coordenadas y confianza salen como números, fechas
+como tipos nativos (columnar) o ISO 8601 (GeoJSON), sin inferencia = null.
+"""
+import csv
+import io
+import json
+import os
+import zipfile
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # opcional: sin pyarrow no hay parquet/arrow
+    pa = pq = None
+
+BATCH_ROWS = 10000
+
+# columnas de values_list() compartidas con el CSV
+EXPORT_FIELDS = (
+    "id",
+    "date",
+    "latitude",
+    "longitude",
+    "place_text",
+    "inference__id",
+    "inference__effective_label",
+    "inference__confidence",
+    "inference__model_version__name",
+    "created_at",
+)
+
+# output -> (content type, extensión, necesita pyarrow)
+FORMATS = {
+    "csv": ("text/csv", "csv", False),
+    "parquet": ("application/vnd.apache.parquet", "parquet", True),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", True),
+    "geojson": ("application/geo+json", "geojson", False),
+}
+
+
+def available(output: str) -> bool:
+    return output in FORMATS and (pa is not None or not FORMATS[output][2])
+
+
+def _records(rows):
+    """
+    Filas de EXPORT_FIELDS -> tuplas tipadas (sin inference__id). Las
+    columnas extra al final de cada fila pasan tal cual.
+    """
+    for (
+        obs_id,
+        date,
+        latitude,
+        longitude,
+        place_text,
+        inf_id,
+        species_label,
+        confidence,
+        model_version,
+        created_at,
+        *extra,
+    ) in rows:
+        if inf_id is None:
+            species_label = confidence = model_version = None
+        yield (
+            obs_id,
+            date,
+            float(latitude),
+            float(longitude),
+            place_text,
+            species_label,
+            confidence,
+            model_version,
+            created_at,
+            *extra,
+        )
+
+
+def _batches(rows):
+    records = _records(rows)
+    while True:
+        batch = list(islice(records, BATCH_ROWS))
+        if not batch:
+            return
+        yield batch
+
+
+# ---- columnar ----
+def _schema():
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("date", pa.date32()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("place_text", pa.string()),
+            ("species_label", pa.string()),
+            ("confidence", pa.float64()),
+            ("model_version", pa.string()),
+            ("created_at", pa.timestamp("us", tz="UTC" if settings.USE_TZ else None)),
+        ]
+    )
+
+
+class _ChunkSink:
+    """Archivo de solo escritura que acumula hasta que se lo vacía con take()."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def columnar_chunks(rows, output: str):
+    """Parquet o Arrow IPC stream, lote por lote."""
+    schema = _schema()
+    sink = _ChunkSink()
+    if output == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for batch in _batches(rows):
+        arrays = [
+            pa.array(column, type=field.type)
+            for column, field in zip(zip(*batch), schema)
+        ]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        yield sink.take()
+
+    writer.close()
+    yield sink.take()
+
+
+# ---- GeoJSON ----
+def geojson_chunks(rows):
+    """FeatureCollection en texto, un chunk por lote."""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    yield '{"type":"FeatureCollection","features":['
+    sep = ""
+    for batch in _batches(rows):
+        parts = []
+        for (
+            obs_id,
+            date,
+            latitude,
+            longitude,
+            place_text,
+            species_label,
+            confidence,
+            model_version,
+            created_at,
+        ) in batch:
+            feature = {
+                "type": "Feature",
+                "id": obs_id,
+                "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+                "properties": {
+                    "date": date.isoformat(),
+                    "place_text": place_text,
+                    "species_label": species_label,
+                    "confidence": confidence,
+                    "model_version": model_version,
+                    "created_at": created_at.isoformat() if created_at else None,
+                },
+            }
+            parts.append(sep + dumps(feature))
+            sep = ","
+        yield "".join(parts)
+    yield "]}"
+
+
+# ---- ZIP (fotos + metadata) ----
+COPY_BUFFER = 64 * 1024
+# formatos ya comprimidos: se guardan sin recomprimir
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic"}
+METADATA_NAME = "observations.csv"
+
+
+def _zipinfo(arcname, created_at=None):
+    when = timezone.localtime(created_at) if created_at else timezone.localtime()
+    # el formato ZIP no admite fechas anteriores a 1980
+    date_time = max(when.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+    info = zipfile.ZipInfo(arcname, date_time=date_time)
+    ext = os.path.splitext(arcname)[1].lower()
+    if ext in STORED_EXTENSIONS:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def photo_arcname(obs_id, photo_name: str) -> str:
+    return f"photos/{obs_id}_{os.path.basename(photo_name)}"
+
+
+def zip_chunks(queryset):
+    """
+    ZIP con la foto de cada observación de `queryset` (photos/...) y al
+    final observations.csv, cuya columna `photo` apunta al archivo dentro
+    del ZIP. Dos pasadas sobre el queryset; las fotos se copian del storage
+    de a COPY_BUFFER y cada bloque sale apenas se escribe (el sink no es
+    seekable, así que zipfile usa data descriptors y no vuelve atrás).
+    """
+    sink = _ChunkSink()
+    missing = set()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        photos = queryset.values_list("id", "photo", "created_at")
+        for obs_id, photo, created_at in photos.iterator(chunk_size=2000):
+            if not photo:
+                continue
+            try:
+                src = default_storage.open(photo, "rb")
+            except OSError:
+                missing.add(obs_id)
+                continue
+            info = _zipinfo(photo_arcname(obs_id, photo), created_at)
+            with src, zf.open(info, "w") as dest:
+                for chunk in src.chunks(COPY_BUFFER):
+                    dest.write(chunk)
+                    yield sink.take()
+
+        with zf.open(_zipinfo(METADATA_NAME), "w") as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(
+                [
+                    "id",
+                    "date",
+                    "latitude",
+                    "longitude",
+                    "place_text",
+                    "species_label",
+                    "confidence",
+                    "model_version",
+                    "created_at",
+                    "photo",
+                ]
+            )
+            rows = queryset.values_list(*EXPORT_FIELDS, "photo").iterator(chunk_size=2000)
+            for i, (*record, photo) in enumerate(_records(rows), 1):
+                obs_id = record[0]
+                if photo and obs_id not in missing:
+                    record.append(photo_arcname(obs_id, photo))
+                else:
+                    record.append("")
+                writer.writerow([_csv_value(value) for value in record])
+                if i % 1000 == 0:
+                    text.flush()
+                    yield sink.take()
+            text.flush()
+            text.detach()
+
+    yield sink.take()
@@ -0,0 +1,127 @@
+"""
+Benchmark del listado de observaciones: ObservationSerializer vs
+ObservationRowReader, con páginas de 10, 100 y 1000 filas.
+
+    python manage.py bench_list                 # datos sintéticos (rollback)
+    python manage.py bench_list --user ana      # datos reales de un usuario
+
+Con datos sintéticos todo corre dentro de una transacción que se descarta.
+"""
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from app.models import Inference, Observation
+from app.serializers import ObservationRowReader, ObservationSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compara el serializer completo con el camino de lectura rápido."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Usar las observaciones de este usuario.")
+        parser.add_argument(
+            "--sizes",
+            default="10,100,1000",
+            help="Tamaños de página separados por coma.",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--fields",
+            default="",
+            help="Sparse fieldset para el camino rápido (ej. id,latitude,longitude).",
+        )
+
+    def handle(self, *args, **opts):
+        try:
+            sizes = [int(s) for s in opts["sizes"].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes inválido.")
+
+        if opts["user"]:
+            User = get_user_model()
+            try:
+                user = User.objects.get(username=opts["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No existe el usuario {opts['user']}.")
+            self._run(user, sizes, opts)
+            return
+
+        try:
+            with transaction.atomic():
+                user = self._seed(max(sizes))
+                self._run(user, sizes, opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, n):
+        User = get_user_model()
+        user = User.objects.create(username="__bench_list__")
+        start = date(2020, 1, 1)
+        Observation.objects.bulk_create(
+            Observation(
+                user=user,
+                date=start + timedelta(days=i % 1500),
+                latitude=Decimal("-24.780000") + Decimal(i % 1000) / 10000,
+                longitude=Decimal("-65.410000") - Decimal(i % 1000) / 10000,
+                place_text=f"Punto {i}",
+                photo=f"observations/bench_{i}.jpg",
+            )
+            for i in range(n)
+        )
+        Inference.objects.bulk_create(
+            Inference(
+                observation=obs,
+                predicted_label=f"Especie {obs.id % 40}",
+                confidence=80.0,
+                top_k=[{"label": f"Especie {obs.id % 40}", "confidence": 80.0}],
+            )
+            for obs in Observation.objects.filter(user=user)
+        )
+        return user
+
+    def _run(self, user, sizes, opts):
+        request = Request(APIRequestFactory().get("/api/observations/"))
+        request.user = user
+        qs = Observation.objects.filter(user=user).select_related("inference")
+        fields = ObservationRowReader.parse_fields(opts["fields"])
+        repeat = max(1, opts["repeat"])
+
+        self.stdout.write(f"{'filas':>6} {'serializer ms':>14} {'rápido ms':>10} {'x':>6}")
+        for size in sizes:
+            def slow():
+                return ObservationSerializer(
+                    qs[:size], many=True, context={"request": request}
+                ).data
+
+            def fast():
+                reader = ObservationRowReader(request, fields)
+                return reader.rows(reader.values(qs)[:size])
+
+            t_slow = _median_ms(slow, repeat)
+            t_fast = _median_ms(fast, repeat)
+            self.stdout.write(
+                f"{size:>6} {t_slow:>14.2f} {t_fast:>10.2f} "
+                f"{t_slow / t_fast if t_fast else 0.0:>6.1f}"
+            )
+
+
+def _median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(times)
@@ -0,0 +1,336 @@
+"""
+Prueba de carga contra un servidor corriendo: reproduce una mezcla de
+tráfico (listado, búsqueda, resumen, export, preview, classify) a una
+tasa objetivo y reporta throughput y percentiles de latencia.
+
+    python ai_service/stub.py                              # IA simulada
+    python manage.py seed_synthetic --users 20 --observations 100000
+    python manage.py runserver --noreload                  # o gunicorn
+    python manage.py loadtest --rate 50 --duration 60
+    python manage.py loadtest --mix list=50,summary=30,classify=20 --json out.json
+
+Los requests salen en instantes fijos (lazo abierto): si el servidor se
+atrasa, la latencia se mide desde el instante programado y no se esconde
+la cola (coordinated omission). Se reporta también el tiempo de servicio.
+Usa la DB configurada solo para elegir usuarios e ids de observaciones.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from app.models import Observation
+from app.profiling import percentile
+
+DEFAULT_MIX = "list=35,search=15,summary=15,export=5,preview=10,classify=20"
+IDS_PER_USER = 2000
+
+
+def _parse_mix(raw: str) -> dict:
+    mix = {}
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in Command.OPERATIONS:
+            raise CommandError(
+                f"Operación desconocida '{name}' (válidas: {', '.join(Command.OPERATIONS)})."
+            )
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Peso inválido en --mix: {part}")
+    if not mix or sum(mix.values()) <= 0:
+        raise CommandError("--mix vacío.")
+    return mix
+
+
+def _sample_jpeg() -> bytes:
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.new("RGB", (320, 320), (120, 90, 40)).save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+
+class _Target:
+    """Un usuario sintético: token JWT y sus ids de observaciones."""
+
+    def __init__(self, username, obs_ids, unclassified_ids):
+        self.username = username
+        self.obs_ids = obs_ids
+        self.unclassified = list(unclassified_ids)
+        self.token = None
+        self.lock = threading.Lock()
+
+    def next_classify_id(self):
+        # primero las que no tienen inferencia (llegan al servicio de IA)
+        with self.lock:
+            if self.unclassified:
+                return self.unclassified.pop()
+        return random.choice(self.obs_ids)
+
+
+class Command(BaseCommand):
+    help = "Prueba de carga con mezcla de tráfico a tasa objetivo."
+
+    OPERATIONS = ("list", "search", "summary", "export", "preview", "classify")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--rate", type=float, default=20.0, help="Requests por segundo.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga.")
+        parser.add_argument(
+            "--concurrency", type=int, default=64, help="Máximo de requests en vuelo."
+        )
+        parser.add_argument("--mix", default=DEFAULT_MIX)
+        parser.add_argument("--prefix", default="synthetic")
+        parser.add_argument("--password", default="synthetic-pass")
+        parser.add_argument("--max-users", type=int, default=20)
+        parser.add_argument("--image", help="JPEG para preview (por defecto uno generado).")
+        parser.add_argument("--timeout", type=float, default=60.0)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--json", dest="json_path", help="Guardar resultados en JSON.")
+
+    def handle(self, *args, **opts):
+        if opts["rate"] <= 0 or opts["duration"] <= 0:
+            raise CommandError("--rate y --duration deben ser > 0.")
+        mix = _parse_mix(opts["mix"])
+        random.seed(opts["seed"])
+
+        self.base_url = opts["base_url"].rstrip("/")
+        self.timeout = opts["timeout"]
+        self.password = opts["password"]
+        self.local = threading.local()
+
+        if opts["image"]:
+            with open(opts["image"], "rb") as f:
+                self.image = f.read()
+        else:
+            self.image = _sample_jpeg()
+
+        self.targets = self._load_targets(opts["prefix"], opts["max_users"])
+        self.date_range = self._date_range()
+        for target in self.targets:
+            self._login(target)
+
+        names = list(mix)
+        weights = [mix[n] for n in names]
+        total = int(opts["rate"] * opts["duration"])
+        interval = 1.0 / opts["rate"]
+
+        self.samples = defaultdict(list)  # op -> [(status, latency_ms, service_ms)]
+        self.samples_lock = threading.Lock()
+
+        self.stdout.write(
+            f"{total} requests a {opts['rate']}/s contra {self.base_url} "
+            f"({len(self.targets)} usuarios, mezcla {opts['mix']})"
+        )
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts["concurrency"]) as pool:
+            for i in range(total):
+                scheduled = start + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                op = random.choices(names, weights)[0]
+                pool.submit(self._run, op, random.choice(self.targets), scheduled)
+        elapsed = time.perf_counter() - start
+
+        report = self._report(elapsed, opts)
+        if opts["json_path"]:
+            with open(opts["json_path"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Resultados en {opts['json_path']}")
+
+    # ---- preparación ----
+    def _load_targets(self, prefix, max_users):
+        User = get_user_model()
+        users = list(
+            User.objects.filter(username__startswith=f"{prefix}_", is_active=True)
+            .order_by("id")
+            .values_list("id", "username")[:max_users]
+        )
+        if not users:
+            raise CommandError(
+                f"No hay usuarios {prefix}_*; corré antes `manage.py seed_synthetic`."
+            )
+
+        targets = []
+        for user_id, username in users:
+            qs = Observation.objects.filter(user_id=user_id)
+            obs_ids = list(qs.values_list("id", flat=True)[:IDS_PER_USER])
+            if not obs_ids:
+                continue
+            unclassified = qs.filter(inference__isnull=True).values_list("id", flat=True)[
+                :IDS_PER_USER
+            ]
+            targets.append(_Target(username, obs_ids, unclassified))
+        if not targets:
+            raise CommandError("Los usuarios sintéticos no tienen observaciones.")
+        return targets
+
+    def _date_range(self):
+        agg = Observation.objects.filter(
+            user__username__in=[t.username for t in self.targets]
+        ).aggregate(lo=Min("date"), hi=Max("date"))
+        return agg["lo"], agg["hi"]
+
+    def _session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def _login(self, target):
+        r = self._session().post(
+            f"{self.base_url}/api/auth/token/",
+            json={"username": target.username, "password": self.password},
+            timeout=self.timeout,
+        )
+        if r.status_code != 200:
+            raise CommandError(
+                f"Login de {target.username} falló ({r.status_code}): {r.text[:200]}"
+            )
+        target.token = r.json()["access"]
+
+    # ---- operaciones ----
+    def _random_range(self):
+        lo, hi = self.date_range
+        if not lo or not hi:
+            return {}
+        span = (hi - lo).days
+        start = lo + timedelta(days=random.randint(0, max(span, 0)))
+        end = start + timedelta(days=random.randint(30, 365))
+        return {"from": start.isoformat(), "to": end.isoformat()}
+
+    def _request(self, op, target):
+        url = self.base_url
+        kwargs = {}
+        method = "get"
+        if op == "list":
+            url += "/api/observations/"
+            kwargs["params"] = {"page": random.randint(1, 5)}
+        elif op == "search":
+            url += "/api/observations/"
+            kwargs["params"] = {"search": random.choice(["especie", "sendero", "0", "1"])}
+        elif op == "summary":
+            url += "/api/reports/observations/summary/"
+            kwargs["params"] = self._random_range()
+        elif op == "export":
+            url += "/api/reports/observations/export/"
+            kwargs["params"] = self._random_range()
+            kwargs["stream"] = True
+        elif op == "preview":
+            method = "post"
+            url += "/api/predict_preview/"
+            kwargs["files"] = {"image": ("preview.jpg", self.image, "image/jpeg")}
+        elif op == "classify":
+            method = "post"
+            url += f"/api/observations/{target.next_classify_id()}/classify/"
+        return method, url, kwargs
+
+    def _send(self, op, target):
+        method, url, kwargs = self._request(op, target)
+        for attempt in range(2):
+            headers = {"Authorization": f"Bearer {target.token}"}
+            r = getattr(self._session(), method)(
+                url, headers=headers, timeout=self.timeout, **kwargs
+            )
+            if kwargs.get("stream"):
+                for _ in r.iter_content(64 * 1024):
+                    pass
+            else:
+                r.content
+            if r.status_code == 401 and attempt == 0:
+                with target.lock:
+                    self._login(target)
+                continue
+            return r.status_code
+
+    def _run(self, op, target, scheduled):
+        sent = time.perf_counter()
+        try:
+            status = self._send(op, target)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        except CommandError:
+            status = "login"
+        done = time.perf_counter()
+        with self.samples_lock:
+            self.samples[op].append(
+                (status, (done - scheduled) * 1000.0, (done - sent) * 1000.0)
+            )
+
+    # ---- reporte ----
+    def _summarize(self, samples, elapsed):
+        ok = [s for s in samples if isinstance(s[0], int) and s[0] < 400]
+        latency = sorted(s[1] for s in samples)
+        service = sorted(s[2] for s in samples)
+        statuses = defaultdict(int)
+        for s in samples:
+            statuses[str(s[0])] += 1
+        return {
+            "count": len(samples),
+            "ok": len(ok),
+            "errors": len(samples) - len(ok),
+            "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0,
+            "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0,
+            "statuses": dict(statuses),
+            "latency_ms": {
+                "mean": round(statistics.fmean(latency), 1) if latency else None,
+                **{
+                    f"p{p}": round(percentile(latency, p), 1) if latency else None
+                    for p in (50, 95, 99)
+                },
+                "max": round(latency[-1], 1) if latency else None,
+            },
+            "service_ms": {
+                f"p{p}": round(percentile(service, p), 1) if service else None
+                for p in (50, 95, 99)
+            },
+        }
+
+    def _report(self, elapsed, opts):
+        per_op = {op: self._summarize(s, elapsed) for op, s in sorted(self.samples.items())}
+        every = [s for samples in self.samples.values() for s in samples]
+        overall = self._summarize(every, elapsed)
+
+        header = (
+            f"\n{'operación':<10}{'n':>7}{'err':>6}{'rps':>8}"
+            f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms, desde el instante programado)"
+        )
+        lines = [header]
+        for name, r in [*per_op.items(), ("TOTAL", overall)]:
+            lat = r["latency_ms"]
+            lines.append(
+                f"{name:<10}{r['count']:>7}{r['errors']:>6}{r['throughput_rps']:>8}"
+                f"{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}{lat['max']:>9}"
+            )
+        lines.append(
+            f"\nDuración {elapsed:.1f}s, objetivo {opts['rate']}/s, "
+            f"logrado {overall['count'] / elapsed:.1f}/s ({overall['throughput_rps']}/s OK)."
+        )
+        self.stdout.write("\n".join(lines))
+
+        return {
+            "base_url": self.base_url,
+            "target_rate": opts["rate"],
+            "duration_s": round(elapsed, 2),
+            "concurrency": opts["concurrency"],
+            "mix": _parse_mix(opts["mix"]),
+            "users": len(self.targets),
+            "overall": overall,
+            "operations": per_op,
+        }
@@ -0,0 +1,39 @@
+"""
+Borra los tombstones del delta-sync más viejos que
+SYNC_TOMBSTONE_RETENTION_DAYS (pensado para un cron diario).
+
+    python manage.py prune_tombstones
+    python manage.py prune_tombstones --dry-run
+
+Un cliente cuyo cursor es anterior a la ventana recibe 410 en
+/api/sync/changes/ y resincroniza sin cursor, así que no pierde borrados.
+"""
+from django.core.management.base import BaseCommand
+
+from app.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = "Borra los tombstones fuera de la ventana de retención del sync."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Solo contar, sin borrar."
+        )
+
+    def handle(self, *args, **opts):
+        cutoff = Tombstone.retention_cutoff()
+        if cutoff is None:
+            self.stdout.write("SYNC_TOMBSTONE_RETENTION_DAYS=0: no se podan tombstones.")
+            return
+
+        old = Tombstone.objects.filter(deleted_at__lt=cutoff)
+        if opts["dry_run"]:
+            self.stdout.write(f"{old.count()} tombstones anteriores a {cutoff:%Y-%m-%d %H:%M}.")
+            return
+        deleted, _ = old.delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Borrados {deleted} tombstones anteriores a {cutoff:%Y-%m-%d %H:%M}."
+            )
+        )
@@ -0,0 +1,211 @@
+"""
+Re-clasifica observaciones contra una versión de modelo (backfill).
+
+    python manage.py reclassify                      # versión que sirve la IA
+    python manage.py reclassify --user ana --from 2025-01-01 --max-rate 20
+
+Procesa por id ascendente en batches a /predict_batch y guarda un checkpoint
+(último id procesado) después de cada batch: si se corta, volver a correr el
+mismo comando continúa desde ahí.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app import ai_client
+from app.classification import save_batch_results
+from app.models import Observation
+from app.refcache import get_model_version
+
+
+class Command(BaseCommand):
+    help = "Re-clasifica observaciones en batch contra una versión de modelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model-version",
+            help="Versión destino. Por defecto, la que reporta /health.",
+        )
+        parser.add_argument("--user", help="Username a procesar.")
+        parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD")
+        parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD")
+        parser.add_argument(
+            "--only-missing",
+            action="store_true",
+            help="Solo observaciones sin inferencia.",
+        )
+        parser.add_argument("--limit", type=int, default=None)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "AI_BATCH_SIZE", 16),
+        )
+        parser.add_argument(
+            "--max-rate",
+            type=float,
+            default=None,
+            help="Máximo de observaciones por segundo.",
+        )
+        parser.add_argument(
+            "--retries",
+            type=int,
+            default=3,
+            help="Reintentos por batch si falla el servicio de IA.",
+        )
+        parser.add_argument("--checkpoint", help="Ruta del archivo checkpoint.")
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignora el checkpoint existente.",
+        )
+
+    def handle(self, *args, **opts):
+        target = opts["model_version"] or ai_client.service_version()
+        if not target:
+            raise CommandError(
+                "No se pudo obtener la versión del servicio de IA; usá --model-version."
+            )
+
+        filters = {
+            "user": opts["user"],
+            "from": opts["date_from"],
+            "to": opts["date_to"],
+            "only_missing": opts["only_missing"],
+        }
+        qs = self._queryset(target, filters)
+
+        ckpt_path = Path(
+            opts["checkpoint"]
+            or Path(settings.BASE_DIR) / f".reclassify-{_slug(target)}.json"
+        )
+        state = self._load_checkpoint(ckpt_path, target, filters, opts["restart"])
+        if state["last_id"]:
+            self.stdout.write(
+                f"Retomando desde id>{state['last_id']} "
+                f"({state['processed']} ya procesadas)."
+            )
+
+        remaining = qs.filter(id__gt=state["last_id"]).count()
+        if opts["limit"] is not None:
+            remaining = min(remaining, opts["limit"])
+        self.stdout.write(f"Versión destino: {target} — pendientes: {remaining}")
+
+        mv = get_model_version(target)
+        batch_size = max(1, opts["batch_size"])
+        max_rate = opts["max_rate"]
+        done = 0
+        started = time.monotonic()
+
+        while done < remaining:
+            t0 = time.monotonic()
+            size = min(batch_size, remaining - done)
+            batch = list(
+                qs.filter(id__gt=state["last_id"]).select_related("inference")[:size]
+            )
+            if not batch:
+                break
+
+            version, results = self._predict(batch, opts["retries"])
+            if version and version != target:
+                raise CommandError(
+                    f"El servicio de IA cambió de versión ({version}); "
+                    f"se esperaba {target}. Checkpoint en {ckpt_path}."
+                )
+
+            summary = save_batch_results(batch, results, mv)
+            failed = sum(1 for s in summary if s["status"] == "error")
+
+            state["last_id"] = batch[-1].id
+            state["processed"] += len(batch) - failed
+            state["failed"] += failed
+            _write_checkpoint(ckpt_path, state)
+
+            done += len(batch)
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (remaining - done) / rate if rate else 0.0
+            self.stdout.write(
+                f"{done}/{remaining} ({100.0 * done / remaining:.1f}%) "
+                f"· {rate:.1f} obs/s · errores {failed} · ETA {eta:.0f}s"
+            )
+
+            if max_rate:
+                min_duration = len(batch) / max_rate
+                spent = time.monotonic() - t0
+                if spent < min_duration:
+                    time.sleep(min_duration - spent)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Listo: {state['processed']} re-clasificadas, "
+                f"{state['failed']} con error, {elapsed:.1f}s "
+                f"({done / elapsed if elapsed else 0.0:.1f} obs/s)."
+            )
+        )
+        if done >= remaining and ckpt_path.exists():
+            ckpt_path.unlink()
+
+    def _queryset(self, target, filters):
+        qs = Observation.objects.exclude(inference__model_version__name=target)
+        if filters["only_missing"]:
+            qs = qs.filter(inference__isnull=True)
+        if filters["user"]:
+            User = get_user_model()
+            if not User.objects.filter(username=filters["user"]).exists():
+                raise CommandError(f"No existe el usuario {filters['user']}.")
+            qs = qs.filter(user__username=filters["user"])
+        for key, lookup in (("from", "date__gte"), ("to", "date__lte")):
+            if filters[key]:
+                d = parse_date(filters[key])
+                if d is None:
+                    raise CommandError(f"Fecha inválida en --{key}.")
+                qs = qs.filter(**{lookup: d})
+        return qs.order_by("id")
+
+    def _load_checkpoint(self, path, target, filters, restart):
+        fresh = {
+            "version": target,
+            "filters": filters,
+            "last_id": 0,
+            "processed": 0,
+            "failed": 0,
+        }
+        if restart or not path.exists():
+            return fresh
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != target or state.get("filters") != filters:
+            raise CommandError(
+                f"El checkpoint {path} es de otra corrida; usá --restart."
+            )
+        return {**fresh, **state}
+
+    def _predict(self, batch, retries):
+        delay = 1.0
+        for attempt in range(retries + 1):
+            try:
+                return ai_client.predict_batch(batch)
+            except ai_client.AIServiceError as e:
+                if attempt == retries:
+                    raise CommandError(f"Servicio de IA: {e}")
+                self.stderr.write(f"Servicio de IA: {e} — reintento en {delay:.0f}s")
+                time.sleep(delay)
+                delay *= 2
+
+
+def _slug(value: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in value)
+
+
+def _write_checkpoint(path: Path, state: dict):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
@@ -0,0 +1,97 @@
+"""
+Genera datos sintéticos a escala (usuarios, observaciones con foto,
+especies, versiones de modelo e inferencias) con bulk inserts.
+
+    python manage.py seed_synthetic --users 20 --observations 100000
+    python manage.py seed_synthetic --purge          # borra los sintéticos
+
+Los usuarios se llaman <prefix>_<n> y comparten la contraseña --password,
+para que `loadtest` pueda pedir tokens JWT. Las fotos son --photos JPEG
+chicos reutilizados entre observaciones.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import versioning
+from app.synthetic import make_photos, seed_dataset
+
+
+class Command(BaseCommand):
+    help = "Genera usuarios, observaciones, fotos e inferencias sintéticas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--observations", type=int, default=10000)
+        parser.add_argument("--species", type=int, default=40)
+        parser.add_argument("--model-versions", type=int, default=3)
+        parser.add_argument(
+            "--photos", type=int, default=20, help="JPEG distintos a generar (0 = sin archivos)."
+        )
+        parser.add_argument(
+            "--inference-ratio",
+            type=float,
+            default=0.8,
+            help="Fracción de observaciones con inferencia (el resto queda para classify).",
+        )
+        parser.add_argument("--prefix", default="synthetic")
+        parser.add_argument("--password", default="synthetic-pass")
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Borrar los usuarios <prefix>_* (y sus datos) en vez de generar.",
+        )
+
+    def handle(self, *args, **opts):
+        prefix = opts["prefix"]
+        User = get_user_model()
+        existing = User.objects.filter(username__startswith=f"{prefix}_")
+
+        if opts["purge"]:
+            count = existing.count()
+            existing.delete()
+            self.stdout.write(self.style.SUCCESS(f"Borrados {count} usuarios {prefix}_*."))
+            return
+
+        if opts["users"] < 1 or opts["observations"] < 0:
+            raise CommandError("--users debe ser >= 1 y --observations >= 0.")
+        if opts["species"] < 1 or opts["model_versions"] < 1:
+            raise CommandError("--species y --model-versions deben ser >= 1.")
+        if not 0 <= opts["inference_ratio"] <= 1:
+            raise CommandError("--inference-ratio debe estar entre 0 y 1.")
+        if existing.exists():
+            raise CommandError(
+                f"Ya hay usuarios {prefix}_*; usá otro --prefix o --purge primero."
+            )
+
+        t0 = time.perf_counter()
+        photos = make_photos(opts["photos"], prefix=prefix) if opts["photos"] else None
+
+        def progress(kind, done):
+            self.stdout.write(f"  {kind}: {done}")
+
+        with transaction.atomic():
+            users = seed_dataset(
+                opts["observations"],
+                opts["users"],
+                n_species=opts["species"],
+                n_versions=opts["model_versions"],
+                prefix=prefix,
+                password=opts["password"],
+                photos=photos,
+                inference_ratio=opts["inference_ratio"],
+                progress=progress,
+            )
+            # bulk_create no emite signals: invalidar ETags/cache a mano
+            versioning.bump(u.pk for u in users)
+
+        elapsed = time.perf_counter() - t0
+        rate = opts["observations"] / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"OK: {len(users)} usuarios, {opts['observations']} observaciones "
+                f"en {elapsed:.1f}s ({rate:.0f} obs/s). Contraseña: {opts['password']}"
+            )
+        )
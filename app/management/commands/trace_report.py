@@ -0,0 +1,131 @@
+"""
+Muestra los traces de app.tracing (y de ai_service/tracing.py) como árbol
+de spans con sus duraciones, para ver en qué se fue el tiempo de cada
+request: queries, llamada al servicio de IA, decode/inferencia del lado
+del servicio, signals.
+
+    python manage.py trace_report                       # últimos 10
+    python manage.py trace_report --file ai_service/ai_traces.jsonl --slowest 5
+    python manage.py trace_report --request-id <X-Request-ID>
+
+Las queries hijas de un mismo span se resumen en una línea (cantidad y
+tiempo total); --all-queries las lista una por una.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _load(paths):
+    spans = {}
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        span = json.loads(line)
+                    except ValueError:
+                        continue
+                    spans[(span["traceId"], span["id"])] = span
+        except FileNotFoundError:
+            continue
+    traces = defaultdict(list)
+    for span in spans.values():
+        traces[span["traceId"]].append(span)
+    return traces
+
+
+class Command(BaseCommand):
+    help = "Árbol de spans por request (Django + servicio de IA)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            action="append",
+            default=[],
+            help="Archivo de spans extra (repetible); siempre se lee TRACING_FILE.",
+        )
+        parser.add_argument("--request-id", help="Trace id (header X-Request-ID).")
+        parser.add_argument("--last", type=int, default=10)
+        parser.add_argument("--slowest", type=int, help="Los N más lentos en vez de los últimos.")
+        parser.add_argument("--name", help="Solo traces cuyo span raíz contenga este texto.")
+        parser.add_argument("--all-queries", action="store_true")
+
+    def handle(self, *args, **opts):
+        paths = [getattr(settings, "TRACING_FILE", "traces.jsonl"), *opts["file"]]
+        traces = _load(paths)
+        if not traces:
+            raise CommandError(f"No hay spans en {', '.join(paths)}.")
+
+        roots = {}
+        for trace_id, spans in traces.items():
+            ids = {s["id"] for s in spans}
+            top = [s for s in spans if s.get("parentId") not in ids]
+            roots[trace_id] = min(top, key=lambda s: s["timestamp"])
+
+        selected = list(roots)
+        if opts["request_id"]:
+            selected = [t for t in selected if t == opts["request_id"]]
+        if opts["name"]:
+            selected = [t for t in selected if opts["name"] in roots[t]["name"]]
+        if opts["slowest"]:
+            selected.sort(key=lambda t: roots[t]["duration"], reverse=True)
+            selected = selected[: opts["slowest"]]
+        else:
+            selected.sort(key=lambda t: roots[t]["timestamp"])
+            selected = selected[-opts["last"] :]
+
+        for trace_id in selected:
+            self._print_trace(trace_id, traces[trace_id], opts["all_queries"])
+
+    def _print_trace(self, trace_id, spans, all_queries):
+        children = defaultdict(list)
+        ids = {s["id"] for s in spans}
+        top = []
+        for s in spans:
+            if s.get("parentId") in ids:
+                children[s["parentId"]].append(s)
+            else:
+                top.append(s)
+        for items in children.values():
+            items.sort(key=lambda s: s["timestamp"])
+
+        first = min(top, key=lambda s: s["timestamp"])
+        when = datetime.fromtimestamp(first["timestamp"] / 1e6, tz=timezone.utc)
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f"\n{trace_id}  {first['name']}  {first['duration'] / 1000:.1f} ms  "
+                f"{when:%Y-%m-%d %H:%M:%S}Z"
+            )
+        )
+        for span in sorted(top, key=lambda s: s["timestamp"]):
+            self._print_span(span, children, 0, all_queries)
+
+    def _print_span(self, span, children, depth, all_queries):
+        service = span.get("localEndpoint", {}).get("serviceName", "?")
+        tags = span.get("tags", {})
+        extra = ", ".join(
+            f"{k}={v}" for k, v in tags.items() if k not in ("sql", "db.alias", "http.path")
+        )
+        line = f"{span['duration'] / 1000:>9.1f} ms  {'  ' * depth}{span['name']}  [{service}]"
+        if extra:
+            line += f"  {extra}"
+        self.stdout.write(self.style.ERROR(line) if "error" in tags else line)
+
+        queries = []
+        for child in children.get(span["id"], []):
+            if child["name"] == "db.query" and not all_queries:
+                queries.append(child)
+                continue
+            self._print_span(child, children, depth + 1, all_queries)
+        if queries:
+            total = sum(q["duration"] for q in queries) / 1000
+            self.stdout.write(
+                f"{total:>9.1f} ms  {'  ' * (depth + 1)}db.query ×{len(queries)}"
+            )
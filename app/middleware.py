@@ -0,0 +1,279 @@
+"""Middlewares propios de BeetleApp."""
+import gzip
+import json
+import logging
+import re
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import tracing
+from .profiling import QueryCounter, query_budget, request_stats
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo se ofrece gzip
+    brotli = None
+
+_q_re = re.compile(r"^\s*([^;\s]+)\s*(?:;\s*q=([0-9.]+))?\s*$")
+
+
+def _accepted_encodings(header: str) -> dict:
+    """'gzip;q=0.8, br' -> {"gzip": 0.8, "br": 1.0}"""
+    out = {}
+    for part in header.split(","):
+        m = _q_re.match(part)
+        if not m:
+            continue
+        try:
+            q = float(m.group(2)) if m.group(2) else 1.0
+        except ValueError:
+            continue
+        out[m.group(1).lower()] = q
+    return out
+
+
+def _choose_encoding(header: str):
+    accepted = _accepted_encodings(header or "")
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for enc in candidates:
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _compress_stream(chunks, encoding: str):
+    if encoding == "br":
+        comp = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            out = comp.process(chunk)
+            if out:
+                yield out
+        yield comp.finish()
+        return
+
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> formato gzip
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compresión gzip/brotli negociada por Accept-Encoding, solo para los
+    content types de COMPRESS_CONTENT_TYPES y respuestas de al menos
+    COMPRESS_MIN_SIZE bytes. Las respuestas streaming se comprimen por chunk.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, "COMPRESS_MIN_SIZE", 1024)
+        self.content_types = tuple(
+            getattr(
+                settings,
+                "COMPRESS_CONTENT_TYPES",
+                ("application/json", "text/csv"),
+            )
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.status_code != 200 or response.has_header("Content-Encoding"):
+            return response
+        ctype = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if ctype not in self.content_types:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = _choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if getattr(response, "is_async", False):
+                return response
+            response.streaming_content = _compress_stream(
+                response.streaming_content, encoding
+            )
+            del response["Content-Length"]
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            compressed = _compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # el ETag fuerte identifica la representación sin comprimir
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = encoding
+        return response
+
+
+profiling_logger = logging.getLogger("app.profiling")
+
+
+class RequestProfilingMiddleware:
+    """
+    Mide cada request: tiempo total, queries y tiempo en la DB, agrupado
+    por "<método> <view_name>". Alimenta app.profiling.request_stats, loguea
+    una línea JSON por request en "app.profiling" (WARNING si supera el
+    presupuesto de queries de la vista) y, con DEBUG, agrega Server-Timing.
+    En respuestas streaming la medición cierra al terminar el stream.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PROFILING_ENABLED", settings.DEBUG)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with self._instrument(counter):
+            response = self.get_response(request)
+
+        if response.streaming and not getattr(response, "is_async", False):
+            response.streaming_content = self._stream(
+                response.streaming_content, request, response, counter, start
+            )
+            return response
+
+        self._finish(request, response, counter, start)
+        return response
+
+    def _instrument(self, counter):
+        stack = ExitStack()
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(counter))
+        return stack
+
+    def _stream(self, content, request, response, counter, start):
+        # también si el cliente corta la descarga (GeneratorExit) o el stream falla
+        try:
+            with self._instrument(counter):
+                yield from content
+        finally:
+            self._finish(request, response, counter, start)
+
+    def _finish(self, request, response, counter, start):
+        wall_ms = (time.perf_counter() - start) * 1000.0
+        db_ms = counter.db_time * 1000.0
+
+        match = getattr(request, "resolver_match", None)
+        view_name = (match.view_name if match else None) or "unresolved"
+        budget = query_budget(view_name)
+        over_budget = counter.count > budget
+
+        request_stats.record(
+            f"{request.method} {view_name}", wall_ms, counter.count, db_ms, over_budget
+        )
+
+        profiling_logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps(
+                {
+                    "event": "request",
+                    "method": request.method,
+                    "view": view_name,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "wall_ms": round(wall_ms, 2),
+                    "queries": counter.count,
+                    "db_ms": round(db_ms, 2),
+                    "query_budget": budget,
+                    "over_budget": over_budget,
+                }
+            ),
+        )
+
+        if settings.DEBUG and not response.streaming:
+            response["Server-Timing"] = (
+                f"db;dur={db_ms:.1f};desc=\"{counter.count} queries\", "
+                f"total;dur={wall_ms:.1f}"
+            )
+
+
+class TracingMiddleware:
+    """
+    Span raíz de cada request (app.tracing): continúa el `traceparent`
+    entrante, devuelve el trace id en X-Request-ID y, con TRACING_DB_SPANS,
+    agrega un span por query. En respuestas streaming el span cierra al
+    terminar el stream.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = tracing.enabled()
+        self.db_spans = getattr(settings, "TRACING_DB_SPANS", True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        root = tracing.start(
+            f"{request.method} {request.path}",
+            "SERVER",
+            traceparent=request.META.get("HTTP_TRACEPARENT"),
+        )
+        root.tag("http.method", request.method)
+        root.tag("http.path", request.path)
+        token = tracing.activate(root)
+        try:
+            with self._instrument():
+                response = self.get_response(request)
+        except BaseException as e:
+            tracing.end(root, token, e)
+            raise
+
+        match = getattr(request, "resolver_match", None)
+        if match and match.view_name:
+            root.name = f"{request.method} {match.view_name}"
+        root.tag("http.status_code", response.status_code)
+        if getattr(request, "user", None) is not None and request.user.is_authenticated:
+            root.tag("user.id", request.user.pk)
+        response["X-Request-ID"] = root.trace_id
+
+        if response.streaming and not getattr(response, "is_async", False):
+            tracing.deactivate(token)
+            response.streaming_content = self._stream(response.streaming_content, root)
+            return response
+
+        tracing.end(root, token)
+        return response
+
+    def _instrument(self):
+        stack = ExitStack()
+        if self.db_spans:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(tracing.QuerySpans()))
+        return stack
+
+    def _stream(self, content, root):
+        token = tracing.activate(root)
+        try:
+            with self._instrument():
+                yield from content
+        finally:
+            tracing.end(root, token)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_alter_inference_options_alter_modelversion_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inference',
+            name='top_k',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
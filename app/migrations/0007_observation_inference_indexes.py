@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_userdataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inference',
+            index=models.Index(fields=['predicted_label'], name='inf_pred_label_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observation',
+            index=models.Index(fields=['user', 'created_at'], name='obs_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observation',
+            index=models.Index(fields=['user', 'date'], name='obs_user_date_idx'),
+        ),
+    ]
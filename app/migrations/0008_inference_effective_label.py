@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:29
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_effective_label(apps, schema_editor):
+    # misma regla que app.classification.effective_label_expression
+    Inference = apps.get_model("app", "Inference")
+    Species = apps.get_model("app", "Species")
+    Inference.objects.update(
+        effective_label=Coalesce(
+            Subquery(Species.objects.filter(pk=OuterRef("species_id")).values("name")[:1]),
+            Subquery(
+                Species.objects.filter(name__iexact=OuterRef("predicted_label")).values("name")[:1]
+            ),
+            F("predicted_label"),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_observation_inference_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inference',
+            name='effective_label',
+            field=models.CharField(blank=True, default='', editable=False, max_length=120),
+        ),
+        migrations.AddIndex(
+            model_name='inference',
+            index=models.Index(fields=['effective_label'], name='inf_effective_label_idx'),
+        ),
+        migrations.RunPython(backfill_effective_label, migrations.RunPython.noop),
+    ]
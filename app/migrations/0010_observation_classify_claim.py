@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='observation',
+            name='classify_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Observation(models.Model):
@@ -9,10 +12,29 @@ class Observation(models.Model):
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
     place_text = models.CharField(max_length=100, blank=True)
     photo = models.ImageField(upload_to="observations/")
+    # clave de idempotencia generada por el cliente (sync offline del mobile)
+    client_key = models.CharField(max_length=64, null=True, blank=True)
+    # claim del classify en curso (single-flight, ver ClassifyObservationView)
+    classify_started_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "client_key"], name="uniq_observation_client_key"
+            ),
+        ]
+        # todas las lecturas filtran por usuario y ordenan/filtran por fecha
+        indexes = [
+            models.Index(fields=["user", "updated_at"], name="obs_user_updated_idx"),
+            models.Index(fields=["user", "created_at"], name="obs_user_created_idx"),
+            models.Index(fields=["user", "date"], name="obs_user_date_idx"),
+            # changelist del admin: orden por defecto y date_hierarchy
+            models.Index(fields=["created_at"], name="obs_created_idx"),
+            models.Index(fields=["date"], name="obs_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} @ ({self.latitude}, {self.longitude}) {self.date}"
@@ -49,6 +71,11 @@ class Inference(models.Model):
     )
     predicted_label = models.CharField(max_length=120)
     confidence = models.FloatField()
+    # [{"label": ..., "confidence": ...}, ...] ordenado de mayor a menor
+    top_k = models.JSONField(default=list, blank=True)
+    # especie validada o, si no hay, predicted_label canonizado a Species;
+    # lo mantienen app.classification y los signals (agrupa resúmenes/PDF)
+    effective_label = models.CharField(max_length=120, blank=True, default="", editable=False)
     is_correct = models.BooleanField(null=True, blank=True)
     species = models.ForeignKey(
         Species,
@@ -62,9 +89,70 @@ class Inference(models.Model):
         on_delete=models.SET_NULL,
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["predicted_label"], name="inf_pred_label_idx"),
+            models.Index(fields=["effective_label"], name="inf_effective_label_idx"),
+            # changelist del admin: orden por defecto y date_hierarchy
+            models.Index(fields=["created_at"], name="inf_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.predicted_label} {self.confidence:.1f}%"
+
+
+class Tombstone(models.Model):
+    """Registro de borrados para el delta-sync (ver signals)."""
+
+    KIND_OBSERVATION = "observation"
+    KIND_INFERENCE = "inference"
+    KIND_CHOICES = [
+        (KIND_OBSERVATION, "Observation"),
+        (KIND_INFERENCE, "Inference"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # para inferencias se guarda el id de la observación (relación 1 a 1)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["deleted_at"]
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="tomb_user_deleted_idx"),
+        ]
+
+    @staticmethod
+    def retention_cutoff(now=None):
+        """Antes de esta fecha los tombstones se podan (None: se guardan siempre)."""
+        days = getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30)
+        if not days:
+            return None
+        return (now or timezone.now()) - timedelta(days=days)
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} ({self.deleted_at})"
+
+
+class UserDataVersion(models.Model):
+    """
+    Versión de los datos de un usuario: se incrementa cada vez que cambian
+    sus observaciones o inferencias (ver app.versioning). Alimenta los
+    ETag/Last-Modified de listados y reportes.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="data_version",
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
@@ -0,0 +1,292 @@
+"""
+Render de PDFs (ReportLab) compartido por el mail de nueva inferencia
+(app.signals) y el informe de observaciones (ObservationExportPdfView).
+
+- Las fotos se embeben como derivados JPEG reducidos (PDF_IMAGE_MAX_PX,
+  PDF_IMAGE_QUALITY) que se generan una vez y quedan en el storage bajo
+  derivatives/pdf/; nunca el original a resolución completa.
+- PdfDocument lleva la posición, la paginación y la fuente actual (solo
+  emite setFont cuando cambia); las tablas van fila por fila con un único
+  text object por fila y anchos de texto cacheados.
+- Se escribe a cualquier archivo: el informe usa un SpooledTemporaryFile
+  que pasa a disco si crece (ver `spooled_file`) y se sirve en chunks.
+"""
+import os
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+# streams comprimidos en binario, sin ASCII85 (más chico y más rápido)
+rl_config.useA85 = 0
+
+REGULAR = "Helvetica"
+BOLD = "Helvetica-Bold"
+MARGIN = 50
+BOTTOM = 80
+
+
+# ---- derivados de imagen ----
+def derivative_name(photo_name: str, max_px: int) -> str:
+    stem = os.path.splitext(photo_name)[0]
+    return f"derivatives/pdf/{max_px}/{stem}.jpg"
+
+
+def photo_derivative(photo_name: str, max_px: int = None) -> bytes:
+    """
+    JPEG de la foto con el lado mayor <= max_px, generado la primera vez y
+    leído del storage las siguientes. Los nombres de las fotos no se
+    reutilizan (upload_to + nombres únicos), así que no hace falta invalidar.
+    """
+    max_px = max_px or getattr(settings, "PDF_IMAGE_MAX_PX", 1024)
+    name = derivative_name(photo_name, max_px)
+    if default_storage.exists(name):
+        with default_storage.open(name, "rb") as f:
+            return f.read()
+
+    with default_storage.open(photo_name, "rb") as f:
+        img = Image.open(f)
+        # JPEG: decodificar ya reducido (escala DCT), mucho más rápido
+        img.draft("RGB", (max_px, max_px))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((max_px, max_px))
+    buf = BytesIO()
+    img.save(
+        buf,
+        format="JPEG",
+        quality=getattr(settings, "PDF_IMAGE_QUALITY", 75),
+        optimize=True,
+    )
+    data = buf.getvalue()
+    saved = default_storage.save(name, ContentFile(data))
+    if saved != name:
+        # otro render lo generó en paralelo y el storage renombró esta copia
+        default_storage.delete(saved)
+    return data
+
+
+def spooled_file():
+    """Archivo temporal en memoria hasta PDF_SPOOL_MAX_BYTES, después en disco."""
+    return tempfile.SpooledTemporaryFile(
+        max_size=getattr(settings, "PDF_SPOOL_MAX_BYTES", 4 * 1024 * 1024)
+    )
+
+
+@lru_cache(maxsize=4096)
+def _width(text: str, font: str, size: float) -> float:
+    return stringWidth(text, font, size)
+
+
+def _fit(text: str, width: float, font: str, size: float) -> str:
+    """Recorta `text` con "…" para que entre en `width`."""
+    if _width(text, font, size) <= width:
+        return text
+    while text and _width(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+# ---- layout ----
+class PdfDocument:
+    def __init__(self, out, title: str = ""):
+        self.canvas = canvas.Canvas(out, pagesize=A4, pageCompression=1)
+        if title:
+            self.canvas.setTitle(title)
+        self.width, self.height = A4
+        self.y = self.height - MARGIN
+        self._font = None
+        self._on_new_page = None
+
+    def font(self, name: str = REGULAR, size: float = 10):
+        if self._font != (name, size):
+            self.canvas.setFont(name, size)
+            self._font = (name, size)
+
+    def new_page(self):
+        self.canvas.showPage()
+        # showPage reinicia el estado gráfico
+        self._font = None
+        self.y = self.height - MARGIN
+        if self._on_new_page:
+            self._on_new_page()
+
+    def ensure(self, space: float):
+        if self.y - space < BOTTOM:
+            self.new_page()
+
+    def space(self, amount: float):
+        self.y -= amount
+
+    def text(self, text: str, x: float = MARGIN, step: float = 15, font=REGULAR, size=10):
+        self.ensure(step)
+        self.font(font, size)
+        self.canvas.drawString(x, self.y, text)
+        self.y -= step
+
+    def heading(self, text: str, size: float = 12, step: float = 18):
+        self.text(text, font=BOLD, size=size, step=step)
+
+    def image(self, data: bytes, max_h: float = 250):
+        reader = ImageReader(BytesIO(data))
+        img_w, img_h = reader.getSize()
+        max_w = self.width - 2 * MARGIN
+        scale = min(max_w / img_w, max_h / img_h, 1.0)
+        draw_w, draw_h = img_w * scale, img_h * scale
+        self.ensure(draw_h)
+        self.canvas.drawImage(
+            reader, MARGIN, self.y - draw_h, width=draw_w, height=draw_h, anchor="sw"
+        )
+        self.y -= draw_h + 20
+
+    def table(self, columns, rows, title_cont: str = "", size: float = 8, step: float = 11):
+        """
+        Tabla de texto paginada. `columns`: [(encabezado, ancho, "l"|"r")],
+        `rows`: iterable de tuplas de str (se consume de a una fila). Al
+        cambiar de página repite `title_cont` y el encabezado.
+        """
+        x_positions = []
+        x = MARGIN
+        for _, col_width, _ in columns:
+            x_positions.append(x)
+            x += col_width
+
+        def header():
+            self.font(BOLD, size)
+            for (label, col_width, align), cx in zip(columns, x_positions):
+                if align == "r":
+                    self.canvas.drawRightString(cx + col_width - 4, self.y, label)
+                else:
+                    self.canvas.drawString(cx, self.y, label)
+            self.y -= 4
+            self.canvas.line(MARGIN, self.y, x, self.y)
+            self.y -= step
+
+        def continued():
+            if title_cont:
+                self.heading(title_cont)
+            header()
+
+        self.ensure(step * 3)
+        header()
+        previous, self._on_new_page = self._on_new_page, continued
+        try:
+            for row in rows:
+                self.ensure(step)
+                t = self.canvas.beginText()
+                t.setFont(REGULAR, size)
+                for value, (_, col_width, align), cx in zip(row, columns, x_positions):
+                    value = _fit(value, col_width - 6, REGULAR, size)
+                    if align == "r":
+                        cx += col_width - 4 - _width(value, REGULAR, size)
+                    t.setTextOrigin(cx, self.y)
+                    # cada celda fija su origen con setTextOrigin
+                    t.textOut(value)
+                self.canvas.drawText(t)
+                self.y -= step
+        finally:
+            self._on_new_page = previous
+
+    def save(self):
+        self.canvas.showPage()
+        self.canvas.save()
+
+
+# ---- documentos ----
+def render_inference(out, obs, inference):
+    """PDF del mail de nueva inferencia: datos de la observación y la foto."""
+    doc = PdfDocument(out, title="Nueva inferencia — BeetleApp")
+    doc.text("Nueva inferencia — BeetleApp", font=BOLD, size=16, step=30)
+    doc.text(f"Usuario: {obs.user.username}")
+    doc.text(f"Fecha observación: {obs.date.isoformat()}")
+    doc.text(f"Lugar: {obs.place_text or '-'}")
+    doc.text(f"Coordenadas: ({obs.latitude}, {obs.longitude})", step=25)
+
+    doc.heading("Inferencia generada por IA")
+    doc.text(f"Especie: {inference.predicted_label}", x=60)
+    doc.text(f"Confianza: {float(inference.confidence):.1f}%", x=60)
+    if inference.model_version:
+        doc.text(f"Modelo usado: {inference.model_version.name}", x=60)
+    doc.space(20)
+
+    if obs.photo:
+        try:
+            doc.image(photo_derivative(obs.photo.name))
+        except Exception:
+            pass
+
+    doc.save()
+
+
+REPORT_COLUMNS = [
+    ("Fecha", 52, "l"),
+    ("Lugar", 105, "l"),
+    ("Coordenadas", 98, "l"),
+    ("Especie", 110, "l"),
+    ("Conf.", 32, "r"),
+    ("Modelo", 98, "l"),
+]
+
+
+def report_rows(rows):
+    """Filas (date, place, lat, lon, inf_id, label, confidence, model) -> celdas."""
+    for date, place, lat, lon, inf_id, label, confidence, model in rows:
+        if inf_id is None:
+            cells = ("(sin inferencia)", "", "")
+        else:
+            cells = (label or "", f"{confidence:.1f}", model or "")
+        yield (date.isoformat(), place or "-", f"{lat}, {lon}") + cells
+
+
+def render_report(out, username, date_from, date_to, total, species_counts, rows):
+    """
+    Informe de observaciones: resumen, conteo por especie y una tabla de
+    detalle con una fila por observación. `rows` se consume en streaming
+    (ver `report_rows` para las columnas).
+    """
+    doc = PdfDocument(out, title="Informe de observaciones — BeetleApp")
+    doc.text("Informe de observaciones — BeetleApp", font=BOLD, size=16, step=30)
+
+    rango_txt = "Todo el historial"
+    if date_from or date_to:
+        d1 = date_from.isoformat() if date_from else "inicio"
+        d2 = date_to.isoformat() if date_to else "hoy"
+        rango_txt = f"Rango: {d1} a {d2}"
+    doc.text(rango_txt, step=20)
+    doc.text(f"Usuario: {username}", step=30)
+
+    doc.heading("Resumen general", step=20)
+    doc.text(f"Total de observaciones: {total}", x=60)
+    doc.text(f"Especies distintas observadas: {len(species_counts)}", x=60, step=30)
+
+    doc.heading("Especies (conteo)")
+    if not species_counts:
+        doc.text("No hay especies en este rango.", x=60)
+    else:
+        doc.table(
+            [("Especie", 380, "l"), ("Observaciones", 115, "r")],
+            ((str(row["label"]), str(row["count"])) for row in species_counts),
+            size=10,
+            step=14,
+        )
+
+    doc.space(30)
+    doc.heading("Detalle de observaciones")
+    if not total:
+        doc.text("No hay observaciones en este rango.", x=60)
+    else:
+        doc.table(
+            REPORT_COLUMNS,
+            report_rows(rows),
+            title_cont="Detalle de observaciones (cont.)",
+        )
+
+    doc.save()
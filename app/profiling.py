@@ -0,0 +1,87 @@
+"""
+Métricas por vista: tiempo total, cantidad de queries y tiempo en la DB.
+
+Las registra app.middleware.RequestProfilingMiddleware. Se guardan en
+memoria del proceso, con una ventana de las últimas PROFILING_WINDOW
+muestras por vista, y se consultan en /api/stats/requests/ (staff).
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+def percentile(sorted_values, pct):
+    """Percentil `pct` (nearest-rank) de una lista ya ordenada; None si está vacía."""
+    if not sorted_values:
+        return None
+    idx = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class QueryCounter:
+    """execute_wrapper de Django: cuenta queries y acumula su duración."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestStats:
+    METRICS = ("wall_ms", "queries", "db_ms")
+
+    def __init__(self, window=None):
+        self.window = window or getattr(settings, "PROFILING_WINDOW", 1000)
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}
+
+    def record(self, key, wall_ms, queries, db_ms, over_budget):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+                self._totals[key] = {"count": 0, "over_budget": 0}
+            samples.append((wall_ms, queries, db_ms))
+            self._totals[key]["count"] += 1
+            self._totals[key]["over_budget"] += int(over_budget)
+
+    def snapshot(self):
+        with self._lock:
+            data = {k: (list(v), dict(self._totals[k])) for k, v in self._samples.items()}
+
+        out = {}
+        for key, (samples, totals) in sorted(data.items()):
+            entry = {**totals, "window": len(samples)}
+            for i, metric in enumerate(self.METRICS):
+                values = sorted(s[i] for s in samples)
+                entry[metric] = {
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "p99": percentile(values, 99),
+                    "max": values[-1] if values else None,
+                }
+            out[key] = entry
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+def query_budget(view_name: str) -> int:
+    budgets = getattr(settings, "PROFILING_QUERY_BUDGETS", {})
+    return budgets.get(view_name, getattr(settings, "PROFILING_QUERY_BUDGET", 20))
+
+
+request_stats = RequestStats()
@@ -0,0 +1,125 @@
+"""
+Cache en memoria del proceso para tablas de referencia chicas
+(ModelVersion, Species), que se leen en cada escritura de Inference.
+
+Se carga la tabla entera en el primer uso. Los signals de post_save /
+post_delete llaman a `invalidate()`, que limpia la copia local e
+incrementa una generación en el cache de Django: los demás procesos (con
+un backend compartido) la comparan cada CHECK_INTERVAL segundos y
+recargan. Con LocMemCache la invalidación vale solo para el proceso que
+hizo el cambio; el resto se entera al recargar por TTL.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import ModelVersion, Species
+
+
+class ReferenceCache:
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, model, field: str = "name"):
+        self.model = model
+        self.field = field
+        self._lock = threading.Lock()
+        self._gen_key = f"refcache:{model._meta.label_lower}:generation"
+        self._local_gen = 0
+        self._shared_gen = None
+        self._next_check = 0.0
+        self._expires = 0.0
+        self._by_name: Optional[Dict[str, object]] = None
+        self._by_lower: Dict[str, object] = {}
+        self._by_pk: Dict[int, object] = {}
+        # hubo cambios en una transacción que todavía no se confirmó
+        self._dirty = False
+
+    # ---- lectura ----
+    def _snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._by_name is not None and now < self._next_check:
+                return self._by_name, self._by_lower, self._by_pk
+            local_gen = self._local_gen
+            cached = self._by_name is not None and now < self._expires
+
+        shared_gen = cache.get(self._gen_key, 0)
+        if cached and shared_gen == self._shared_gen:
+            with self._lock:
+                self._next_check = now + self.CHECK_INTERVAL
+                return self._by_name, self._by_lower, self._by_pk
+
+        rows = list(self.model.objects.all())
+        by_name = {getattr(r, self.field): r for r in rows}
+        by_lower = {name.lower(): r for name, r in by_name.items()}
+        by_pk = {r.pk: r for r in rows}
+
+        in_atomic = connection.in_atomic_block
+        with self._lock:
+            if not in_atomic:
+                self._dirty = False
+            # si se invalidó mientras cargábamos, o si la carga ve filas
+            # sin confirmar, se usa la copia pero no se guarda
+            if local_gen == self._local_gen and not (self._dirty and in_atomic):
+                self._by_name, self._by_lower, self._by_pk = by_name, by_lower, by_pk
+                self._shared_gen = shared_gen
+                self._next_check = now + self.CHECK_INTERVAL
+                self._expires = now + getattr(settings, "REFCACHE_TTL", 300)
+        return by_name, by_lower, by_pk
+
+    def get(self, name: str):
+        return self._snapshot()[0].get(name)
+
+    def get_by_pk(self, pk):
+        return self._snapshot()[2].get(pk)
+
+    def names_by_lower(self) -> Dict[str, str]:
+        """{nombre en minúsculas: nombre}."""
+        return {lower: getattr(r, self.field) for lower, r in self._snapshot()[1].items()}
+
+    # ---- escritura ----
+    def get_or_create(self, name: str, **defaults):
+        """
+        Instancia con ese nombre, creándola si no existe. Si dos procesos la
+        crean a la vez, get_or_create atrapa el IntegrityError de la
+        constraint unique y relee la fila del otro.
+        """
+        obj = self.get(name)
+        if obj is not None:
+            return obj
+        obj, _ = self.model.objects.get_or_create(defaults=defaults, **{self.field: name})
+        return obj
+
+    def invalidate(self):
+        with self._lock:
+            self._local_gen += 1
+            self._by_name = None
+            self._dirty = self._dirty or connection.in_atomic_block
+        try:
+            cache.incr(self._gen_key)
+        except ValueError:
+            if not cache.add(self._gen_key, 1, timeout=None):
+                cache.incr(self._gen_key)
+
+    def invalidate_on_commit(self):
+        """Para signals: invalida ya y otra vez al confirmar la transacción."""
+        self.invalidate()
+        transaction.on_commit(self._committed)
+
+    def _committed(self):
+        with self._lock:
+            self._dirty = False
+        self.invalidate()
+
+
+model_versions = ReferenceCache(ModelVersion)
+species = ReferenceCache(Species)
+
+
+def get_model_version(name: str) -> ModelVersion:
+    """ModelVersion por nombre, sin query si ya está en cache."""
+    return model_versions.get_or_create(name or "unknown")
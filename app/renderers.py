@@ -0,0 +1,36 @@
+"""Renderer JSON rápido (orjson) compatible con el JSONRenderer de DRF."""
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa el renderer de DRF
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Igual salida que JSONRenderer (fechas, Decimal, lazy strings vía el
+    encoder de DRF) pero serializando con orjson. Si se pide indentación
+    (`; indent=N` o el browsable API) delega en DRF.
+    """
+
+    _default = encoders.JSONEncoder().default
+
+    if orjson is not None:
+        _options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self._default, option=self._options)
+        # igual que DRF: JSON como subconjunto estricto de JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
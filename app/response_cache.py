@@ -0,0 +1,123 @@
+"""
+Cache de respuestas por usuario (resumen y listado de observaciones).
+
+La clave incluye la versión de datos del usuario (app.versioning), que se
+incrementa desde los post_save/post_delete de Observation e Inference: al
+cambiar los datos, las entradas anteriores dejan de ser alcanzables y
+expiran solas por TTL. Un lock con `cache.add` evita que varios requests
+concurrentes con el mismo miss calculen la misma respuesta.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from . import versioning
+
+logger = logging.getLogger(__name__)
+
+_STATS_PREFIX = "respcache:stats"
+_EVENTS = ("hit", "miss", "wait_hit")
+_VIEWS = set()
+
+
+def _ttl() -> int:
+    return getattr(settings, "RESPONSE_CACHE_TTL", 300)
+
+
+def _count(view: str, event: str):
+    key = f"{_STATS_PREFIX}:{view}:{event}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def stats() -> dict:
+    """{vista: {"hit", "miss", "wait_hit", "hit_rate"}} desde que arrancó el cache."""
+    out = {}
+    for view in sorted(_VIEWS):
+        counts = {
+            e: cache.get(f"{_STATS_PREFIX}:{view}:{e}", 0) for e in _EVENTS
+        }
+        total = sum(counts.values())
+        hits = counts["hit"] + counts["wait_hit"]
+        out[view] = {**counts, "hit_rate": round(hits / total, 4) if total else None}
+    return out
+
+
+def _normalize(request, params) -> str:
+    parts = []
+    for name in params:
+        values = [
+            " ".join(v.split())
+            for v in request.query_params.getlist(name)
+            if v.strip()
+        ]
+        if values:
+            parts.append(f"{name}={','.join(sorted(values))}")
+    return "&".join(parts)
+
+
+def cache_key(view: str, request, version: int, params) -> str:
+    raw = f"{request.get_host()}|{_normalize(request, params)}"
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f"respcache:{view}:{request.user.pk}:{version}:{digest}"
+
+
+def cached_response(view: str, params=(), lock_timeout: int = 30, wait: float = 5.0):
+    """
+    Decorador para handlers GET de DRF. Solo cachea respuestas 200 en JSON.
+    `params` son los query params que afectan el resultado (el resto se
+    ignora al armar la clave).
+    """
+
+    _VIEWS.add(view)
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if getattr(request.accepted_renderer, "format", None) != "json":
+                return method(self, request, *args, **kwargs)
+
+            version = getattr(request, "_data_version", None)
+            if version is None:
+                version, _ = versioning.current(request.user)
+            key = cache_key(view, request, version, params)
+
+            cached = cache.get(key)
+            if cached is not None:
+                _count(view, "hit")
+                return Response(cached)
+
+            lock_key = f"{key}:lock"
+            locked = cache.add(lock_key, 1, timeout=lock_timeout)
+            if not locked:
+                # otro request está calculando la misma respuesta
+                deadline = time.monotonic() + wait
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    cached = cache.get(key)
+                    if cached is not None:
+                        _count(view, "wait_hit")
+                        return Response(cached)
+                logger.info("response cache: timeout esperando %s", key)
+
+            _count(view, "miss")
+            try:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200 and isinstance(response, Response):
+                    cache.set(key, response.data, timeout=_ttl())
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            return response
+
+        return wrapper
+
+    return decorator
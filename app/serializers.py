@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import Observation, Inference
 from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.utils.encoding import filepath_to_uri
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
@@ -9,7 +11,7 @@ from django.utils.http import urlsafe_base64_decode
 class InferenceMiniSerializer(serializers.ModelSerializer):
     class Meta:
         model = Inference
-        fields = ["predicted_label", "confidence", "created_at"]
+        fields = ["predicted_label", "confidence", "top_k", "created_at"]
 
 
 class ObservationSerializer(serializers.ModelSerializer):
@@ -20,9 +22,12 @@ class ObservationSerializer(serializers.ModelSerializer):
         model = Observation
         fields = [
             "id", "date", "latitude", "longitude", "place_text",
-            "photo", "photo_url", "created_at", "inference"
+            "photo", "photo_url", "client_key", "created_at", "updated_at",
+            "inference"
+        ]
+        read_only_fields = [
+            "id", "client_key", "created_at", "updated_at", "inference"
         ]
-        read_only_fields = ["id", "created_at", "inference"]
 
     def get_photo_url(self, obj):
         req = self.context.get("request")
@@ -31,7 +36,112 @@ class ObservationSerializer(serializers.ModelSerializer):
         except Exception:
             return None
         return req.build_absolute_uri(url) if req else url
-    
+
+
+class ObservationRowReader:
+    """
+    Camino de lectura rápido para listados: misma salida que
+    ObservationSerializer, pero a partir de `.values()` y con dicts planos.
+
+    Solo trae las columnas de los campos pedidos (`fields`, sparse fieldsets)
+    y arma el prefijo de la URL de la foto una sola vez por request.
+    """
+
+    # campo de salida -> columnas necesarias
+    COLUMNS = {
+        "id": ["id"],
+        "date": ["date"],
+        "latitude": ["latitude"],
+        "longitude": ["longitude"],
+        "place_text": ["place_text"],
+        "photo": ["photo"],
+        "photo_url": ["photo"],
+        "client_key": ["client_key"],
+        "created_at": ["created_at"],
+        "updated_at": ["updated_at"],
+        "inference": [
+            "inference__id",
+            "inference__predicted_label",
+            "inference__confidence",
+            "inference__top_k",
+            "inference__created_at",
+        ],
+    }
+
+    _date = serializers.DateField()
+    _datetime = serializers.DateTimeField()
+    _coord = serializers.DecimalField(max_digits=9, decimal_places=6)
+
+    def __init__(self, request=None, fields=None):
+        self.fields = [f for f in self.COLUMNS if not fields or f in fields]
+        self.request = request
+        storage = Observation._meta.get_field("photo").storage
+        self._storage = storage
+        self._photo_prefix = None
+        if isinstance(storage, FileSystemStorage):
+            base = storage.base_url or ""
+            self._photo_prefix = request.build_absolute_uri(base) if request else base
+
+    @staticmethod
+    def parse_fields(raw):
+        """`?fields=id,latitude,...` -> set de campos válidos (o None = todos)."""
+        if not raw:
+            return None
+        wanted = {f.strip() for f in raw.split(",")} & set(
+            ObservationRowReader.COLUMNS
+        )
+        return wanted or None
+
+    def values(self, qs):
+        cols = []
+        for f in self.fields:
+            cols.extend(c for c in self.COLUMNS[f] if c not in cols)
+        return qs.values(*cols)
+
+    def photo_url(self, name):
+        if not name:
+            return None
+        if self._photo_prefix is not None:
+            return self._photo_prefix + filepath_to_uri(name)
+        url = self._storage.url(name)
+        return self.request.build_absolute_uri(url) if self.request else url
+
+    def to_row(self, v):
+        out = {}
+        for f in self.fields:
+            if f in ("photo", "photo_url"):
+                out[f] = self.photo_url(v["photo"])
+            elif f == "inference":
+                if v["inference__id"] is None:
+                    out[f] = None
+                else:
+                    created = v["inference__created_at"]
+                    out[f] = {
+                        "predicted_label": v["inference__predicted_label"],
+                        "confidence": v["inference__confidence"],
+                        "top_k": v["inference__top_k"],
+                        "created_at": (
+                            self._datetime.to_representation(created)
+                            if created
+                            else None
+                        ),
+                    }
+            elif f == "date":
+                out[f] = self._date.to_representation(v["date"])
+            elif f in ("latitude", "longitude"):
+                out[f] = self._coord.to_representation(v[f])
+            elif f in ("created_at", "updated_at"):
+                out[f] = (
+                    self._datetime.to_representation(v[f]) if v[f] else None
+                )
+            else:
+                out[f] = v[f]
+        return out
+
+    def rows(self, values):
+        return [self.to_row(v) for v in values]
+
+
 User = get_user_model()
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -1,15 +1,122 @@
 from io import BytesIO
 
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.core.mail import EmailMessage
 from django.conf import settings
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
+from .models import Inference, ModelVersion, Observation, Species, Tombstone
+from . import authentication, classification, pdf, refcache, tracing, versioning
 
-from .models import Inference
+
+def _deleting_user(origin) -> bool:
+    """True si el borrado viene en cascada desde el usuario."""
+    User = get_user_model()
+    if isinstance(origin, User):
+        return True
+    return isinstance(origin, QuerySet) and origin.model is User
+
+
+@receiver(post_delete, sender=Observation)
+def tombstone_observation(sender, instance: Observation, origin=None, **kwargs):
+    if _deleting_user(origin):
+        return
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        kind=Tombstone.KIND_OBSERVATION,
+        object_id=instance.pk,
+    )
+    versioning.bump([instance.user_id])
+
+
+@receiver(post_delete, sender=Inference)
+def tombstone_inference(sender, instance: Inference, origin=None, **kwargs):
+    if _deleting_user(origin):
+        return
+    user_id = (
+        Observation.objects.filter(pk=instance.observation_id)
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    if user_id is None:
+        return
+    Tombstone.objects.create(
+        user_id=user_id,
+        kind=Tombstone.KIND_INFERENCE,
+        object_id=instance.observation_id,
+    )
+    versioning.bump([user_id])
+
+
+@receiver(post_save, sender=ModelVersion)
+@receiver(post_delete, sender=ModelVersion)
+def invalidate_model_versions(sender, **kwargs):
+    refcache.model_versions.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Species)
+@receiver(post_delete, sender=Species)
+def invalidate_species(sender, **kwargs):
+    refcache.species.invalidate_on_commit()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_auth_user(sender, instance, **kwargs):
+    # contraseña, is_active o datos de perfil: la próxima request relee la fila
+    authentication.invalidate(instance.pk)
+
+
+@receiver(pre_save, sender=Inference)
+def set_effective_label(sender, instance: Inference, raw=False, **kwargs):
+    if raw:
+        return
+    classification.apply_effective_labels([instance])
+
+
+@receiver(pre_save, sender=Species)
+def remember_species_name(sender, instance: Species, raw=False, **kwargs):
+    instance._previous_name = (
+        Species.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+        if instance.pk and not raw
+        else None
+    )
+
+
+@receiver(post_save, sender=Species)
+def relabel_on_species_save(sender, instance: Species, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_name", None)
+    if previous == instance.name:
+        return
+    affected = Q(species=instance) | Q(
+        species__isnull=True, predicted_label__iexact=instance.name
+    )
+    if previous:
+        affected |= Q(effective_label=previous)
+    classification.refresh_effective_labels(Inference.objects.filter(affected))
+
+
+@receiver(post_delete, sender=Species)
+def relabel_on_species_delete(sender, instance: Species, **kwargs):
+    # on_delete=SET_NULL ya dejó species en NULL en sus inferencias
+    classification.refresh_effective_labels(
+        Inference.objects.filter(species__isnull=True, effective_label=instance.name)
+    )
+
+
+@receiver(post_save, sender=Observation)
+def bump_on_observation_save(sender, instance: Observation, **kwargs):
+    versioning.bump([instance.user_id])
+
+
+@receiver(post_save, sender=Inference)
+def bump_on_inference_save(sender, instance: Inference, **kwargs):
+    versioning.bump([instance.observation.user_id])
 
 
 @receiver(post_save, sender=Inference)
@@ -22,78 +129,26 @@ def send_inference_email(sender, instance: Inference, created: bool, **kwargs):
     if not user or not user.email:
         return
 
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y = height - 50
-
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, y, "Nueva inferencia — BeetleApp")
-    y -= 30
-
-    p.setFont("Helvetica", 10)
-    p.drawString(50, y, f"Usuario: {user.username}")
-    y -= 15
-    p.drawString(50, y, f"Fecha observación: {obs.date.isoformat()}")
-    y -= 15
-    p.drawString(50, y, f"Lugar: {obs.place_text or '-'}")
-    y -= 15
-    p.drawString(50, y, f"Coordenadas: ({obs.latitude}, {obs.longitude})")
-    y -= 25
-
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y, "Inferencia generada por IA")
-    y -= 18
-
-    p.setFont("Helvetica", 10)
-    p.drawString(60, y, f"Especie: {instance.predicted_label}")
-    y -= 15
-    p.drawString(60, y, f"Confianza: {float(instance.confidence):.1f}%")
-    y -= 15
-    if instance.model_version:
-        p.drawString(60, y, f"Modelo usado: {instance.model_version.name}")
-        y -= 15
-
-    y -= 20
-
-    if obs.photo:
-        try:
-            image_path = obs.photo.path
-            img = ImageReader(image_path)
-            img_width, img_height = img.getSize()
-
-            max_width = width - 100
-            max_height = 250
-
-            scale = min(max_width / img_width, max_height / img_height, 1.0)
-            draw_w = img_width * scale
-            draw_h = img_height * scale
-
-            if y - draw_h < 50:
-                p.showPage()
-                y = height - 50
-
-            x = 50
-            img_y = y - draw_h
-
-            p.drawImage(
-                img,
-                x,
-                img_y,
-                width=draw_w,
-                height=draw_h,
-                preserveAspectRatio=True,
-                anchor="sw",
-            )
-
-            y = img_y - 20
-        except Exception:
-            pass
-
-    p.showPage()
-    p.save()
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None) or getattr(
+        settings, "EMAIL_HOST_USER", None
+    )
+    if not from_email:
+        return
+
+    # después del commit: el PDF y el SMTP no alargan la transacción del save
+    def send():
+        with tracing.span("email.inference"):
+            _send_inference_email(obs, user, instance, from_email)
+
+    transaction.on_commit(send)
+
+
+def _send_inference_email(obs, user, instance, from_email):
+    with tracing.span("pdf.render"):
+        buffer = BytesIO()
+        pdf.render_inference(buffer, obs, instance)
+        pdf_bytes = buffer.getvalue()
+        buffer.close()
 
     subject = "Nueva inferencia en tu observación — BeetleApp"
     detail_url = f"{getattr(settings, 'FRONTEND_URL', 'http://localhost:5173')}/observations"
@@ -105,12 +160,6 @@ def send_inference_email(sender, instance: Inference, created: bool, **kwargs):
         f"— BeetleApp"
     )
 
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None) or getattr(
-        settings, "EMAIL_HOST_USER", None
-    )
-    if not from_email:
-        return
-
     email = EmailMessage(
         subject=subject,
         body=body,
@@ -118,4 +167,5 @@ def send_inference_email(sender, instance: Inference, created: bool, **kwargs):
         to=[user.email],
     )
     email.attach("inferencia.pdf", pdf_bytes, "application/pdf")
-    email.send(fail_silently=True)
+    with tracing.span("email.send"):
+        email.send(fail_silently=True)
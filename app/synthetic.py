@@ -0,0 +1,127 @@
+"""
+Datos sintéticos para benchmarks y pruebas de carga (bulk inserts).
+
+Lo usan app/tests.py y los comandos seed_synthetic / loadtest.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from . import refcache
+from .models import Inference, Observation
+
+CHUNK = 5000
+
+
+def make_photos(count: int, prefix: str = "synthetic", size: int = 320) -> list:
+    """Genera `count` JPEG chicos en el storage (una vez) y devuelve sus nombres."""
+    from PIL import Image
+
+    rnd = random.Random(42)
+    names = []
+    for i in range(count):
+        name = f"observations/{prefix}/{prefix}_{i:03d}.jpg"
+        if not default_storage.exists(name):
+            color = tuple(rnd.randrange(256) for _ in range(3))
+            img = Image.new("RGB", (size, size), color)
+            buf = BytesIO()
+            img.save(buf, format="JPEG", quality=80)
+            name = default_storage.save(name, ContentFile(buf.getvalue()))
+        names.append(name)
+    return names
+
+
+def seed_dataset(
+    n_observations,
+    n_users,
+    n_species=40,
+    n_versions=3,
+    prefix="bench",
+    password=None,
+    photos=None,
+    inference_ratio=0.8,
+    progress=None,
+):
+    """
+    Crea usuarios, especies, versiones de modelo, observaciones e
+    inferencias con bulk_create, en chunks de CHUNK filas. Devuelve los
+    usuarios creados. `photos` es una lista de nombres en el storage a
+    repartir entre las observaciones (sin ella se usan nombres ficticios).
+    Con `n_species=0` las observaciones quedan sin inferencia; con
+    `n_versions=0` las inferencias quedan sin versión de modelo.
+    """
+    User = get_user_model()
+    hashed = make_password(password) if password else make_password(None)
+    usernames = [f"{prefix}_{i}" for i in range(n_users)]
+    User.objects.bulk_create(
+        User(username=name, email=f"{name}@beetleapp.local", password=hashed)
+        for name in usernames
+    )
+    # releer: en MySQL bulk_create no devuelve pks
+    users = list(User.objects.filter(username__in=usernames).order_by("id"))
+
+    species = [
+        refcache.species.get_or_create(f"Especie {i:02d}") for i in range(n_species)
+    ]
+    versions = [
+        refcache.model_versions.get_or_create(f"resnet18_{prefix}_v{i}")
+        for i in range(n_versions)
+    ]
+
+    start = date(2020, 1, 1)
+    for chunk_start in range(0, n_observations, CHUNK):
+        Observation.objects.bulk_create(
+            Observation(
+                user=users[i % n_users],
+                date=start + timedelta(days=(i * 7) % 1800),
+                latitude=Decimal("-24.780000") + Decimal(i % 997) / 10000,
+                longitude=Decimal("-65.410000") - Decimal(i % 991) / 10000,
+                place_text=f"Sendero {i % 50}",
+                photo=photos[i % len(photos)] if photos else f"observations/{prefix}_{i}.jpg",
+            )
+            for i in range(chunk_start, min(chunk_start + CHUNK, n_observations))
+        )
+        if progress:
+            progress("observations", min(chunk_start + CHUNK, n_observations))
+
+    # una parte con inferencia; la mitad de esas con especie validada
+    ratio = min(max(inference_ratio, 0.0), 1.0) if species else 0.0
+    ids = Observation.objects.filter(user__in=users).order_by("id").values_list("id", flat=True)
+    batch, created = [], 0
+    for i, obs_id in enumerate(ids.iterator(chunk_size=CHUNK), start=1):
+        # la i-ésima lleva inferencia si la parte entera de i * ratio avanza:
+        # exactamente round-down(n * ratio) en total, repartidas parejo
+        if int(i * ratio) == int((i - 1) * ratio):
+            continue
+        label = f"Especie {obs_id % n_species:02d}"
+        # predicted_label coincide con una Species: effective_label es ella misma
+        batch.append(
+            Inference(
+                observation_id=obs_id,
+                predicted_label=label,
+                confidence=50.0 + obs_id % 50,
+                top_k=[{"label": label, "confidence": 50.0 + obs_id % 50}],
+                effective_label=label,
+                species=species[obs_id % n_species] if obs_id % 2 else None,
+                model_version=versions[obs_id % n_versions] if versions else None,
+            )
+        )
+        if len(batch) >= CHUNK:
+            Inference.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+            if progress:
+                progress("inferences", created)
+    if batch:
+        Inference.objects.bulk_create(batch)
+        created += len(batch)
+        if progress:
+            progress("inferences", created)
+
+    return users
@@ -1,3 +1,2060 @@
-from django.test import TestCase
+"""
+Benchmarks de regresión de la API: techo de queries por endpoint y
+latencia/memoria comparadas contra una línea base guardada. Además, el
+plan (EXPLAIN) de cada query de los endpoints calientes, para detectar
+full scans y ordenamientos que no salen de un índice.
 
-# Create your tests here.
+    DB_ENGINE=sqlite python manage.py test app
+    DB_ENGINE=sqlite BENCH_OBSERVATIONS=100000 BENCH_USERS=20 python manage.py test app
+
+    DB_ENGINE=sqlite BENCH_COMPARE=1 python manage.py test app.tests.ApiBenchmarkTests
+
+Variables:
+    BENCH_OBSERVATIONS / BENCH_USERS   tamaño del dataset sintético
+    BENCH_COMPARE=1                    mide latencia/memoria, las compara con la
+                                       línea base e imprime la tabla
+    BENCH_UPDATE_BASELINE=1            reescribe bench_baseline.json
+    BENCH_TOLERANCE                    factor admitido sobre la línea base (2.0)
+    BENCH_OUTPUT                       ruta donde dejar los resultados en JSON
+    PDF_BENCH_OBSERVATIONS             filas del informe PDF de benchmark (10000)
+
+El techo de queries no depende del tamaño del dataset ni de la máquina:
+siempre se verifica, igual que las queries contra la línea base del tamaño
+(todo endpoint de ENDPOINTS tiene que estar en ella). Latencia y memoria sí
+dependen de la máquina, así que solo se miden con BENCH_COMPARE,
+BENCH_UPDATE_BASELINE o BENCH_OUTPUT.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+import zipfile
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode
+from unittest import mock
+
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from html import unescape
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import admin as admin_module
+from . import (
+    admission,
+    ai_client,
+    authentication,
+    checks,
+    db_router,
+    exports,
+    middleware,
+    pdf,
+    refcache,
+    response_cache,
+    tracing,
+    versioning,
+)
+from .middleware import CompressionMiddleware, RequestProfilingMiddleware
+from .models import Inference, ModelVersion, Observation, Species, Tombstone
+from .profiling import request_stats
+from .renderers import FastJSONRenderer
+from .serializers import ObservationRowReader, ObservationSerializer
+from .synthetic import make_photos, seed_dataset
+
+BENCH_OBSERVATIONS = int(os.getenv("BENCH_OBSERVATIONS", "2000"))
+BENCH_USERS = int(os.getenv("BENCH_USERS", "4"))
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "2.0"))
+PDF_BENCH_OBSERVATIONS = int(os.getenv("PDF_BENCH_OBSERVATIONS", "10000"))
+BASELINE_PATH = Path(__file__).with_name("bench_baseline.json")
+BENCH_COMPARE = os.getenv("BENCH_COMPARE") == "1"
+BENCH_UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE") == "1"
+BENCH_OUTPUT = os.getenv("BENCH_OUTPUT")
+# latencia y memoria solo si alguien las va a mirar
+BENCH_TIMED = BENCH_COMPARE or BENCH_UPDATE_BASELINE or bool(BENCH_OUTPUT)
+
+# margen absoluto para que endpoints muy rápidos no fallen por ruido
+LATENCY_SLACK_MS = 5.0
+MEMORY_SLACK_KIB = 256.0
+
+
+def _consume(response):
+    if response.streaming:
+        return b"".join(response.streaming_content)
+    return response.content
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    # se mide contra default (en tests la réplica es otra conexión a la misma base)
+    REPLICA_ENABLED=False,
+)
+class ApiBenchmarkTests(TestCase):
+    # endpoint -> (url, techo de queries). El techo no escala con el dataset.
+    ENDPOINTS = {
+        "observation_list": ("/api/observations/", 3),
+        "observation_list_search": ("/api/observations/?search=especie%2003", 3),
+        "observation_list_by_label": ("/api/observations/?ordering=predicted_label", 3),
+        "observation_list_sparse": ("/api/observations/?fields=id,latitude,longitude,inference", 3),
+        "observation_detail": ("/api/observations/{obs_id}/", 1),
+        "summary": ("/api/reports/observations/summary/", 4),
+        "summary_range": ("/api/reports/observations/summary/?from=2021-01-01&to=2021-12-31", 4),
+        "summary_month": ("/api/reports/observations/summary/?granularity=month", 4),
+        "timeseries": ("/api/reports/observations/timeseries/?granularity=month&top=5", 2),
+        "grid": ("/api/reports/observations/grid/?cell=0.05", 2),
+        "export_csv": ("/api/reports/observations/export/", 2),
+        "export_geojson": ("/api/reports/observations/export/?output=geojson", 2),
+        "export_zip": ("/api/reports/observations/export_zip/?from=2024-01-01", 3),
+        "export_pdf": ("/api/reports/observations/export_pdf/?from=2024-01-01", 4),
+        "sync_changes": ("/api/sync/changes/", 1),
+    }
+    REPEAT = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_dataset(BENCH_OBSERVATIONS, BENCH_USERS)
+        cls.user = cls.users[0]
+        cls.obs_id = (
+            Observation.objects.filter(user=cls.user).values_list("id", flat=True).first()
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _measure(self, url):
+        _consume(self.client.get(url))  # warm-up
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+            _consume(response)
+        self.assertEqual(response.status_code, 200, url)
+        # leer ya: request_started vacía el log de queries en el próximo GET
+        queries = len(ctx.captured_queries)
+        if not BENCH_TIMED:
+            return {"queries": queries}
+
+        times = []
+        for _ in range(self.REPEAT):
+            t0 = time.perf_counter()
+            _consume(self.client.get(url))
+            times.append((time.perf_counter() - t0) * 1000.0)
+
+        tracemalloc.start()
+        try:
+            _consume(self.client.get(url))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "queries": queries,
+            "p50_ms": round(statistics.median(times), 2),
+            "peak_kib": round(peak / 1024.0, 1),
+        }
+
+    def test_endpoints_against_ceilings_and_baseline(self):
+        results = {}
+        for name, (url, ceiling) in self.ENDPOINTS.items():
+            with self.subTest(endpoint=name):
+                result = self._measure(url.format(obs_id=self.obs_id))
+                results[name] = result
+                self.assertLessEqual(
+                    result["queries"],
+                    ceiling,
+                    f"{name}: {result['queries']} queries (techo {ceiling})",
+                )
+
+        if BENCH_TIMED:
+            self._report(results)
+
+        size_key = f"{BENCH_OBSERVATIONS}x{BENCH_USERS}"
+        baselines = (
+            json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        )
+        if BENCH_UPDATE_BASELINE:
+            baselines[size_key] = results
+            BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+            return
+
+        baseline = baselines.get(size_key)
+        if not baseline:
+            if BENCH_COMPARE:
+                self.skipTest(f"Sin línea base para {size_key} (BENCH_UPDATE_BASELINE=1).")
+            return
+
+        # un endpoint nuevo sin línea base es un olvido, no un pase
+        missing = sorted(set(results) - set(baseline))
+        self.assertFalse(
+            missing, f"Sin línea base para {', '.join(missing)} (BENCH_UPDATE_BASELINE=1)."
+        )
+        for name, result in results.items():
+            base = baseline[name]
+            with self.subTest(endpoint=name, check="baseline"):
+                self.assertLessEqual(
+                    result["queries"],
+                    base["queries"],
+                    f"{name}: queries {base['queries']} -> {result['queries']}",
+                )
+                if not BENCH_COMPARE:
+                    continue
+                self.assertLessEqual(
+                    result["p50_ms"],
+                    base["p50_ms"] * BENCH_TOLERANCE + LATENCY_SLACK_MS,
+                    f"{name}: p50 {base['p50_ms']}ms -> {result['p50_ms']}ms",
+                )
+                self.assertLessEqual(
+                    result["peak_kib"],
+                    base["peak_kib"] * BENCH_TOLERANCE + MEMORY_SLACK_KIB,
+                    f"{name}: memoria {base['peak_kib']}KiB -> {result['peak_kib']}KiB",
+                )
+
+    def _report(self, results):
+        if BENCH_COMPARE:
+            lines = [
+                f"\n{'endpoint':<28}{'queries':>8}{'p50 ms':>10}{'peak KiB':>11}"
+                f"  ({BENCH_OBSERVATIONS} obs, {BENCH_USERS} usuarios)"
+            ]
+            for name, r in results.items():
+                lines.append(f"{name:<28}{r['queries']:>8}{r['p50_ms']:>10}{r['peak_kib']:>11}")
+            print("\n".join(lines))
+
+        if BENCH_OUTPUT:
+            Path(BENCH_OUTPUT).write_text(
+                json.dumps(
+                    {
+                        "observations": BENCH_OBSERVATIONS,
+                        "users": BENCH_USERS,
+                        "results": results,
+                    },
+                    indent=2,
+                )
+            )
+
+
+def explain(sql):
+    """Filas del plan de ejecución de `sql` (SQLite o MySQL) como dicts."""
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql)
+        columns = [c[0].lower() for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def plan_problems(rows, tables, check_order):
+    """Full scans sobre `tables` y, si `check_order`, ORDER BY resuelto aparte."""
+    problems = []
+    for row in rows:
+        if connection.vendor == "sqlite":
+            detail = row["detail"]
+            if any(re.match(rf"SCAN {t}\b", detail) for t in tables):
+                problems.append(detail)
+            if check_order and "TEMP B-TREE FOR ORDER BY" in detail:
+                problems.append(detail)
+        else:
+            extra = (row.get("extra") or "").lower()
+            if row.get("table") in tables and row.get("type") == "ALL":
+                problems.append(f"{row['table']}: full scan")
+            if check_order and "filesort" in extra:
+                problems.append(f"{row.get('table')}: {extra}")
+    return problems
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    # se mide contra default (en tests la réplica es otra conexión a la misma base)
+    REPLICA_ENABLED=False,
+)
+class QueryPlanTests(TestCase):
+    TABLES = ("app_observation", "app_inference")
+    # endpoint -> (url, el ORDER BY tiene que salir de un índice)
+    ENDPOINTS = {
+        "observation_list": ("/api/observations/", True),
+        "observation_list_page": ("/api/observations/?page=3", True),
+        "observation_list_by_date": ("/api/observations/?ordering=-date", True),
+        "observation_list_search": ("/api/observations/?search=sendero", True),
+        "summary_range": ("/api/reports/observations/summary/?from=2021-01-01&to=2021-12-31", False),
+        "timeseries_range": ("/api/reports/observations/timeseries/?from=2021-01-01&to=2021-12-31", False),
+        "grid_range": ("/api/reports/observations/grid/?from=2021-01-01&to=2021-12-31", False),
+        "export_csv_range": ("/api/reports/observations/export/?from=2021-01-01&to=2021-06-30", False),
+        "export_pdf": ("/api/reports/observations/export_pdf/?from=2024-01-01", True),
+        "sync_changes": ("/api/sync/changes/", False),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        if connection.vendor not in ("sqlite", "mysql"):
+            return
+        cls.user = seed_dataset(600, 3)[0]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        if connection.vendor not in ("sqlite", "mysql"):
+            self.skipTest(f"EXPLAIN no soportado para {connection.vendor}")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_hot_queries_use_indexes(self):
+        plans = {}
+        for name, (url, check_order) in self.ENDPOINTS.items():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+                _consume(response)
+            self.assertEqual(response.status_code, 200, url)
+            queries = [
+                q["sql"]
+                for q in ctx.captured_queries
+                if q["sql"].lstrip().upper().startswith("SELECT")
+                and re.search(r"\bapp_observation\b", q["sql"])
+            ]
+            for i, sql in enumerate(queries):
+                rows = explain(sql)
+                plans[f"{name}[{i}]"] = rows
+                # ordenar el resultado de un GROUP BY (una fila por grupo) es barato
+                row_order = check_order and "GROUP BY" not in sql.upper()
+                with self.subTest(endpoint=name, query=i):
+                    problems = plan_problems(rows, self.TABLES, row_order)
+                    self.assertFalse(problems, f"{name}: {problems}\n{sql}")
+
+        output = os.getenv("EXPLAIN_OUTPUT")
+        if output:
+            Path(output).write_text(json.dumps(plans, indent=2, default=str))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    REPLICA_STICKY_SECONDS=5,
+)
+class ReplicaRoutingTests(TestCase):
+    """Decisión de ruteo (sin conectar a la réplica: queryset.db no consulta)."""
+
+    class _View:
+        @db_router.use_replica
+        def get(self, request):
+            return Observation.objects.all().db
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = seed_dataset(0, 2, n_species=0, n_versions=0, prefix="replica")
+
+    def _read_db(self, user):
+        return self._View().get(mock.Mock(user=user))
+
+    def test_reads_and_stickiness(self):
+        with mock.patch.object(db_router, "replica_enabled", return_value=True):
+            self.assertEqual(self._read_db(self.alice), "replica")
+            # fuera de un handler marcado, siempre default
+            self.assertEqual(Observation.objects.all().db, "default")
+
+            versioning.bump([self.alice.pk])
+            self.assertEqual(self._read_db(self.alice), "default")
+            self.assertEqual(self._read_db(self.bob), "replica")
+
+        # réplica apagada, todo a default
+        with self.settings(REPLICA_ENABLED=False):
+            self.assertEqual(self._read_db(self.bob), "default")
+
+    def test_data_version_always_read_from_default(self):
+        versioning.bump([self.alice.pk])
+        # "replica" no existe en los tests: si current() pasara por el router
+        # fallaría con ConnectionDoesNotExist
+        token = db_router._read_alias.set(db_router.REPLICA)
+        try:
+            self.assertEqual(versioning.current(self.alice)[0], 1)
+        finally:
+            db_router._read_alias.reset(token)
+
+    def test_pin_seen_by_another_process(self):
+        with tempfile.TemporaryDirectory() as location:
+            shared = {
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                }
+            }
+            with self.settings(CACHES=shared), mock.patch.object(
+                db_router, "replica_enabled", return_value=True
+            ):
+                self.assertEqual(checks.replica_pin_cache_check(None), [])
+                versioning.bump([self.alice.pk])
+
+            script = (
+                "import django; django.setup()\n"
+                "from unittest import mock\n"
+                "from app import db_router\n"
+                "for pk in (%d, %d):\n"
+                "    user = mock.Mock(pk=pk, is_authenticated=True)\n"
+                "    print(db_router.read_alias_for(user))\n"
+            ) % (self.alice.pk, self.bob.pk)
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "beetleapp.settings",
+                "DB_ENGINE": "sqlite",
+                "SQLITE_REPLICA_PATH": os.path.join(location, "replica.sqlite3"),
+                "CACHE_BACKEND": shared["default"]["BACKEND"],
+                "CACHE_LOCATION": location,
+            }
+            out = subprocess.run(
+                [sys.executable, "-c", script],
+                env=env,
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+        # el otro worker ve el pin de alice; bob sigue yendo a la réplica
+        self.assertEqual(out, ["None", db_router.REPLICA])
+
+    def test_replica_requires_shared_cache(self):
+        with mock.patch.object(db_router, "replica_enabled", return_value=True):
+            self.assertEqual(
+                [e.id for e in checks.replica_pin_cache_check(None)], ["app.E001"]
+            )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    AUTH_USER_CACHE_SECONDS=60,
+    # un solo proceso: el LocMemCache del test es compartido
+    AUTH_USER_CACHE_ALLOW_LOCAL=True,
+)
+class CachedJWTAuthenticationTests(TestCase):
+    """El usuario del token sale del cache; cambios en la fila lo invalidan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(0, 1, n_species=0, n_versions=0, prefix="jwt")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def _me(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/auth/me/")
+        user_queries = [q for q in ctx.captured_queries if "auth_user" in q["sql"]]
+        return response, len(user_queries)
+
+    def test_user_cached_and_invalidated(self):
+        response, queries = self._me()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 1)
+
+        response, queries = self._me()
+        self.assertEqual(response.json()["username"], self.user.username)
+        self.assertEqual(queries, 0)
+
+        self.user.email = "nuevo@example.com"
+        self.user.save()
+        response, queries = self._me()
+        self.assertEqual(response.json()["email"], "nuevo@example.com")
+        self.assertEqual(queries, 1)
+
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self._me()
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_user_rejected_on_next_request(self):
+        self._me()
+        response, queries = self._me()
+        self.assertEqual((response.status_code, queries), (200, 0))
+
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self._me()
+        self.assertEqual(response.status_code, 401)
+
+    def test_process_local_cache_is_not_used(self):
+        with self.settings(AUTH_USER_CACHE_ALLOW_LOCAL=False):
+            self.assertFalse(authentication.cache_enabled())
+            self.assertEqual(
+                [w.id for w in checks.auth_user_cache_check(None)], ["app.W001"]
+            )
+            for _ in range(2):
+                response, queries = self._me()
+                self.assertEqual((response.status_code, queries), (200, 1))
+        self.assertEqual(checks.auth_user_cache_check(None), [])
+
+    def test_password_hash_not_cached(self):
+        self._me()
+        values, password_md5 = cache.get(authentication._key(self.user.pk))
+        self.assertNotIn(self.user.password, values)
+        self.assertIsNone(password_md5)
+
+        user, _ = authentication.cached_user(self.user.pk)
+        self.assertLessEqual({"password", "last_login"}, user.get_deferred_fields())
+        # un campo diferido se lee de la base si alguien lo pide
+        with self.assertNumQueries(1):
+            self.assertEqual(user.password, self.user.password)
+
+    def test_revoke_check_uses_cached_digest(self):
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            token = AccessToken.for_user(self.user)
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            self._me()
+            response, queries = self._me()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(queries, 0)
+            _, password_md5 = cache.get(authentication._key(self.user.pk))
+            self.assertEqual(password_md5, get_md5_hash_password(self.user.password))
+
+            self.user.set_password("otra-clave")
+            self.user.save()
+            response, _ = self._me()
+            self.assertEqual(response.status_code, 401)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class ReportParamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(20, 1, n_species=2, n_versions=1, prefix="params")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_non_finite_grid_params_are_rejected(self):
+        for query in ("cell=nan", "cell=Infinity", "bbox=nan,0,1,1", "bbox=0,0,inf,1"):
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/reports/observations/grid/?{query}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_range_filter_is_shared(self):
+        dates = sorted(Observation.objects.values_list("date", flat=True))
+        date_from, date_to = dates[5].isoformat(), dates[14].isoformat()
+        expected = Observation.objects.filter(date__range=(dates[5], dates[14])).count()
+
+        summary = self.client.get(
+            f"/api/reports/observations/summary/?from={date_from}&to={date_to}"
+        ).json()
+        self.assertEqual(summary["total_observations"], expected)
+        self.assertEqual(summary["filters"], {"from": date_from, "to": date_to})
+
+        csv_lines = _consume(
+            self.client.get(f"/api/reports/observations/export/?from={date_from}&to={date_to}")
+        ).decode().strip().splitlines()
+        self.assertEqual(len(csv_lines) - 1, expected)
+
+
+class SyntheticDatasetTests(TestCase):
+    def test_inference_ratio(self):
+        for ratio in (0.2, 0.5, 0.9):
+            with self.subTest(ratio=ratio):
+                (user,) = seed_dataset(
+                    100, 1, n_species=3, n_versions=1, prefix=f"ratio{ratio}", inference_ratio=ratio
+                )
+                observations = Observation.objects.filter(user=user)
+                self.assertEqual(observations.count(), 100)
+                self.assertEqual(
+                    observations.filter(inference__isnull=False).count(), round(100 * ratio)
+                )
+
+
+class TempMediaMixin:
+    """MEDIA_ROOT en un directorio temporal para tests que escriben fotos."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media = tempfile.TemporaryDirectory()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media.name)
+        cls._media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_override.disable()
+        cls._media.cleanup()
+
+
+def _jpeg_upload(name="foto.jpg"):
+    buf = BytesIO()
+    Image.new("RGB", (16, 16), (120, 80, 40)).save(buf, format="JPEG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+    SYNC_CURSOR_MARGIN_SECONDS=60,
+)
+class SyncTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(5, 1, n_species=2, n_versions=1, prefix="sync")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _changes(self, cursor=None, limit=None):
+        params = {k: v for k, v in (("cursor", cursor), ("limit", limit)) if v}
+        response = self.client.get("/api/sync/changes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _sync_all(self, cursor=None, limit=None):
+        ids, pages = [], 0
+        while True:
+            body = self._changes(cursor, limit)
+            ids += [o["id"] for o in body["observations"]]
+            cursor, pages = body["cursor"], pages + 1
+            if not body["has_more"]:
+                return ids, cursor, body, pages
+
+    def test_upload_is_idempotent_by_client_key(self):
+        item = {
+            "client_key": "offline-1",
+            "date": "2024-05-01",
+            "latitude": "-24.780000",
+            "longitude": "-65.410000",
+            "photo": "f0",
+        }
+        responses = [
+            self.client.post(
+                "/api/sync/upload/",
+                {"items": json.dumps([item]), "f0": _jpeg_upload()},
+                format="multipart",
+            ).json()["results"][0]
+            for _ in range(2)
+        ]
+        self.assertEqual([r["status"] for r in responses], ["created", "exists"])
+        self.assertEqual(responses[0]["id"], responses[1]["id"])
+        self.assertEqual(Observation.objects.filter(client_key="offline-1").count(), 1)
+
+    def test_cursor_paging_returns_every_row_once(self):
+        ids, _, _, pages = self._sync_all(limit=2)
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(ids), sorted(Observation.objects.values_list("id", flat=True)))
+
+    def test_tombstones_and_late_commits(self):
+        _, cursor, _, _ = self._sync_all()
+        gone, without_inference, late = list(
+            Observation.objects.filter(inference__isnull=False).order_by("id")[:3]
+        )
+        gone_id = gone.pk
+        gone.delete()
+        Inference.objects.filter(observation=without_inference).delete()
+        # confirmó después del sync anterior, pero con un updated_at previo
+        Observation.objects.filter(pk=late.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=10)
+        )
+
+        ids, _, body, _ = self._sync_all(cursor)
+        self.assertEqual(body["deleted"]["observations"], [gone_id])
+        # borrar la observación borra (y registra) también su inferencia
+        self.assertEqual(sorted(body["deleted"]["inferences"]), sorted([gone_id, without_inference.pk]))
+        self.assertIn(late.pk, ids)
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=7)
+    def test_cursor_older_than_retention_is_gone(self):
+        _, cursor, _, _ = self._sync_all()
+        later = timezone.now() + timedelta(days=8)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self.client.get("/api/sync/changes/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 410)
+            # sin cursor vuelve a bajar todo
+            self.assertEqual(self.client.get("/api/sync/changes/").status_code, 200)
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0)
+    def test_cursor_never_expires_without_retention(self):
+        _, cursor, _, _ = self._sync_all()
+        later = timezone.now() + timedelta(days=365)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertEqual(self._changes(cursor)["deleted"]["observations"], [])
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=7)
+    def test_prune_tombstones(self):
+        ids = Observation.objects.filter(user=self.user).order_by("id")
+        old_id, recent_id = ids.values_list("id", flat=True)[:2]
+        Observation.objects.filter(pk__in=[old_id, recent_id]).delete()
+        Tombstone.objects.filter(object_id=old_id).update(
+            deleted_at=timezone.now() - timedelta(days=8)
+        )
+        recent = set(Tombstone.objects.filter(object_id=recent_id).values_list("pk", flat=True))
+
+        call_command("prune_tombstones", "--dry-run", stdout=io.StringIO())
+        self.assertTrue(Tombstone.objects.filter(object_id=old_id).exists())
+
+        call_command("prune_tombstones", stdout=io.StringIO())
+        self.assertEqual(set(Tombstone.objects.values_list("pk", flat=True)), recent)
+
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=365))
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0):
+            call_command("prune_tombstones", stdout=io.StringIO())
+        self.assertEqual(set(Tombstone.objects.values_list("pk", flat=True)), recent)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class ConditionalGetTests(TestCase):
+    """ETag por versión de datos: 304 sin cambios, 200 después de escribir."""
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(6, 1, n_species=2, n_versions=1, prefix="etag")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified_until_a_write(self):
+        for url in ("/api/observations/", "/api/reports/observations/summary/"):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                etag = first["ETag"]
+                self.assertEqual(first.status_code, 200)
+
+                with CaptureQueriesContext(connection) as ctx:
+                    cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b"")
+                # solo la lectura de la versión: la vista no se ejecuta
+                self.assertEqual(len(ctx.captured_queries), 1)
+
+                obs = Observation.objects.filter(user=self.user).first()
+                patched = self.client.patch(
+                    f"/api/observations/{obs.pk}/", {"place_text": f"Nuevo {url}"}, format="json"
+                )
+                self.assertEqual(patched.status_code, 200)
+
+                after = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(after.status_code, 200)
+                self.assertNotEqual(after["ETag"], etag)
+
+    def test_etag_depends_on_query(self):
+        a = self.client.get("/api/observations/?ordering=date")["ETag"]
+        b = self.client.get("/api/observations/?ordering=-date")["ETag"]
+        self.assertNotEqual(a, b)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "respcache-tests"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class ResponseCacheTests(TestCase):
+    """Las entradas cacheadas dejan de servirse apenas cambian los datos."""
+
+    URL = "/api/reports/observations/summary/"
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(6, 1, n_species=2, n_versions=1, prefix="respcache")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _summary(self):
+        return self.client.get(self.URL).json()
+
+    def test_hits_and_invalidation_on_writes(self):
+        total = self._summary()["total_observations"]
+        self.assertEqual(self._summary()["total_observations"], total)
+        self.assertEqual(response_cache.stats()["observation_summary"]["hit"], 1)
+
+        # alta
+        template = Observation.objects.filter(user=self.user).first()
+        created = Observation.objects.create(
+            user=self.user,
+            date=template.date,
+            latitude=template.latitude,
+            longitude=template.longitude,
+            photo=template.photo.name,
+        )
+        self.assertEqual(self._summary()["total_observations"], total + 1)
+
+        # modificación: la inferencia pasa a otra especie
+        inference = Inference.objects.filter(observation__user=self.user).first()
+        inference.predicted_label = "Especie nueva"
+        inference.species = None
+        inference.save()
+        labels = {row["label"] for row in self._summary()["species_counts"]}
+        self.assertIn("Especie nueva", labels)
+
+        # baja
+        self.assertEqual(self.client.delete(f"/api/observations/{created.pk}/").status_code, 204)
+        self.assertEqual(self._summary()["total_observations"], total)
+        self.assertEqual(response_cache.stats()["observation_summary"]["hit"], 1)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "admission-tests"}},
+    PROFILING_ENABLED=False,
+    AI_PREVIEW_BUCKETS={"ip": {"rate_per_min": 1, "burst": 2}, "user": {"rate_per_min": 1, "burst": 2}},
+)
+class AdmissionTests(TestCase):
+    """429 por token bucket y 503 por presupuesto de concurrencia, ambos con Retry-After."""
+
+    URL = "/api/predict_preview/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        ok = mock.Mock(status_code=200, json=lambda: {"top_k": []})
+        patcher = mock.patch("app.api._post_to_ai", return_value=ok)
+        self.ai = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self):
+        return self.client.post(self.URL, {"image": _jpeg_upload()}, format="multipart")
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        self.assertEqual(self._post().status_code, 200)
+        self.assertEqual(self._post().status_code, 200)
+        response = self._post()
+        self.assertEqual(response.status_code, 429)
+        # 1 token por minuto: faltan ~60 s para el próximo
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertLessEqual(int(response["Retry-After"]), 60)
+        self.assertEqual(self.ai.call_count, 2)
+
+    def test_queue_full_returns_503_with_retry_after(self):
+        limiter = admission.ConcurrencyLimiter(limit=1, max_queue=0, timeout=0.05)
+        with mock.patch("app.api.preview_limiter", limiter), limiter.slot():
+            response = self._post()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["reason"], "queue_full")
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.ai.assert_not_called()
+
+    def test_queue_timeout_returns_503_with_retry_after(self):
+        limiter = admission.ConcurrencyLimiter(limit=1, max_queue=1, timeout=0.05)
+        with mock.patch("app.api.preview_limiter", limiter), limiter.slot():
+            response = self._post()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["reason"], "timeout")
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertEqual(limiter.snapshot()["rejected_timeout"], 1)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class ExportFormatTests(TestCase):
+    """Parquet, Arrow y GeoJSON devuelven exactamente las filas de la base."""
+
+    URL = "/api/reports/observations/export/"
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(
+            12, 1, n_species=3, n_versions=1, prefix="exportfmt", inference_ratio=0.5
+        )
+        cls.expected = {}
+        for obs in Observation.objects.filter(user=cls.user).select_related(
+            "inference__model_version"
+        ):
+            inference = getattr(obs, "inference", None)
+            cls.expected[obs.id] = {
+                "date": obs.date,
+                "latitude": float(obs.latitude),
+                "longitude": float(obs.longitude),
+                "species_label": inference.effective_label if inference else None,
+                "confidence": inference.confidence if inference else None,
+                "model_version": (
+                    inference.model_version.name
+                    if inference and inference.model_version
+                    else None
+                ),
+            }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _download(self, output):
+        response = self.client.get(self.URL, {"output": output})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def _assert_rows(self, rows):
+        self.assertEqual({row["id"] for row in rows}, set(self.expected))
+        for row in rows:
+            expected = self.expected[row["id"]]
+            self.assertEqual({k: row[k] for k in expected}, expected)
+
+    def _arrow_rows(self, table):
+        self.assertEqual(
+            table.column_names,
+            [
+                "id",
+                "date",
+                "latitude",
+                "longitude",
+                "place_text",
+                "species_label",
+                "confidence",
+                "model_version",
+                "created_at",
+            ],
+        )
+        return table.to_pylist()
+
+    def test_parquet_round_trip(self):
+        if not exports.available("parquet"):
+            self.skipTest("pyarrow no instalado")
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(BytesIO(self._download("parquet")))
+        self._assert_rows(self._arrow_rows(table))
+
+    def test_arrow_round_trip(self):
+        if not exports.available("arrow"):
+            self.skipTest("pyarrow no instalado")
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(self._download("arrow")).read_all()
+        self._assert_rows(self._arrow_rows(table))
+
+    def test_geojson_round_trip(self):
+        data = json.loads(self._download("geojson"))
+        self.assertEqual(data["type"], "FeatureCollection")
+        rows = []
+        for feature in data["features"]:
+            self.assertEqual(feature["geometry"]["type"], "Point")
+            longitude, latitude = feature["geometry"]["coordinates"]
+            props = feature["properties"]
+            rows.append(
+                {
+                    **props,
+                    "id": feature["id"],
+                    "date": date.fromisoformat(props["date"]),
+                    "latitude": latitude,
+                    "longitude": longitude,
+                }
+            )
+        self._assert_rows(rows)
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get(self.URL, {"output": "xlsx"}).status_code, 400)
+
+
+def _zip_manifest(zf):
+    with zf.open(exports.METADATA_NAME) as raw:
+        return list(csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8")))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class ExportZipTests(TempMediaMixin, TestCase):
+    """El ZIP trae cada foto una vez y observations.csv apunta a ellas."""
+
+    URL = "/api/reports/observations/export_zip/"
+
+    @classmethod
+    def setUpTestData(cls):
+        photos = make_photos(3, prefix="exportzip", size=32)
+        (cls.user,) = seed_dataset(
+            5, 1, n_species=2, n_versions=1, prefix="exportzip", photos=photos
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _zip(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(BytesIO(b"".join(response.streaming_content)))
+
+    def test_photos_and_manifest(self):
+        observations = {o.id: o for o in Observation.objects.filter(user=self.user)}
+        with self._zip() as zf:
+            self.assertIsNone(zf.testzip())
+            names = zf.namelist()
+            self.assertEqual(names[-1], exports.METADATA_NAME)
+            manifest = _zip_manifest(zf)
+            photos = {name: zf.read(name) for name in names if name.startswith("photos/")}
+
+        self.assertEqual(len(photos), len(observations))
+        self.assertEqual({int(row["id"]) for row in manifest}, set(observations))
+        for row in manifest:
+            obs = observations[int(row["id"])]
+            self.assertEqual(row["photo"], exports.photo_arcname(obs.id, obs.photo.name))
+            with obs.photo.open("rb") as f:
+                self.assertEqual(photos[row["photo"]], f.read())
+
+    def test_missing_photo_is_left_out_of_the_manifest(self):
+        gone = Observation.objects.filter(user=self.user).order_by("id").first()
+        Observation.objects.filter(pk=gone.pk).update(
+            photo="observations/exportzip/no_existe.jpg"
+        )
+        with self._zip() as zf:
+            names = zf.namelist()
+            manifest = _zip_manifest(zf)
+        row = next(r for r in manifest if int(r["id"]) == gone.pk)
+        self.assertEqual(row["photo"], "")
+        self.assertFalse(any(name.startswith(f"photos/{gone.pk}_") for name in names))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class EffectiveLabelTests(TestCase):
+    """effective_label sigue a la validación y a los renombres de Species."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("efflabel", password=None)
+        cls.carabus = Species.objects.create(name="Carabus auratus")
+        cls.lucanus = Species.objects.create(name="Lucanus cervus")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _inference(self, predicted_label, **kwargs):
+        obs = Observation.objects.create(
+            user=self.user,
+            date=date(2024, 5, 1),
+            latitude=Decimal("-34.6"),
+            longitude=Decimal("-58.4"),
+            photo="observations/efflabel.jpg",
+        )
+        return Inference.objects.create(
+            observation=obs, predicted_label=predicted_label, confidence=80.0, **kwargs
+        )
+
+    def _label(self, inference):
+        return Inference.objects.values_list("effective_label", flat=True).get(pk=inference.pk)
+
+    def test_prediction_is_canonicalised_to_species(self):
+        self.assertEqual(self._label(self._inference("carabus AURATUS")), "Carabus auratus")
+        self.assertEqual(self._label(self._inference("Otra cosa")), "Otra cosa")
+
+    def test_recomputed_after_validation(self):
+        inference = self._inference("Carabus auratus")
+        Inference.objects.filter(pk=inference.pk).update(effective_label="desactualizada")
+
+        response = self.client.post(
+            f"/api/inferences/{inference.pk}/validate/", {"is_correct": False}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._label(inference), "Carabus auratus")
+
+        # la especie validada gana sobre la predicción
+        inference.refresh_from_db()
+        inference.species = self.lucanus
+        inference.save()
+        self.assertEqual(self._label(inference), "Lucanus cervus")
+
+    def test_recomputed_after_species_rename(self):
+        validated = self._inference("Carabus auratus", species=self.lucanus)
+        predicted = self._inference("carabus auratus")
+        other = self._inference("Dorcus parallelipipedus")
+        before = versioning.current(self.user)[0]
+
+        self.lucanus.name = "Lucanus capreolus"
+        self.lucanus.save()
+        self.carabus.name = "Carabus violaceus"
+        self.carabus.save()
+
+        self.assertEqual(self._label(validated), "Lucanus capreolus")
+        # ya no coincide con ninguna especie: vuelve a la predicción
+        self.assertEqual(self._label(predicted), "carabus auratus")
+        self.assertEqual(self._label(other), "Dorcus parallelipipedus")
+        self.assertNotEqual(versioning.current(self.user)[0], before)
+
+        self.carabus.name = "Carabus Auratus"
+        self.carabus.save()
+        self.assertEqual(self._label(predicted), "Carabus Auratus")
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=True,
+    REPLICA_ENABLED=False,
+    TRACING_ENABLED=False,
+)
+class RequestProfilingTests(TestCase):
+    """Queries por request, WARNING sobre el presupuesto y /api/stats/requests/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(30, 1, n_species=2, n_versions=1, prefix="profiling")
+        cls.staff = get_user_model().objects.create_user("profiling_staff", is_staff=True)
+
+    def setUp(self):
+        request_stats.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _logged(self, logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_counts_queries_per_view(self):
+        with CaptureQueriesContext(connection) as ctx, self.assertLogs(
+            "app.profiling", "INFO"
+        ) as logs:
+            self.assertEqual(self.client.get("/api/observations/").status_code, 200)
+        (entry,) = self._logged(logs)
+        self.assertEqual(entry["view"], "observation-list")
+        self.assertEqual(entry["queries"], len(ctx.captured_queries))
+        self.assertFalse(entry["over_budget"])
+
+        stats = request_stats.snapshot()["GET observation-list"]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["queries"]["max"], len(ctx.captured_queries))
+
+    def test_over_budget_logs_warning(self):
+        with self.settings(PROFILING_QUERY_BUDGETS={"observation-list": 1}), self.assertLogs(
+            "app.profiling", "WARNING"
+        ) as logs:
+            self.client.get("/api/observations/")
+        (entry,) = self._logged(logs)
+        self.assertEqual(logs.records[0].levelname, "WARNING")
+        self.assertTrue(entry["over_budget"])
+        self.assertEqual(entry["query_budget"], 1)
+        self.assertEqual(request_stats.snapshot()["GET observation-list"]["over_budget"], 1)
+
+    def test_abandoned_stream_is_recorded(self):
+        response = self.client.get("/api/reports/observations/export/")
+        next(iter(response.streaming_content))
+        self.assertNotIn("GET observations_export_csv", request_stats.snapshot())
+        response.close()
+        self.assertEqual(request_stats.snapshot()["GET observations_export_csv"]["count"], 1)
+
+    def test_failing_stream_is_recorded(self):
+        def content():
+            yield b"a"
+            raise RuntimeError("stream roto")
+
+        middleware = RequestProfilingMiddleware(lambda request: StreamingHttpResponse(content()))
+        response = middleware(RequestFactory().get("/roto/"))
+        with self.assertRaises(RuntimeError):
+            b"".join(response.streaming_content)
+        self.assertEqual(request_stats.snapshot()["GET unresolved"]["count"], 1)
+
+    def test_stats_endpoint_is_staff_only(self):
+        url = "/api/stats/requests/"
+        self.client.get("/api/observations/")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 403)
+        self.assertEqual(APIClient().get(url).status_code, 401)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["GET observation-list"]["count"], 1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertNotIn("GET observation-list", request_stats.snapshot())
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_same_output_as_drf(self):
+        data = {
+            "aware": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            "naive": datetime(2024, 5, 1, 12, 30),
+            "date": date(2024, 5, 1),
+            "time": dt_time(8, 15, 30, 500000),
+            "delta": timedelta(minutes=90),
+            "decimal": Decimal("-34.603700"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "lazy": gettext_lazy("Especie"),
+            "text": "Ñandú \u2028 línea",
+            "nested": [{"n": 1, "f": 0.1, "none": None, "ok": True}],
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    BODY = json.dumps([{"label": f"Especie {i:02d}", "count": i} for i in range(200)]).encode()
+
+    def _middleware(self, response):
+        return CompressionMiddleware(lambda request: response)
+
+    def _get(self, response, accept_encoding):
+        request = RequestFactory().get("/x/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return self._middleware(response)(request)
+
+    def _json(self, body=None, **headers):
+        response = HttpResponse(body or self.BODY, content_type="application/json")
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def test_negotiation(self):
+        cases = [
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("gzip;q=0", None),
+            ("br;q=0, gzip", "gzip"),
+            ("gzip;q=1.0, br;q=0.5", "gzip"),
+            ("*;q=0.5, br;q=0", "gzip"),
+            ("deflate, compress", None),
+        ]
+        if middleware.brotli is not None:
+            cases += [("gzip, br", "br"), ("*", "br"), ("br;q=0.8, gzip;q=0.8", "br")]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(middleware._choose_encoding(header), expected)
+
+    def test_gzip_body_headers_and_etag(self):
+        response = self._get(self._json(ETag='"abc"'), "gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.BODY)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_identity_keeps_body_and_strong_etag(self):
+        response = self._get(self._json(ETag='"abc"'), "identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.BODY)
+        self.assertEqual(response["ETag"], '"abc"')
+        # la representación igual depende de Accept-Encoding
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_min_size(self):
+        with self.settings(COMPRESS_MIN_SIZE=len(self.BODY) + 1):
+            response = self._get(self._json(), "gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.BODY)
+        with self.settings(COMPRESS_MIN_SIZE=len(self.BODY)):
+            response = self._get(self._json(), "gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_other_content_types_untouched(self):
+        response = self._get(HttpResponse(self.BODY, content_type="image/jpeg"), "gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertFalse(response.has_header("Vary"))
+
+    def test_streaming_drops_content_length(self):
+        chunks = [self.BODY[i : i + 100] for i in range(0, len(self.BODY), 100)]
+        for encoding, decompress in self._decoders():
+            with self.subTest(encoding=encoding):
+                streamed = StreamingHttpResponse(iter(chunks), content_type="text/csv")
+                streamed["Content-Length"] = str(len(self.BODY))
+                response = self._get(streamed, encoding)
+                self.assertEqual(response["Content-Encoding"], encoding)
+                self.assertFalse(response.has_header("Content-Length"))
+                self.assertEqual(decompress(b"".join(response.streaming_content)), self.BODY)
+
+    def _decoders(self):
+        yield "gzip", gzip.decompress
+        if middleware.brotli is not None:
+            yield "br", middleware.brotli.decompress
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class CompressedExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(300, 1, n_species=3, n_versions=1, prefix="compress")
+
+    def test_streamed_csv_round_trip(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = "/api/reports/observations/export/"
+        plain = _consume(client.get(url, HTTP_ACCEPT_ENCODING="identity"))
+        response = client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertTrue(response["ETag"].startswith("W/"))
+        self.assertEqual(gzip.decompress(_consume(response)), plain)
+        self.assertGreater(len(plain), 300 * 20)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class ObservationRowReaderTests(TestCase):
+    """El listado rápido devuelve lo mismo que ObservationSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(8, 1, n_species=2, n_versions=1, prefix="rowreader")
+        Observation.objects.create(
+            user=cls.user,
+            date=date(2023, 12, 31),
+            latitude=Decimal("-34.5"),
+            longitude=Decimal("-58.123456"),
+            place_text="Reserva Ñandú",
+            photo="observations/foto con espacios ñ.jpg",
+            client_key="offline-1",
+        )
+
+    def _qs(self):
+        qs = Observation.objects.filter(user=self.user).order_by("id")
+        return qs.select_related("inference")
+
+    def _serialized(self, request, fields=None):
+        data = ObservationSerializer(self._qs(), many=True, context={"request": request}).data
+        rows = json.loads(json.dumps(data))
+        if fields:
+            rows = [{k: v for k, v in row.items() if k in fields} for row in rows]
+        return rows
+
+    def _read(self, request, fields=None):
+        reader = ObservationRowReader(request, fields)
+        return json.loads(json.dumps(reader.rows(reader.values(self._qs()))))
+
+    def test_same_output_as_serializer(self):
+        self.assertTrue(self._qs().filter(inference__isnull=True).exists())
+        self.assertTrue(self._qs().filter(inference__isnull=False).exists())
+        for request in (RequestFactory().get("/api/observations/"), None):
+            with self.subTest(request=request):
+                self.assertEqual(self._read(request), self._serialized(request))
+
+    def test_sparse_fields(self):
+        request = RequestFactory().get("/api/observations/")
+        for raw in ("id,photo_url", "date,latitude,longitude,inference", "created_at,nada"):
+            with self.subTest(fields=raw):
+                fields = ObservationRowReader.parse_fields(raw)
+                self.assertEqual(self._read(request, fields), self._serialized(request, fields))
+        self.assertIsNone(ObservationRowReader.parse_fields("nada,otra"))
+
+    def test_list_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        results = client.get("/api/observations/?fields=id,photo_url&ordering=date").json()["results"]
+        self.assertTrue(results)
+        for row in results:
+            self.assertEqual(set(row), {"id", "photo_url"})
+            self.assertTrue(row["photo_url"].startswith("http://testserver/"))
+
+
+class _Rollback(Exception):
+    pass
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "refcache-tests"}},
+)
+class ReferenceCacheTests(TransactionTestCase):
+    """Sin el atomic() de TestCase: commits y rollbacks de verdad."""
+
+    def setUp(self):
+        cache.clear()
+        refcache.species.invalidate()
+        refcache.model_versions.invalidate()
+
+    def test_rolled_back_rows_are_not_served(self):
+        self.assertIsNone(refcache.species.get("Fantasma"))
+        with self.assertRaises(_Rollback), transaction.atomic():
+            Species.objects.create(name="Fantasma")
+            version = refcache.get_model_version("v-rollback")
+            # dentro de la transacción se ven
+            self.assertEqual(refcache.species.get("Fantasma").name, "Fantasma")
+            self.assertEqual(refcache.model_versions.get("v-rollback"), version)
+            raise _Rollback
+
+        self.assertIsNone(refcache.species.get("Fantasma"))
+        self.assertIsNone(refcache.model_versions.get("v-rollback"))
+        self.assertNotIn("fantasma", refcache.species.names_by_lower())
+        # y se puede volver a crear (no quedó una instancia sin fila)
+        version = refcache.get_model_version("v-rollback")
+        self.assertTrue(ModelVersion.objects.filter(pk=version.pk).exists())
+
+    def test_rename_invalidates(self):
+        carabus = Species.objects.create(name="Carabus")
+        self.assertEqual(refcache.species.get("Carabus"), carabus)
+        carabus.name = "Carabus auratus"
+        carabus.save()
+        self.assertIsNone(refcache.species.get("Carabus"))
+        self.assertEqual(refcache.species.get_by_pk(carabus.pk).name, "Carabus auratus")
+
+    def test_cached_get_or_create_runs_no_queries(self):
+        created = refcache.get_model_version("v1")
+        refcache.model_versions.get("v1")  # carga la tabla
+        with self.assertNumQueries(0):
+            self.assertEqual(refcache.get_model_version("v1"), created)
+            self.assertEqual(refcache.model_versions.get_or_create("v1").pk, created.pk)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+    TRACING_ENABLED=True,
+    TRACING_DB_SPANS=True,
+)
+class TracingTests(TestCase):
+    TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+    PARENT_ID = "00f067aa0ba902b7"
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(5, 1, n_species=1, n_versions=1, prefix="tracing")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.trace_file = os.path.join(tmp.name, "traces.jsonl")
+        override = self.settings(TRACING_FILE=self.trace_file)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _spans(self):
+        if not os.path.exists(self.trace_file):
+            return []
+        with open(self.trace_file, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def _traceparent(self):
+        return f"00-{self.TRACE_ID}-{self.PARENT_ID}-01"
+
+    def test_incoming_traceparent_is_continued(self):
+        response = self.client.get("/api/observations/", HTTP_TRACEPARENT=self._traceparent())
+        self.assertEqual(response["X-Request-ID"], self.TRACE_ID)
+
+        spans = self._spans()
+        (root,) = [s for s in spans if s.get("kind") == "SERVER"]
+        self.assertEqual(root["name"], "GET observation-list")
+        self.assertEqual(root["parentId"], self.PARENT_ID)
+        self.assertEqual({s["traceId"] for s in spans}, {self.TRACE_ID})
+        queries = [s for s in spans if s["name"] == "db.query"]
+        self.assertTrue(queries)
+        self.assertTrue(all(s["parentId"] == root["id"] for s in queries))
+
+    def test_new_trace_without_traceparent(self):
+        response = self.client.get("/api/auth/me/", HTTP_TRACEPARENT="basura")
+        self.assertRegex(response["X-Request-ID"], r"^[0-9a-f]{32}$")
+        self.assertNotEqual(response["X-Request-ID"], self.TRACE_ID)
+
+    def test_preview_propagates_trace_to_ai_service(self):
+        ok = mock.Mock(status_code=200, json=lambda: {"top_k": []})
+        with mock.patch("app.api.requests.post", return_value=ok) as post, mock.patch(
+            "app.api.preview_limiter", admission.ConcurrencyLimiter(limit=1)
+        ):
+            response = self.client.post(
+                "/api/predict_preview/",
+                {"image": _jpeg_upload()},
+                format="multipart",
+                HTTP_TRACEPARENT=self._traceparent(),
+            )
+        self.assertEqual(response.status_code, 200)
+        (ai_span,) = [s for s in self._spans() if s["name"] == "ai.predict"]
+        headers = post.call_args.kwargs["headers"]
+        self.assertEqual(headers["traceparent"], f"00-{self.TRACE_ID}-{ai_span['id']}-01")
+        self.assertEqual(headers["X-Request-ID"], self.TRACE_ID)
+
+    def test_predict_batch_propagates_trace(self):
+        photo = mock.MagicMock()
+        photo.name = "observations/a.jpg"
+        photo.open.return_value = BytesIO(b"jpeg")
+        ok = mock.Mock(status_code=200, json=lambda: {"version": "v1", "results": [{}]})
+        root = tracing.start("job", traceparent=self._traceparent())
+        token = tracing.activate(root)
+        try:
+            with mock.patch("app.ai_client.requests.post", return_value=ok) as post:
+                ai_client.predict_batch([mock.Mock(photo=photo)])
+        finally:
+            tracing.end(root, token)
+        (batch_span,) = [s for s in self._spans() if s["name"] == "ai.predict_batch"]
+        self.assertEqual(batch_span["parentId"], root.span_id)
+        self.assertEqual(
+            post.call_args.kwargs["headers"]["traceparent"],
+            f"00-{self.TRACE_ID}-{batch_span['id']}-01",
+        )
+
+    def test_streamed_request_spans_written_when_stream_ends(self):
+        response = self.client.get(
+            "/api/reports/observations/export/", HTTP_TRACEPARENT=self._traceparent()
+        )
+        self.assertEqual(response["X-Request-ID"], self.TRACE_ID)
+        self.assertEqual(self._spans(), [])
+        _consume(response)
+        response.close()
+        spans = self._spans()
+        (root,) = [s for s in spans if s.get("kind") == "SERVER"]
+        self.assertEqual(root["name"], "GET observations_export_csv")
+        self.assertTrue(any(s["name"] == "db.query" for s in spans))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+    ADMIN_ESTIMATED_COUNT_MIN=5,
+)
+class LargeTableAdminTests(TestCase):
+    """Changelists de Observation/Inference: conteo estimado y filtros."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = seed_dataset(12, 2, n_species=2, n_versions=1, prefix="admin")
+        cls.admin = get_user_model().objects.create_superuser("admin_tests", password=None)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _changelist(self, model, query=""):
+        response = self.client.get(f"/admin/app/{model}/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def _count(self, response):
+        return response.context["cl"].paginator.count
+
+    def test_estimated_count_from_table_statistics(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("ANALYZE de SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE app_observation")
+        self.assertEqual(admin_module.estimated_count(Observation), 12)
+        self.assertIsNone(admin_module.estimated_count(Tombstone))
+
+    def test_estimate_only_without_filters(self):
+        total = Observation.objects.count()
+        with mock.patch.object(admin_module, "estimated_count", return_value=1000) as estimate:
+            self.assertEqual(self._count(self._changelist("observation")), 1000)
+            estimate.assert_called_once()
+
+            estimate.reset_mock()
+            filtered = self._changelist("observation", f"?user__id__exact={self.alice.pk}")
+            self.assertEqual(
+                self._count(filtered), Observation.objects.filter(user=self.alice).count()
+            )
+            searched = self._changelist("observation", "?q=sin-coincidencias")
+            self.assertEqual(self._count(searched), 0)
+            estimate.assert_not_called()
+
+        # debajo del mínimo se cuenta de verdad
+        with mock.patch.object(admin_module, "estimated_count", return_value=3):
+            self.assertEqual(self._count(self._changelist("observation")), total)
+
+    def test_filter_querystrings_round_trip(self):
+        label = Inference.objects.values_list("predicted_label", flat=True).first()
+        query = urlencode({"predicted_label": label, "is_correct__exact": "1"})
+        response = self._changelist("inference", f"?{query}")
+        expected = Inference.objects.filter(predicted_label=label, is_correct=True).count()
+        self.assertEqual(self._count(response), expected)
+        # el form del filtro por texto conserva el resto de los filtros
+        self.assertContains(
+            response, '<input type="hidden" name="is_correct__exact" value="1">', html=True
+        )
+        self.assertContains(response, f'name="predicted_label" value="{label}"')
+        # y los links de los otros filtros conservan el texto buscado
+        links = [
+            parse_qs(unescape(href).lstrip("?"))
+            for href in re.findall(r'href="(\?[^"]*)"', response.content.decode())
+        ]
+        self.assertIn(
+            {"predicted_label": [label], "is_correct__exact": ["0"]},
+            links,
+        )
+
+        response = self._changelist("observation", f"?user__id__exact={self.bob.pk}")
+        self.assertEqual(self._count(response), Observation.objects.filter(user=self.bob).count())
+        # el select de autocompletado muestra el usuario elegido
+        self.assertContains(response, 'data-autocomplete-filter="user__id__exact"')
+        self.assertContains(
+            response, f'<option value="{self.bob.pk}" selected>{self.bob}</option>', html=True
+        )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class TopKTests(TempMediaMixin, TestCase):
+    """El top-k de la IA se guarda y vuelve en la respuesta (classify y alta)."""
+
+    TOP_K = [
+        {"label": "Carabus auratus", "confidence": 81.234},
+        {"label": "Lucanus cervus", "confidence": 12.5},
+    ]
+    EXPECTED = [
+        {"label": "Carabus auratus", "confidence": 81.23},
+        {"label": "Lucanus cervus", "confidence": 12.5},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        photos = make_photos(1, prefix="topk", size=64)
+        (cls.user,) = seed_dataset(
+            1, 1, n_species=1, n_versions=1, prefix="topk", photos=photos, inference_ratio=0
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_classify(self):
+        obs = Observation.objects.get(user=self.user)
+        ai = mock.Mock(
+            status_code=200,
+            json=lambda: {
+                "label": "Carabus auratus",
+                "confidence": 81.2,
+                "version": "v1",
+                "top_k": self.TOP_K,
+            },
+        )
+        with mock.patch("app.api._post_to_ai", return_value=ai):
+            response = self.client.post(f"/api/observations/{obs.pk}/classify/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["top_k"], self.EXPECTED)
+        self.assertEqual(Inference.objects.get(observation=obs).top_k, self.EXPECTED)
+
+    def test_create_with_preview(self):
+        response = self.client.post(
+            "/api/observations/",
+            {
+                "date": "2024-05-01",
+                "latitude": "-34.600000",
+                "longitude": "-58.400000",
+                "photo": _jpeg_upload(),
+                "predicted_label": "Carabus auratus",
+                "predicted_confidence": "81.2",
+                "predicted_version": "v1",
+                # en multipart el top-k viaja como JSON
+                "predicted_top_k": json.dumps(self.TOP_K),
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["inference"]["top_k"], self.EXPECTED)
+        inference = Inference.objects.get(observation_id=response.json()["id"])
+        self.assertEqual(inference.top_k, self.EXPECTED)
+
+
+def _fake_predictions(observations):
+    return "test_v1", [
+        {"label": "Especie 00", "confidence": 90.0, "top_k": []} for _ in observations
+    ]
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+)
+class SeedSyntheticTests(TestCase):
+    def test_without_species_leaves_observations_unlabeled(self):
+        (user,) = seed_dataset(5, 1, n_species=0, n_versions=0, prefix="nospecies")
+        self.assertEqual(Observation.objects.filter(user=user).count(), 5)
+        self.assertFalse(Inference.objects.filter(observation__user=user).exists())
+
+    def test_without_versions(self):
+        (user,) = seed_dataset(
+            4, 1, n_species=2, n_versions=0, prefix="noversions", inference_ratio=1
+        )
+        inferences = Inference.objects.filter(observation__user=user)
+        self.assertEqual(inferences.count(), 4)
+        self.assertFalse(inferences.filter(model_version__isnull=False).exists())
+
+    def test_command_rejects_no_species(self):
+        for option in ("--species", "--model-versions"):
+            with self.subTest(option=option), self.assertRaises(CommandError):
+                call_command("seed_synthetic", option, "0", "--photos", "0", stdout=io.StringIO())
+        self.assertFalse(Observation.objects.exists())
+
+
+class ReclassifyCommandTests(TestCase):
+    TARGET = "target_v2"
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(
+            7, 1, n_species=2, n_versions=1, prefix="reclassify", inference_ratio=0.5
+        )
+        Species.objects.create(name="Lucanus cervus")
+        Inference.objects.filter(observation__user=cls.user).update(is_correct=True)
+        cls.ids = list(
+            Observation.objects.filter(user=cls.user).order_by("id").values_list("id", flat=True)
+        )
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = Path(tmp.name) / "ckpt.json"
+        self.seen = []
+
+    def _predict(self, versions=None):
+        versions = iter(versions or [])
+
+        def predict(observations):
+            self.seen.extend(o.id for o in observations)
+            version = next(versions, self.TARGET)
+            # en minúsculas: effective_label la canoniza a la Species
+            return version, [
+                {"label": "lucanus cervus", "confidence": 70.0, "top_k": []} for _ in observations
+            ]
+
+        return mock.patch("app.ai_client.predict_batch", side_effect=predict)
+
+    def _run(self, *args):
+        call_command(
+            "reclassify",
+            "--model-version",
+            self.TARGET,
+            "--checkpoint",
+            str(self.checkpoint),
+            "--batch-size",
+            "2",
+            *args,
+            stdout=io.StringIO(),
+        )
+
+    def _reclassified(self):
+        return set(
+            Inference.objects.filter(model_version__name=self.TARGET).values_list(
+                "observation_id", flat=True
+            )
+        )
+
+    def test_full_run_updates_labels(self):
+        with self._predict():
+            self._run()
+        self.assertEqual(self.seen, self.ids)
+        self.assertEqual(self._reclassified(), set(self.ids))
+        inferences = Inference.objects.filter(observation_id__in=self.ids)
+        self.assertEqual(
+            set(inferences.values_list("effective_label", flat=True)), {"Lucanus cervus"}
+        )
+        # la etiqueta cambió: la validación anterior ya no aplica
+        self.assertFalse(inferences.filter(is_correct=True).exists())
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_resumes_from_checkpoint(self):
+        filters = {"user": None, "from": None, "to": None, "only_missing": False}
+        state = {"version": self.TARGET, "filters": filters, "last_id": self.ids[2]}
+        self.checkpoint.write_text(json.dumps({**state, "processed": 3, "failed": 0}))
+        with self._predict():
+            self._run()
+        self.assertEqual(self.seen, self.ids[3:])
+        self.assertEqual(self._reclassified(), set(self.ids[3:]))
+
+        # otro filtro con el mismo checkpoint: no se mezcla
+        self.checkpoint.write_text(json.dumps(state))
+        with self._predict(), self.assertRaisesMessage(CommandError, "--restart"):
+            self._run("--only-missing")
+
+    def test_aborts_when_service_version_changes(self):
+        with self._predict([self.TARGET, "target_v3"]), self.assertRaisesMessage(
+            CommandError, "target_v3"
+        ):
+            self._run()
+        # el primer batch quedó guardado y el checkpoint apunta a él
+        self.assertEqual(self._reclassified(), set(self.ids[:2]))
+        self.assertEqual(json.loads(self.checkpoint.read_text())["last_id"], self.ids[1])
+
+        with self._predict():
+            self._run()
+        self.assertEqual(self.seen[4:], self.ids[2:])
+        self.assertEqual(self._reclassified(), set(self.ids))
+
+    def test_only_missing_and_limit(self):
+        missing = list(
+            Observation.objects.filter(id__in=self.ids, inference__isnull=True)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.assertTrue(0 < len(missing) < len(self.ids))
+        with self._predict():
+            self._run("--only-missing", "--limit", "1")
+        self.assertEqual(self.seen, missing[:1])
+
+        with self._predict():
+            self._run("--only-missing", "--restart")
+        self.assertEqual(self.seen, missing)
+        self.assertEqual(self._reclassified(), set(missing))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+    AI_BATCH_SIZE=2,
+)
+class BulkClassifyTests(TestCase):
+    URL = "/api/observations/classify/"
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user,) = seed_dataset(5, 1, n_species=1, n_versions=1, prefix="bulk", inference_ratio=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_overlapping_calls_skip_instead_of_failing(self):
+        inner = {}
+
+        def predict(observations):
+            # mientras el primer pedido espera a la IA, llega otro igual
+            if "response" not in inner:
+                inner["response"] = None
+                inner["response"] = self.client.post(
+                    self.URL, {"unclassified": True}, format="json"
+                )
+            return _fake_predictions(observations)
+
+        with mock.patch("app.api.ai_client.predict_batch", side_effect=predict):
+            outer = self.client.post(self.URL, {"unclassified": True}, format="json")
+
+        self.assertEqual(inner["response"].status_code, 200)
+        self.assertEqual(inner["response"].json()["counts"], {"created": 5})
+        self.assertEqual(outer.status_code, 200)
+        body = outer.json()
+        self.assertEqual(body["counts"], {"skipped": 5})
+        self.assertTrue(all(r["inference_id"] for r in body["results"]))
+        self.assertEqual(Observation.objects.filter(inference__isnull=False).count(), 5)
+
+    def test_unclassified_cap_reports_remaining(self):
+        with mock.patch("app.api.BulkClassifyObservationsView.max_items", 3), mock.patch(
+            "app.api.ai_client.predict_batch", side_effect=_fake_predictions
+        ):
+            first = self.client.post(self.URL, {"unclassified": True}, format="json").json()
+            second = self.client.post(self.URL, {"unclassified": True}, format="json").json()
+
+        self.assertEqual(first["counts"], {"created": 3})
+        self.assertEqual((first["has_more"], first["remaining"]), (True, 2))
+        self.assertEqual(second["counts"], {"created": 2})
+        self.assertEqual((second["has_more"], second["remaining"]), (False, 0))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    PROFILING_ENABLED=False,
+    REPLICA_ENABLED=False,
+    CLASSIFY_WAIT_SECONDS=0,
+)
+class ClassifySingleFlightTests(TempMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        photos = make_photos(1, prefix="classify", size=64)
+        (cls.user,) = seed_dataset(
+            1, 1, n_species=1, n_versions=1, prefix="classify", photos=photos, inference_ratio=0
+        )
+        cls.obs = Observation.objects.get(user=cls.user)
+        cls.url = f"/api/observations/{cls.obs.pk}/classify/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_concurrent_classify_calls_ai_once(self):
+        concurrent = []
+
+        def post_to_ai(url, files):
+            # llega un segundo classify mientras el primero espera a la IA
+            concurrent.append(self.client.post(self.url))
+            return mock.Mock(
+                status_code=200,
+                json=lambda: {"label": "Especie 00", "confidence": 91.5, "version": "test_v1"},
+            )
+
+        with mock.patch("app.api._post_to_ai", side_effect=post_to_ai) as ai, \
+                self.captureOnCommitCallbacks() as callbacks:
+            first = self.client.post(self.url)
+
+        self.assertEqual(ai.call_count, 1)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(concurrent[0].status_code, 409)
+        self.assertIn("Retry-After", concurrent[0])
+        self.assertEqual(Inference.objects.filter(observation=self.obs).count(), 1)
+
+        # el claim se libera y los siguientes devuelven la misma inferencia
+        self.obs.refresh_from_db()
+        self.assertIsNone(self.obs.classify_started_at)
+        again = self.client.post(self.url)
+        self.assertEqual((again.status_code, again.json()["id"]), (200, first.json()["id"]))
+
+        # el mail no sale dentro de la transacción, sino en on_commit
+        self.assertEqual(len(mail.outbox), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class PhotoDerivativeTests(TempMediaMixin, SimpleTestCase):
+    def test_concurrent_miss_keeps_a_single_copy(self):
+        (photo,) = make_photos(1, prefix="derivative", size=64)
+        name = pdf.derivative_name(photo, 32)
+        first = pdf.photo_derivative(photo, 32)
+        # el segundo render tampoco lo vio (carrera entre exists() y save())
+        real_exists = default_storage.exists
+        checked = []
+
+        def exists(n):
+            # solo el chequeo de photo_derivative falla; save() ve el real
+            if n == name and not checked:
+                checked.append(n)
+                return False
+            return real_exists(n)
+
+        with mock.patch.object(default_storage, "exists", side_effect=exists):
+            second = pdf.photo_derivative(photo, 32)
+        self.assertEqual(checked, [name])
+        self.assertEqual(first, second)
+        _, files = default_storage.listdir(os.path.dirname(name))
+        self.assertEqual(files, [os.path.basename(name)])
+
+
+class PdfRenderBenchmarkTests(SimpleTestCase):
+    """
+    Render del informe PDF sin base: siempre un informe chico (páginas y
+    tabla compacta); el de PDF_BENCH_OBSERVATIONS filas, medido, solo con
+    BENCH_COMPARE / BENCH_UPDATE_BASELINE / BENCH_OUTPUT.
+    """
+
+    REPEAT = 3
+
+    def _rows(self, n):
+        start = date(2020, 1, 1)
+        for i in range(n):
+            has_inference = i % 5 != 0
+            yield (
+                start + timedelta(days=i % 1800),
+                f"Sendero {i % 50}",
+                Decimal("-24.780000") + Decimal(i % 997) / 10000,
+                Decimal("-65.410000") - Decimal(i % 991) / 10000,
+                i if has_inference else None,
+                f"Especie {i % 40:02d}" if has_inference else None,
+                50.0 + i % 50 if has_inference else None,
+                "resnet18_v1" if has_inference else None,
+            )
+
+    def _render(self, n):
+        out = BytesIO()
+        counts = [{"label": f"Especie {i:02d}", "count": n // 40} for i in range(40)]
+        pdf.render_report(out, "bench", None, None, n, counts, self._rows(n))
+        return out.getvalue()
+
+    def _pages(self, data):
+        return data.count(b"/Type /Page\n")
+
+    def test_report_is_compact(self):
+        n = 600
+        data = self._render(n)
+        self.assertTrue(data.startswith(b"%PDF"))
+        # tabla de una línea por observación: ~60 filas por página
+        pages = self._pages(data)
+        self.assertGreater(pages, n / 80)
+        self.assertLess(pages, n / 40 + 5)
+
+    def test_report_render(self):
+        if not BENCH_TIMED:
+            self.skipTest("Benchmark del PDF solo con BENCH_COMPARE=1.")
+        n = PDF_BENCH_OBSERVATIONS
+        data = self._render(n)  # warm-up
+        self.assertTrue(data.startswith(b"%PDF"))
+        pages = self._pages(data)
+
+        times = []
+        for _ in range(self.REPEAT):
+            t0 = time.perf_counter()
+            self._render(n)
+            times.append((time.perf_counter() - t0) * 1000.0)
+
+        tracemalloc.start()
+        try:
+            self._render(n)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            "p50_ms": round(statistics.median(times), 2),
+            "peak_kib": round(peak / 1024.0, 1),
+            "kib": round(len(data) / 1024.0, 1),
+            "pages": pages,
+        }
+        if BENCH_COMPARE:
+            print(
+                f"\npdf_render ({n} obs): {result['p50_ms']} ms, {pages} páginas, "
+                f"{result['kib']} KiB, peak {result['peak_kib']} KiB"
+            )
+        self.assertLess(pages, n / 40 + 5)
+
+        size_key = f"pdf_{n}"
+        baselines = (
+            json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        )
+        if BENCH_UPDATE_BASELINE:
+            baselines[size_key] = {"pdf_render": result}
+            BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+            return
+        if not BENCH_COMPARE:
+            return
+
+        base = baselines.get(size_key, {}).get("pdf_render")
+        if not base:
+            self.skipTest(f"Sin línea base para {size_key} (BENCH_UPDATE_BASELINE=1).")
+        self.assertLessEqual(
+            result["p50_ms"],
+            base["p50_ms"] * BENCH_TOLERANCE + LATENCY_SLACK_MS,
+            f"pdf_render: p50 {base['p50_ms']}ms -> {result['p50_ms']}ms",
+        )
+        self.assertLessEqual(
+            result["peak_kib"],
+            base["peak_kib"] * BENCH_TOLERANCE + MEMORY_SLACK_KIB,
+            f"pdf_render: memoria {base['peak_kib']}KiB -> {result['peak_kib']}KiB",
+        )
@@ -0,0 +1,201 @@
+"""
+Tracing entre Django y el servicio de IA.
+
+Cada request recibe un trace id (el del header W3C `traceparent` si vino,
+si no uno nuevo) que se devuelve como X-Request-ID y se propaga al servicio
+de IA con `inject()`. Los spans (request, queries, llamada HTTP, signals) se
+escriben al terminar el request en TRACING_FILE, un span por línea en
+formato Zipkin v2 JSON. ai_service/tracing.py escribe los suyos igual.
+
+    TRACING_ENABLED=True python manage.py runserver
+    TRACE_FILE=ai_traces.jsonl python ai_service/app.py
+    python manage.py trace_report --file ai_service/ai_traces.jsonl
+
+Para verlos en Zipkin: `jq -s . traces.jsonl | curl -H 'Content-Type:
+application/json' -d @- http://localhost:9411/api/v2/spans`.
+"""
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+
+_traceparent_re = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+_write_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return getattr(settings, "TRACING_ENABLED", False)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "tags",
+        "timestamp",
+        "duration",
+        "_start",
+        "_spans",
+        "_local_root",
+    )
+
+    def __init__(self, name, trace_id, parent_id=None, kind=None, spans=None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.tags = {}
+        self.timestamp = time.time_ns() // 1000
+        self.duration = None
+        self._start = time.perf_counter_ns()
+        # spans terminados del trace en este proceso; al cerrar la raíz
+        # local (la que no tiene padre acá) se escriben todos juntos
+        self._local_root = spans is None
+        self._spans = spans if spans is not None else []
+
+    def tag(self, key: str, value):
+        self.tags[key] = str(value)
+
+    def finish(self):
+        self.duration = max(1, (time.perf_counter_ns() - self._start) // 1000)
+        self._spans.append(self)
+
+    def to_zipkin(self) -> dict:
+        data = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration": self.duration,
+            "localEndpoint": {
+                "serviceName": getattr(settings, "TRACING_SERVICE_NAME", "beetleapp-api")
+            },
+        }
+        if self.parent_id:
+            data["parentId"] = self.parent_id
+        if self.kind:
+            data["kind"] = self.kind
+        if self.tags:
+            data["tags"] = self.tags
+        return data
+
+
+def _write(spans):
+    path = getattr(settings, "TRACING_FILE", "traces.jsonl")
+    lines = "".join(
+        json.dumps(s.to_zipkin(), separators=(",", ":")) + "\n" for s in spans
+    )
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(lines)
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def request_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span else None
+
+
+def start(name, kind=None, traceparent: str = None) -> Optional[Span]:
+    """
+    Crea un span hijo del actual (o raíz, continuando `traceparent` si
+    viene). Activarlo con `activate()` y cerrarlo con `end()`. None si el
+    tracing está apagado.
+    """
+    if not enabled():
+        return None
+    parent = _current.get()
+    if parent is not None:
+        span = Span(name, parent.trace_id, parent.span_id, kind, parent._spans)
+    else:
+        match = _traceparent_re.match((traceparent or "").strip().lower())
+        if match:
+            span = Span(name, match.group(1), match.group(2), kind)
+        else:
+            span = Span(name, _new_id(16), None, kind)
+    return span
+
+
+def end(span: Optional[Span], token=None, error: BaseException = None):
+    if span is None:
+        return
+    if error is not None:
+        span.tag("error", type(error).__name__)
+    span.finish()
+    if token is not None:
+        _current.reset(token)
+    if span._local_root:
+        _write(span._spans)
+
+
+@contextmanager
+def span(name: str, kind: str = None, **tags):
+    """Span alrededor de un bloque; `with span("x") as s: s.tag(...)`."""
+    s = start(name, kind)
+    if s is None:
+        yield _NOOP
+        return
+    for key, value in tags.items():
+        s.tag(key, value)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        end(s, token, e)
+        raise
+    end(s, token)
+
+
+def activate(s: Optional[Span]):
+    """Deja `s` como span actual; devuelve el token para `end()`."""
+    return _current.set(s) if s is not None else None
+
+
+def deactivate(token):
+    """Deshace `activate()` sin cerrar el span."""
+    if token is not None:
+        _current.reset(token)
+
+
+def inject(headers: dict = None) -> dict:
+    """Headers para propagar el trace actual a otro servicio."""
+    headers = dict(headers or {})
+    s = _current.get()
+    if s is not None:
+        headers["traceparent"] = f"00-{s.trace_id}-{s.span_id}-01"
+        headers["X-Request-ID"] = s.trace_id
+    return headers
+
+
+class _NoopSpan:
+    def tag(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class QuerySpans:
+    """execute_wrapper de Django: un span por query."""
+
+    def __call__(self, execute, sql, params, many, context):
+        with span("db.query", "CLIENT", **{"db.alias": context["connection"].alias}) as s:
+            s.tag("sql", sql[:300])
+            return execute(sql, params, many, context)
@@ -0,0 +1,106 @@
+"""
+Versión de datos por usuario y GET condicional (ETag / Last-Modified).
+
+Los signals de Observation/Inference llaman a `bump()`; los caminos que
+usan bulk_create/bulk_update (que no emiten signals) lo llaman a mano.
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import db_router
+from .models import UserDataVersion
+
+
+def bump(user_ids):
+    """
+    Incrementa la versión de datos de cada usuario de `user_ids` y fija sus
+    lecturas a default un rato (read-your-writes con réplica).
+    """
+    now = timezone.now()
+    user_ids = set(user_ids)
+    db_router.pin_to_primary(user_ids)
+    for user_id in user_ids:
+        if user_id is None:
+            continue
+        updated = UserDataVersion.objects.filter(user_id=user_id).update(
+            version=F("version") + 1, changed_at=now
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                UserDataVersion.objects.create(
+                    user_id=user_id, version=1, changed_at=now
+                )
+        except IntegrityError:
+            UserDataVersion.objects.filter(user_id=user_id).update(
+                version=F("version") + 1, changed_at=now
+            )
+
+
+def current(user):
+    """
+    (version, changed_at) del usuario; (0, None) si nunca cambió nada.
+    Siempre de default, aunque el handler lea de la réplica: una versión
+    atrasada daría 304 o un hit de app.response_cache sobre datos viejos.
+    """
+    row = (
+        UserDataVersion.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user_id=user.pk)
+        .values_list("version", "changed_at")
+        .first()
+    )
+    return row or (0, None)
+
+
+def _etag(request, version: int) -> str:
+    params = sorted(request.query_params.lists())
+    raw = "|".join(
+        [
+            str(request.user.pk),
+            str(version),
+            request.path,
+            repr(params),
+            request.META.get("HTTP_ACCEPT", ""),
+        ]
+    )
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional_on_data_version(method):
+    """
+    Decorador para handlers GET de DRF (después de la autenticación JWT):
+    responde 304 si el cliente ya tiene la versión actual de los datos del
+    usuario, antes de ejecutar los querysets de la vista.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        version, changed_at = current(request.user)
+        request._data_version = version  # lo reutiliza app.response_cache
+        etag = _etag(request, version)
+        last_modified = timegm(changed_at.utctimetuple()) if changed_at else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+    return wrapper
@@ -43,7 +43,10 @@ INSTALLED_APPS = [
 
 # --- Middleware ---
 MIDDLEWARE = [
+    "app.middleware.TracingMiddleware",  # span raíz del request (TRACING_ENABLED)
+    "app.middleware.RequestProfilingMiddleware",  # mide todo el request
     "django.middleware.security.SecurityMiddleware",
+    "app.middleware.CompressionMiddleware",  # antes de lo que lea/escriba el body
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # debe ir antes de CommonMiddleware
     "django.middleware.common.CommonMiddleware",
@@ -99,6 +102,62 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite: SQLite local (tests y benchmarks sin Docker)
+if os.getenv("DB_ENGINE", "mysql").lower() == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("SQLITE_PATH", str(BASE_DIR / "db.sqlite3")),
+            # SQLite no tiene SELECT FOR UPDATE: BEGIN IMMEDIATE toma el lock
+            # de escritura al abrir la transacción y serializa igual
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 30},
+        }
+    }
+
+# Réplica de lectura opcional para reportes, exports y listados (app.db_router).
+# MySQL: DB_REPLICA_HOST; SQLite: SQLITE_REPLICA_PATH (una copia del archivo).
+# En tests la réplica espeja a default.
+if os.getenv("DB_ENGINE", "mysql").lower() == "sqlite":
+    if os.getenv("SQLITE_REPLICA_PATH"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "NAME": os.getenv("SQLITE_REPLICA_PATH"),
+            "OPTIONS": {"timeout": 30},
+            "TEST": {"MIRROR": "default"},
+        }
+elif os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "USER": os.getenv("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.getenv("DB_REPLICA_PASS", DATABASES["default"]["PASSWORD"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["app.db_router.ReplicaRouter"]
+REPLICA_ENABLED = os.getenv("REPLICA_ENABLED", "1") == "1"
+# después de que un usuario escribe, sus lecturas van a default este tiempo
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# --- Cache (locmem por defecto; en dev también sirve el file-based) ---
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "beetleapp"),
+    }
+}
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))  # segundos
+# admin: desde cuántas filas la lista sin filtros usa el conteo estimado
+ADMIN_ESTIMATED_COUNT_MIN = int(os.getenv("ADMIN_ESTIMATED_COUNT_MIN", "100000"))
+# usuario autenticado por JWT (app.authentication); 0 = leerlo siempre de la base.
+# El alias tiene que ser compartido entre workers: con LocMemCache no se cachea
+# (salvo AUTH_USER_CACHE_ALLOW_LOCAL, para un único proceso)
+AUTH_USER_CACHE_SECONDS = int(os.getenv("AUTH_USER_CACHE_SECONDS", "60"))
+AUTH_USER_CACHE_ALIAS = os.getenv("AUTH_USER_CACHE_ALIAS", "default")
+AUTH_USER_CACHE_ALLOW_LOCAL = os.getenv("AUTH_USER_CACHE_ALLOW_LOCAL", "0") == "1"
+
 # --- Email (Papercut SMTP en Docker) ---
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
@@ -119,8 +178,12 @@ SIMPLE_JWT = {
 
 # --- DRF ---
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": (
+        "app.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "app.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
@@ -158,11 +221,83 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# --- PDFs (app.pdf) ---
+PDF_IMAGE_MAX_PX = int(os.getenv("PDF_IMAGE_MAX_PX", "1024"))  # lado mayor del derivado
+PDF_IMAGE_QUALITY = int(os.getenv("PDF_IMAGE_QUALITY", "75"))
+PDF_SPOOL_MAX_BYTES = int(os.getenv("PDF_SPOOL_MAX_BYTES", str(4 * 1024 * 1024)))  # después, a disco
+
+# --- Reportes agregados (app.analytics) ---
+REPORT_GRID_DEFAULT_CELL = os.getenv("REPORT_GRID_DEFAULT_CELL", "0.1")  # grados
+REPORT_GRID_MAX_CELLS = int(os.getenv("REPORT_GRID_MAX_CELLS", "2000"))
+REPORT_SERIES_MAX_LABELS = int(os.getenv("REPORT_SERIES_MAX_LABELS", "20"))
+
 # --- Config IA (Flask local) ---
 AI_PREDICT_URL = "http://127.0.0.1:5001/predict"
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "16"))  # <= MAX_BATCH del servicio
+# delta-sync: el cursor final retrocede este margen (escrituras que confirman tarde)
+SYNC_CURSOR_MARGIN_SECONDS = int(os.getenv("SYNC_CURSOR_MARGIN_SECONDS", "60"))
+# tombstones más viejos se borran (manage.py prune_tombstones); un cursor
+# anterior a esa ventana recibe 410 y el cliente resincroniza sin cursor. 0 = no podar
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+# classify individual: vigencia del claim y cuánto espera un pedido concurrente
+CLASSIFY_CLAIM_SECONDS = int(os.getenv("CLASSIFY_CLAIM_SECONDS", "60"))
+CLASSIFY_WAIT_SECONDS = float(os.getenv("CLASSIFY_WAIT_SECONDS", "35"))
+
+# Admisión de /api/predict_preview/ (ver app.admission). Concurrencia y cola
+# son por proceso de Django; los token buckets usan el cache.
+AI_PREVIEW_MAX_CONCURRENCY = int(os.getenv("AI_PREVIEW_MAX_CONCURRENCY", "4"))
+AI_PREVIEW_MAX_QUEUE = int(os.getenv("AI_PREVIEW_MAX_QUEUE", "8"))
+AI_PREVIEW_QUEUE_TIMEOUT = float(os.getenv("AI_PREVIEW_QUEUE_TIMEOUT", "5"))  # segundos
+AI_PREVIEW_BUCKETS = {
+    "ip": {
+        "rate_per_min": float(os.getenv("AI_PREVIEW_IP_RATE", "30")),
+        "burst": float(os.getenv("AI_PREVIEW_IP_BURST", "10")),
+    },
+    "user": {
+        "rate_per_min": float(os.getenv("AI_PREVIEW_USER_RATE", "60")),
+        "burst": float(os.getenv("AI_PREVIEW_USER_BURST", "20")),
+    },
+}
 
 
 
+# --- Compresión de respuestas (app.middleware.CompressionMiddleware) ---
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes
+COMPRESS_CONTENT_TYPES = ("application/json", "text/csv")
+
+# --- Profiling por request (app.middleware.RequestProfilingMiddleware) ---
+# un execute_wrapper en cada query: por defecto solo con DEBUG
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", str(DEBUG)).lower() == "true"
+PROFILING_WINDOW = int(os.getenv("PROFILING_WINDOW", "1000"))  # muestras por vista
+PROFILING_QUERY_BUDGET = int(os.getenv("PROFILING_QUERY_BUDGET", "20"))
+PROFILING_QUERY_BUDGETS = {  # por view_name
+    "observation-list": 4,
+    "observation-detail": 4,
+    "observations_summary": 8,
+    "observations_export_csv": 4,
+    "observations_export_pdf": 8,
+}
+
+# --- Tracing entre Django y el servicio de IA (app.tracing) ---
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "False").lower() == "true"
+TRACING_FILE = os.getenv("TRACING_FILE", str(BASE_DIR / "traces.jsonl"))  # Zipkin v2, un span por línea
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "beetleapp-api")
+TRACING_DB_SPANS = os.getenv("TRACING_DB_SPANS", "True").lower() == "true"  # un span por query
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        # INFO: una línea JSON por request; WARNING: solo las que exceden el presupuesto
+        "app.profiling": {
+            "handlers": ["console"],
+            "level": os.getenv("PROFILING_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
 # --- Seguridad básica si DEBUG=False ---
 if not DEBUG:
     SECURE_CONTENT_TYPE_NOSNIFF = True
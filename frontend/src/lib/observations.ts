@@ -3,9 +3,12 @@ import { api } from "./api";
 
 /** ---------- Tipos ---------- */
 
+export type TopKItem = { label: string; confidence: number };
+
 export type InferenceMini = {
   predicted_label: string;
   confidence: number;
+  top_k?: TopKItem[];
   created_at?: string;
 } | null;
 
@@ -39,6 +42,7 @@ export type CreateObsInput = {
   predicted_label?: string;
   predicted_confidence?: number | string;
   predicted_version?: string;
+  predicted_top_k?: TopKItem[];
 };
 
 export type UpdateObsInput = Partial<CreateObsInput>;
@@ -62,6 +66,9 @@ export function buildObservationFormData(input: CreateObsInput | UpdateObsInput)
   if ("predicted_version" in input && input.predicted_version != null) {
     fd.append("predicted_version", String(input.predicted_version));
   }
+  if ("predicted_top_k" in input && input.predicted_top_k != null) {
+    fd.append("predicted_top_k", JSON.stringify(input.predicted_top_k));
+  }
   return fd;
 }
 
@@ -110,11 +117,27 @@ export async function classifyObservation(observationId: number) {
     id: number;
     predicted_label: string;
     confidence: number;
+    top_k: TopKItem[];
     is_correct: boolean | null;
     created_at: string;
   };
 }
 
+// POST /api/observations/classify/  (batch: ids o todas las sin inferencia)
+export async function classifyObservations(input: { ids: number[] } | { unclassified: true }) {
+  const { data } = await api.post("/observations/classify/", input);
+  return data as {
+    counts: Record<string, number>;
+    results: {
+      observation_id: number;
+      status: "created" | "skipped" | "not_found" | "error";
+      predicted_label?: string;
+      confidence?: number;
+      detail?: string;
+    }[];
+  };
+}
+
 // POST /api/inferences/:id/validate/
 export async function validateInference(inferenceId: number, isCorrect: boolean) {
   const { data } = await api.post(`/inferences/${inferenceId}/validate/`, { is_correct: isCorrect });
@@ -128,5 +151,5 @@ export async function predictPreview(file: File) {
   const res = await api.post("predict_preview/", fd, {
     headers: { "Content-Type": "multipart/form-data" },
   });
-  return res.data as { label: string; confidence: number; version: string };
+  return res.data as { label: string; confidence: number; top_k?: TopKItem[]; version: string };
 }
@@ -1,19 +1,41 @@
 import { api } from "./api";
 
+export type Granularity = "day" | "week" | "month" | "year";
+
+type RangeFilters = {
+  from: string | null;
+  to: string | null;
+};
+
 export type ObservationSummary = {
-  filters: {
-    from: string | null;
-    to: string | null;
-  };
+  filters: RangeFilters;
+  granularity: Granularity;
   total_observations: number;
   distinct_species_count: number;
   species_counts: { label: string; count: number }[];
+  // `date` = inicio del período según `granularity`
   observations_by_date: { date: string; count: number }[];
 };
 
+export type ObservationTimeseries = {
+  filters: RangeFilters;
+  granularity: Granularity;
+  buckets: string[];
+  series: { label: string; total: number; counts: number[] }[];
+  other: { labels: number; total: number; counts: number[] } | null;
+};
+
+export type ObservationGrid = {
+  filters: RangeFilters;
+  cell: number;
+  cells: { lat: number; lon: number; count: number }[];
+  truncated: boolean;
+};
+
 export type SummaryFilters = {
   from?: string; // "YYYY-MM-DD"
   to?: string; // "YYYY-MM-DD"
+  granularity?: Granularity;
 };
 
 // GET /api/reports/observations/summary/
@@ -22,11 +44,49 @@ export async function getObservationSummary(filters?: SummaryFilters): Promise<O
     params: {
       from: filters?.from || undefined,
       to: filters?.to || undefined,
+      granularity: filters?.granularity || undefined,
     },
   });
   return data as ObservationSummary;
 }
 
+// GET /api/reports/observations/timeseries/
+// labels vacío: las `top` especies con más observaciones
+export async function getObservationTimeseries(
+  filters?: SummaryFilters,
+  opts?: { labels?: string[]; top?: number }
+): Promise<ObservationTimeseries> {
+  const { data } = await api.get("/reports/observations/timeseries/", {
+    params: {
+      from: filters?.from || undefined,
+      to: filters?.to || undefined,
+      granularity: filters?.granularity || undefined,
+      label: opts?.labels?.length ? opts.labels : undefined,
+      top: opts?.top,
+    },
+    paramsSerializer: { indexes: null }, // label=a&label=b
+  });
+  return data as ObservationTimeseries;
+}
+
+// GET /api/reports/observations/grid/
+// bbox: [minLon, minLat, maxLon, maxLat]
+export async function getObservationGrid(
+  filters?: SummaryFilters,
+  opts?: { cell?: number; bbox?: [number, number, number, number]; label?: string }
+): Promise<ObservationGrid> {
+  const { data } = await api.get("/reports/observations/grid/", {
+    params: {
+      from: filters?.from || undefined,
+      to: filters?.to || undefined,
+      cell: opts?.cell,
+      bbox: opts?.bbox?.join(","),
+      label: opts?.label || undefined,
+    },
+  });
+  return data as ObservationGrid;
+}
+
 // GET /api/reports/observations/export/ 
 export async function downloadObservationsCsv(filters?: SummaryFilters) {
   const { data } = await api.get("/reports/observations/export/", {
@@ -1,16 +1,31 @@
 import { useEffect, useState } from "react";
 import StatCard from "../components/StatCard";
 import TopSpeciesList from "../components/TopSpeciesList";
-import { getObservationSummary, downloadObservationsCsv, type ObservationSummary, downloadObservationsPdf } from "../lib/reports";
+import {
+  getObservationSummary,
+  downloadObservationsCsv,
+  type ObservationSummary,
+  downloadObservationsPdf,
+  type Granularity,
+  type SummaryFilters,
+} from "../lib/reports";
+
+const GRANULARITY_LABELS: Record<Granularity, string> = {
+  day: "día",
+  week: "semana",
+  month: "mes",
+  year: "año",
+};
 
 export default function ReportsPage() {
   const [fromDate, setFromDate] = useState<string>("");
   const [toDate, setToDate] = useState<string>("");
+  const [granularity, setGranularity] = useState<Granularity>("day");
   const [summary, setSummary] = useState<ObservationSummary | null>(null);
   const [loading, setLoading] = useState<boolean>(false);
   const [error, setError] = useState<string>("");
 
-  async function loadSummary(opts?: { from?: string; to?: string }) {
+  async function loadSummary(opts?: SummaryFilters) {
     try {
       setLoading(true);
       setError("");
@@ -32,12 +47,13 @@ export default function ReportsPage() {
     const filters: { from?: string; to?: string } = {};
     if (fromDate) filters.from = fromDate;
     if (toDate) filters.to = toDate;
-    void loadSummary(filters);
+    void loadSummary({ ...filters, granularity });
   }
 
   function handleClearFilters() {
     setFromDate("");
     setToDate("");
+    setGranularity("day");
     void loadSummary();
   }
 
@@ -117,6 +133,23 @@ export default function ReportsPage() {
                            transition-all duration-300"
                 />
               </div>
+
+              <div className="flex flex-col gap-2">
+                <label className="text-xs font-bold text-slate-600 uppercase tracking-wide">Agrupar por</label>
+                <select
+                  value={granularity}
+                  onChange={(e) => setGranularity(e.target.value as Granularity)}
+                  className="rounded-xl border-2 border-slate-200 px-4 py-2.5 text-sm font-medium text-slate-900 
+                           outline-none focus:ring-4 focus:ring-blue-100 focus:border-blue-500 
+                           transition-all duration-300"
+                >
+                  {(Object.keys(GRANULARITY_LABELS) as Granularity[]).map((g) => (
+                    <option key={g} value={g}>
+                      {GRANULARITY_LABELS[g]}
+                    </option>
+                  ))}
+                </select>
+              </div>
             </div>
 
             <div className="flex gap-3">
@@ -170,7 +203,9 @@ export default function ReportsPage() {
             </section>
 
             <section className="space-y-4">
-              <h2 className="text-2xl font-bold text-slate-900 flex items-center gap-2">Observaciones por día</h2>
+              <h2 className="text-2xl font-bold text-slate-900 flex items-center gap-2">
+                Observaciones por {GRANULARITY_LABELS[summary.granularity ?? "day"]}
+              </h2>
               {summary.observations_by_date.length === 0 ? (
                 <div className="p-8 text-center rounded-2xl border-2 border-dashed border-slate-300 bg-slate-50/50">
                   <div className="text-slate-400 text-3xl mb-2">📭</div>
@@ -1,8 +1,11 @@
 import { api } from "./api";
 
+export type TopKItem = { label: string; confidence: number };
+
 export type InferenceMini = {
   predicted_label: string;
   confidence: number;
+  top_k?: TopKItem[];
   created_at?: string;
 } | null;
 
@@ -14,7 +17,9 @@ export type Observation = {
   longitude: number | string;
   photo?: string | null;
   photo_url?: string | null;
+  client_key?: string | null;
   created_at?: string;
+  updated_at?: string;
   inference?: InferenceMini;
 };
 
@@ -144,3 +149,51 @@ export async function predictPreview(accessToken: string, file: { uri: string; n
   });
   return res.data as { label: string; confidence: number; version: string };
 }
+
+// ---- Sync offline ----
+
+export type SyncUploadItem = Omit<CreateObsInput, "photo"> & {
+  client_key: string; // uuid generado en el teléfono (idempotencia)
+  photo: { uri: string; name: string; type: string };
+};
+
+export type SyncUploadResult = {
+  client_key: string;
+  status: "created" | "exists" | "error";
+  id?: number;
+  errors?: Record<string, unknown>;
+};
+
+export async function syncUpload(accessToken: string, items: SyncUploadItem[]): Promise<SyncUploadResult[]> {
+  const fd = new FormData();
+  const meta = items.map((item, i) => {
+    const field = `photo_${i}`;
+    fd.append(field, item.photo as any);
+    return { ...item, photo: field };
+  });
+  fd.append("items", JSON.stringify(meta));
+
+  const { data } = await api.post("/sync/upload/", fd, {
+    headers: {
+      Authorization: `Bearer ${accessToken}`,
+      "Content-Type": "multipart/form-data",
+    },
+    timeout: 120000,
+  });
+  return data.results as SyncUploadResult[];
+}
+
+export type SyncChanges = {
+  observations: Observation[];
+  deleted: { observations: number[]; inferences: number[] };
+  cursor: string;
+  has_more: boolean;
+};
+
+export async function syncChanges(accessToken: string, cursor?: string | null): Promise<SyncChanges> {
+  const { data } = await api.get("/sync/changes/", {
+    params: cursor ? { cursor } : undefined,
+    headers: { Authorization: `Bearer ${accessToken}` },
+  });
+  return data as SyncChanges;
+}